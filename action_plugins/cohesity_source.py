@@ -0,0 +1,19 @@
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import sys
+
+# => The action plugins import the module utilities from the root of the role.
+ROLE_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ROLE_PATH not in sys.path:
+    sys.path.append(ROLE_PATH)
+
+from module_utils.storage.cohesity.cohesity_controller import CohesityControllerAction
+
+
+class ActionModule(CohesityControllerAction):
+    pass
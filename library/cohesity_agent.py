@@ -12,19 +12,36 @@ import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_native
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 from tempfile import mkstemp, mkdtemp
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
-        raise__cohesity_exception__handler, REQUEST_TIMEOUT
+        raise__cohesity_exception__handler
+    from module_utils.storage.cohesity.cohesity_agent_probe import get__agent__probe, AGENT_CONFIG_PATH
+    from module_utils.storage.cohesity.cohesity_agent_repository import get__repository__files, \
+        get__repository__commands, set__repository__files, remove__repository__files
+    from module_utils.storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents, \
+        get__agent__upgrade__state
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_download import download__file, get__agent__download__uri, \
+        get__agent__package, get__file__digest, get__checksum__spec, DOWNLOAD_RETRIES
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
-        raise__cohesity_exception__handler, REQUEST_TIMEOUT
+        raise__cohesity_exception__handler
+    from ansible.module_utils.storage.cohesity.cohesity_agent_probe import get__agent__probe, \
+        AGENT_CONFIG_PATH
+    from ansible.module_utils.storage.cohesity.cohesity_agent_repository import get__repository__files, \
+        get__repository__commands, set__repository__files, remove__repository__files
+    from ansible.module_utils.storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents, \
+        get__agent__upgrade__state
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_download import download__file, get__agent__download__uri, \
+        get__agent__package, get__file__digest, get__checksum__spec, DOWNLOAD_RETRIES
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
 
 
 ANSIBLE_METADATA = {
@@ -41,6 +58,10 @@ description:
     - When executed in a playbook, the Cohesity Agent installation will be validated and the appropriate
     - state action will be applied.  The most recent version of the Cohesity Agent will be automatically
     - downloaded to the host.
+    - Once the agent is installed, a manifest of its version, the Cluster version and the installer checksum
+    - is written to C(/var/lib/cohesity-ansible/agent.json).  Later runs compare the manifest with the Cluster
+    - version, or with I(checksum) when set, and skip checking, downloading and installing the agent when
+    - they match.
 version_added: '2.6.5'
 author:
   - Jeremy Goodrum (github.com/exospheredata)
@@ -94,6 +115,73 @@ options:
   operating_system:
     description:
       - ansible_distribution from facts, this value is automatically populated. Not given by module user
+  checksum:
+    description:
+      - Checksum of the installer as C(<algorithm>:<value>), for example C(sha256:9a4c...).  A value without
+      - an algorithm is taken to be a sha256 checksum.  When set, the downloaded installer must match it.
+      - The installer is always checked against the size reported by the server.
+    default: ''
+  download_retries:
+    description:
+      - Number of times an interrupted download is resumed from the bytes already received before failing.
+      - With I(download_location) set, a download interrupted in an earlier run is also resumed.
+    type: int
+    default: 3
+  installer_path:
+    description:
+      - Path of an installer which is already on the host, for example copied from the package cache on the
+      - controller by cohesity_agent_package.  When set, the installer is not downloaded.
+    type: path
+    default: ''
+  repository_url:
+    description:
+      - URL of a package repository holding the native agent package, for example published by
+      - cohesity_agent_package with I(repository_path).  When set with I(native_package), the module only writes
+      - the repository configuration of the package manager (apt, yum or zypper) and installs the agent with it,
+      - so the installer is not downloaded by the module.
+    default: ''
+  repository_version:
+    description:
+      - Version of the agent package installed from I(repository_url).  The version is also pinned in the
+      - repository configuration of apt and yum.  When not set, the latest version of the repository is installed.
+    default: ''
+  repository_gpg_key:
+    description:
+      - ASCII armored public key which signed the metadata of I(repository_url), for example
+      - I(repository.gpg_key) returned by cohesity_agent_package.  The package manager verifies the repository
+      - with this key.  Debian hosts require apt 1.4 or later.
+    default: ''
+  repository_trusted:
+    description:
+      - Install from an unsigned I(repository_url) without any check of the packages.  Anyone able to change the
+      - repository or the traffic to it can then run commands as root on the host, so only use it for a
+      - repository served over a trusted network.  Either this option or I(repository_gpg_key) is required with
+      - I(repository_url).
+    type: bool
+    default: no
+  upgrade:
+    description:
+      - When enabled, the agent is upgraded from the Cluster to the agent version of the Cluster instead of
+      - being installed.  The host is not contacted and I(host) or I(hosts) must be set.
+    type: bool
+    default: False
+  host:
+    description:
+      - Name or endpoint of the Physical Protection Source whose agent is upgraded.
+    default: ''
+  hosts:
+    description:
+      - List of the names or endpoints of the Physical Protection Sources whose agents are upgraded.
+      - All of the hosts are found with one listing of the Physical Protection Sources, their agents are
+      - upgraded with one request and each poll checks all of them with one listing.
+      - The outcome for each host is returned in C(hosts).
+    type: list
+    default: []
+  wait_minutes:
+    description:
+      - Number of minutes to wait for the agent upgrades to finish.
+    type: int
+    default: 30
 extends_documentation_fragment:
     - cohesity
 requirements: []
@@ -149,6 +237,36 @@ EXAMPLES = '''
     native_package: True
     download_uri: 'http://10.2.145.47/files/bin/installers/el-cohesity-agent-6.3-1.x86_64.rpm'
 
+# Download the installer to a custom location, resuming interrupted downloads and verifying its checksum
+- cohesity_agent:
+    state: present
+    service_user: cagent
+    native_package: True
+    download_location: /software/installers
+    download_uri: 'http://10.2.145.47/files/bin/installers/el-cohesity-agent-6.3-1.x86_64.rpm'
+    checksum: 'sha256:3b9a1c4e5f0d2a7b8c6e4f1a0d9b8c7e6f5a4b3c2d1e0f9a8b7c6d5e4f3a2b1c'
+    download_retries: 5
+
+# Install the agent with the package manager from a repository published by cohesity_agent_package
+- cohesity_agent:
+    state: present
+    service_user: cagent
+    native_package: True
+    operating_system: CentOS
+    repository_url: 'http://mirror.lab/cohesity/repos/kLinux-kRPM'
+    repository_version: '6.5.1d-1'
+    repository_gpg_key: "{{ lookup('file', 'files/cohesity-agent.asc') }}"
+
+# Upgrade the agents of all Linux hosts from the Cluster with a single request
+- cohesity_agent:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    upgrade: True
+    hosts: "{{ groups['linux'] }}"
+  delegate_to: localhost
+  run_once: True
+
 '''
 
 RETURN = '''
@@ -167,23 +285,76 @@ def verify_dependencies():
     pass
 
 
+def get_cluster_version(module):
+    '''
+    Return the software version of the Cluster, which is the version of the
+    agent it serves, or '' when it cannot be read.
+    '''
+    server = module.params.get('cluster')
+    if not server:
+        return ''
+    validate_certs = module.params.get('validate_certs')
+    try:
+        # => The basic Cluster information does not require a login.
+        try:
+            cluster = get__cohesity_rest__session(server, "", validate_certs).get("/public/basicClusterInfo")
+        except urllib_error.HTTPError as error:
+            if error.code != 401 or not module.params.get('username'):
+                raise
+            token = get__cohesity_auth__token(module)
+            cluster = get__cohesity_rest__session(server, token, validate_certs).get("/public/basicClusterInfo")
+        return cluster.get('clusterSoftwareVersion') or ''
+    except Exception:
+        # => Without the version, the agent is checked on the host as before.
+        return ''
+
+
+def is_manifest_current(module, manifest, cluster_version):
+    '''
+    Return True when the manifest shows that the agent of the Cluster version,
+    or of the installer matching the checksum, is installed.
+    '''
+    if not manifest or not get__agent__probe().get__agent__path():
+        return False
+    if manifest.get('native_package') != bool(module.params.get('native_package')):
+        return False
+    if module.params.get('repository_version'):
+        return manifest.get('repository_version') == module.params.get('repository_version')
+    if module.params.get('checksum'):
+        return get__checksum__spec(module.params.get('checksum')) == \
+            get__checksum__spec(manifest.get('checksum'))
+    return bool(cluster_version) and manifest.get('cluster_version') == cluster_version
+
+
+def record_manifest(module, results, cluster_version):
+    '''
+    Write the manifest of the installed agent.  A manifest which cannot be
+    written only means that the next run checks the agent on the host again.
+    '''
+    manifest = dict(
+        version=results['version'],
+        cluster_version=cluster_version,
+        native_package=bool(module.params.get('native_package')),
+        checksum='',
+        # => Only an agent installed by this run comes from the repository.
+        repository_version=(module.params.get('repository_version') or '') if results.get('changed') else '',
+        installed=int(time.time())
+    )
+    if results.get('filename'):
+        manifest['filename'] = os.path.basename(results['filename'])
+        manifest['checksum'] = "sha256:" + get__file__digest(results['filename']).hexdigest()
+    try:
+        get__agent__probe().set__manifest(manifest)
+    except (IOError, OSError) as error:
+        module.warn("Failed to record the Cohesity Agent manifest: " + to_native(error))
+
+
 def check_agent(module, results):
     # => Determine if the Cohesity Agent is currently installed
-    aix_agent_path = "/usr/local/cohesity/agent/aix_agent.sh"
-    def_agent_path = "/etc/init.d/cohesity-agent"
-
-    # Look for default ansible agent path and aix agent path.
-    agent_path = def_agent_path if os.path.exists(def_agent_path) else \
-        aix_agent_path if os.path.exists(aix_agent_path) else None
+    probe = get__agent__probe()
+    agent_path = probe.get__agent__path()
     if agent_path:
-        cmd = "%s version" % agent_path
-        rc, out, err = module.run_command(cmd)
-        split_out = out.split("\n")
-        version = ""
-        for v in split_out:
-            if v.startswith('Version'):
-                version = v.split(" ")[-1]
-                break
+        version, out, err = probe.get__version(module)
         if version:
             # => When the agent is installed, we should be able to return
             # => the version information
@@ -198,78 +369,39 @@ def check_agent(module, results):
             )
 
         return results
-    elif os.path.exists("/etc/cohesity-agent"):
+    elif os.path.exists(AGENT_CONFIG_PATH):
         # => If the file is found then let's return an unknown state
         # => immediately
         results['version'] = "unknown"
         return results
     else:
-        cmd = "ps -aux | grep crux/bin/linux_agent | grep -v python | awk '{print $2}'"
-        rc, out, err = module.run_command(
-            cmd, check_rc=True, use_unsafe_shell=True)
-        if out:
-            orphaned_agents = out.split("\n")
-            for process in orphaned_agents:
-                if process:
-                    try:
-                        cmd = "kill -9 {0}".format(process)
-                    except BaseException:
-                        cmd = "kill -9 %s" % (process)
-                    rc, out, err = module.run_command(cmd)
-
-                    if err:
-                        pattern = "No such process"
-                        if pattern in err:
-                            # => Since the kill command returned 'No such process' we will just continue
-                            pass
-                        else:
-                            results['changed'] = False
-                            results['Failed'] = True
-                            results['check_agent'] = dict(
-                                stdout=out,
-                                stderr=err
-                            )
-                            results['process_id'] = process
-                            module.fail_json(
-                                msg="Failed to remove an orphaned Cohesity Agent service which is still running",
-                                **results)
-                    else:
-                        pass
-            results['version'] = False
-            return results
-
-        else:
-            # => If the files are not found then let's return False
-            # => immediately
-            results['version'] = False
-            return results
+        # => Any agent process still running is an orphan of an earlier installation.
+        failures = probe.kill__orphaned__processes(module)
+        if failures:
+            process, error = sorted(failures.items())[0]
+            results['changed'] = False
+            results['Failed'] = True
+            results['check_agent'] = dict(
+                stdout="",
+                stderr=error
+            )
+            results['process_id'] = process
+            module.fail_json(
+                msg="Failed to remove an orphaned Cohesity Agent service which is still running",
+                **results)
+        # => If the files are not found then let's return False
+        # => immediately
+        results['version'] = False
+        return results
 
 
 def download_agent(module, path):
     try:
-        if module.params.get('operating_system') == "AIX":
-            server = module.params.get('cluster')
-            token = get__cohesity_auth__token(module)
-            uri = "https://" + server + \
-                "/irisservices/api/v1/public/physicalAgents/download?hostType=kAix&agentType=kJava"
-            headers = {
-                "Accept": "application/octet-stream",
-                "Authorization": "Bearer " + token,
-                "user-agent": "cohesity-ansible/v2.3.4"}
-        elif not module.params.get('download_uri'):
-            os_type = "Linux"
+        if module.params.get('operating_system') == "AIX" or not module.params.get('download_uri'):
             server = module.params.get('cluster')
             token = get__cohesity_auth__token(module)
-            package_type = 'kScript'
-            if module.params.get('native_package'):
-                if module.params.get('operating_system') in ('CentOS', 'RedHat', 'OracleLinux'):
-                    package_type = 'kRPM'
-                elif module.params.get('operating_system') == 'SLES':
-                    package_type = 'kSuseRPM'
-                elif module.params.get('operating_system') == 'Ubuntu':
-                    package_type = 'kDEB'
-            uri = "https://" + server + \
-                "/irisservices/api/v1/public/physicalAgents/download?hostType=k" + os_type + '&pkgType=' + package_type
+            uri = get__agent__download__uri(server, get__agent__package(
+                module.params.get('operating_system'), module.params.get('native_package')))
             headers = {
                 "Accept": "application/octet-stream",
                 "Authorization": "Bearer " + token,
@@ -280,22 +412,13 @@ def download_agent(module, path):
                 "Accept": "application/octet-stream",
                 "user-agent": "cohesity-ansible/v2.3.4"}
 
-        agent = open_url(url=uri, headers=headers,
-                         validate_certs=False, timeout=REQUEST_TIMEOUT)
-        resp_headers = agent.headers
-        if 'content-disposition' in resp_headers.keys():
-            filename = resp_headers['content-disposition'].split("=")[1]
-        else:
-            filename = 'cohesity-agent-installer'
-        filename = path + "/" + filename
-        try:
-            f = open(filename, "wb")
-            f.write(agent.read())
-            os.chmod(filename, 0o755)
-        except Exception as e:
-            raise InstallError(e)
-        finally:
-            f.close()
+        # => Stream the installer to disk, resuming an interrupted download, and only
+        # => move it into place once the size and optional checksum are verified.
+        download = download__file(uri, path, headers=headers,
+                                  checksum=module.params.get('checksum'),
+                                  default_filename='cohesity-agent-installer',
+                                  retries=module.params.get('download_retries'))
+        filename = download['filename']
     except urllib_error.HTTPError as e:
         error_msg = json.loads(e.read())
         if 'message' in error_msg:
@@ -312,6 +435,29 @@ def download_agent(module, path):
     return filename
 
 
+def get_installer(module, path):
+    '''
+    Return the installer given by installer_path or download it to the path.
+    '''
+    installer = module.params.get('installer_path')
+    if not installer:
+        return download_agent(module, path)
+    # => The installer was copied to the host, for example from the package
+    # => cache on the controller, so only make sure that it is complete.
+    if not os.path.isfile(installer):
+        module.fail_json(msg="The Cohesity Agent installer does not exist", installer_path=installer)
+    try:
+        algorithm, expected = get__checksum__spec(module.params.get('checksum'))
+        digest = get__file__digest(installer, algorithm).hexdigest() if expected else ''
+        os.chmod(installer, 0o755)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+    if digest != expected:
+        module.fail_json(msg="The Cohesity Agent installer does not match the checksum",
+                         installer_path=installer)
+    return installer
+
+
 def installation_failures(module, stdout, rc, message):
     # => The way that this installer works, we will not get back messages in stderr
     # => when a failure occurs.  For this reason, we need to jump through some hoops
@@ -385,6 +531,8 @@ def install_agent(module, installer, native):
                 cmd = "sudo COHESITYUSER=%s  rpm -i %s" % (user, installer)
 
     rc, stdout, stderr = module.run_command(cmd, cwd=installer)
+    # => The agent has changed, so it must be probed again.
+    get__agent__probe().reset()
     # => Any return code other than 0 is considered a failure.
     if rc:
         installation_failures(
@@ -392,6 +540,34 @@ def install_agent(module, installer, native):
     return (True, "Successfully Installed the Cohesity agent")
 
 
+def install_agent_from_repository(module):
+    '''
+    Configure the package repository and install the agent with the package manager.
+    '''
+    package = get__agent__package(module.params.get('operating_system'), True)
+    if package.get('pkgType') not in ('kDEB', 'kRPM', 'kSuseRPM'):
+        installation_failures(
+            module, "", "",
+            str(module.params.get('operating_system')) + " can't install the agent from a package repository")
+    version = module.params.get('repository_version')
+    gpg_key = module.params.get('repository_gpg_key')
+    if not gpg_key and not module.params.get('repository_trusted'):
+        module.fail_json(msg="The repository_gpg_key of the repository_url is required.  Set repository_trusted "
+                             "to install from an unsigned repository", changed=False)
+    set__repository__files(get__repository__files(
+        package['pkgType'], module.params.get('repository_url').rstrip('/'), version,
+        gpg_key, module.params.get('repository_trusted')))
+    environ = dict(COHESITYUSER=module.params.get('service_user'), DEBIAN_FRONTEND='noninteractive')
+    for cmd in get__repository__commands(package['pkgType'], version, bool(gpg_key)):
+        rc, stdout, stderr = module.run_command(cmd, environ_update=environ)
+        if rc:
+            get__agent__probe().reset()
+            installation_failures(
+                module, stdout + stderr, rc, "Failed to install the Cohesity agent from the package repository")
+    get__agent__probe().reset()
+    return (True, "Successfully Installed the Cohesity agent")
+
+
 def extract_agent(module, filename):
 
     # => This command will run the self-extracting installer in no execution mode
@@ -465,6 +641,8 @@ def remove_agent(module, installer, native):
                 module, "", "",
                 str(module.params.get('operating_system')) + " is not supported by cohesity ansible module")
 
+    get__agent__probe().remove__manifest()
+    get__agent__probe().reset()
     return (True, "Successfully Removed the Cohesity agent")
 
 
@@ -492,135 +670,125 @@ def create_download_dir(module, dir_path):
                     raise
 
 
-def get_source_details(module, source_id):
+# => Outcome of an upgrade request for each agent upgradability reported by the Cluster.
+UPGRADABILITY_MESSAGES = dict(
+    kCurrent=(False, "The host has the latest agent version"),
+    kNonUpgradableAgentIsNewer=(False, "The agent version running on the host is newer"
+                                       " than the agent version on the cluster"),
+    kNonUpgradableAgentIsOld=(True, "The agent version running on the host is too old to support upgrades")
+)
+
+
+def get_upgrade_hosts(module):
     '''
-    Get protection source details
-    :param module: object that holds parameters passed to the module
-    :param source_id: protection source id
-    :return:
+    Return the hosts whose agents are upgraded, without duplicates.
     '''
-    server = module.params.get('cluster')
-    validate_certs = module.params.get('validate_certs')
-    token = get__cohesity_auth__token(module)
-    try:
-        if source_id:
-            uri = "https://" + server + \
-                  "/irisservices/api/v1/public/protectionSources?id=" + str(source_id)
-        else:
-            uri = "https://" + server + \
-                  "/irisservices/api/v1/public/protectionSources?environments=kPhysical"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(
-            url=uri,
-            headers=headers,
-            validate_certs=validate_certs,
-            method="GET", timeout=REQUEST_TIMEOUT)
-        response = json.loads(response.read())
-        if source_id:
-            nodes = response
+    hosts = []
+    for host in module.params.get('hosts') or [module.params.get('host')]:
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+def get_upgrade_results(tracker, hosts):
+    '''
+    Return the outcome of the upgrade of the agent of each host.
+    '''
+    output = []
+    for status in tracker.get__status(hosts):
+        result = dict(host=status['host'], changed=True, failed=False, version=status['version'],
+                      previous_version=status['previous_version'])
+        state = get__agent__upgrade__state(tracker.get__agent(status['host']))
+        if not status['agent_id']:
+            result['msg'] = "Update agent request is accepted but failed to check agent" \
+                            " status during upgrade wait time"
+            result['version'] = status['previous_version']
+        elif state == 'failed':
+            result['failed'] = True
+            result['msg'] = "Failed to upgrade agent. " + status['message']
+        elif status['done']:
+            result['msg'] = "Successfully upgraded the agent"
         else:
-            nodes = response[0]['nodes']
-        source_details = dict()
-        for source in nodes:
-            if source['protectionSource']['name'] == module.params.get('host'):
-                source_details['agent'] =\
-                    source['protectionSource']['physicalProtectionSource']['agents'][0]
-                source_details['id'] = source['protectionSource']['id']
-        if not source_details:
-            module.fail_json(
-                changed=False,
-                msg="Can't find the host on the cluster")
-        return source_details
-    except urllib_error.URLError as e:
-        # => Capture and report any error messages.
-        raise__cohesity_exception__handler(e.read(), module)
-    except Exception as error:
-        raise__cohesity_exception__handler(error, module)
+            result['msg'] = "The agent upgrade request is accepted." \
+                            " The upgrade is not finished in the wait time"
+        output.append(result)
+    return output
 
 
 def update_agent(module):
     '''
     upgrades the agent on physical servers
+    All of the hosts are found with a single listing of the Physical Protection
+    Sources, their agents are upgraded with one request and their upgrade is
+    followed together.
     :param module: object that holds parameters passed to the module
     :return:
     '''
     server = module.params.get('cluster')
     validate_certs = module.params.get('validate_certs')
     token = get__cohesity_auth__token(module)
+    hosts = get_upgrade_hosts(module)
     result = dict(
         changed=False,
         msg='',
         version=''
     )
     try:
-        source_details = get_source_details(module, None)
-        if source_details['agent']['upgradability'] == 'kUpgradable':
-            uri = "https://" + server + \
-                  "/irisservices/api/v1/public/physicalAgents/upgrade"
-            headers = {"Accept": "application/json",
-                       "Authorization": "Bearer " + token,
-                       "user-agent": "cohesity-ansible/v2.3.4"}
-            payload = {
-                "agentIds": [source_details['agent']['id']]
-            }
-            response = open_url(
-                url=uri,
-                data=json.dumps(payload),
-                headers=headers,
-                validate_certs=validate_certs,
-                method="POST", timeout=REQUEST_TIMEOUT)
-
-            wait_time = module.params.get('wait_minutes')
-            while wait_time > 0:
-                poll_source_details = get_source_details(module, source_details['id'])
-                if not poll_source_details:
-                    result['changed'] = True
-                    result['msg'] = "Update agent request is accepted but failed to check agent" \
-                                    " status during upgrade wait time"
-                    result['version'] = source_details['agent']['version']
-                    module.exit_json(**result)
-                elif poll_source_details['agent'].get('upgradeStatusMessage', ''):
-                    module.fail_json(
-                        changed=False,
-                        msg="Failed to upgrade agent. " + poll_source_details['agent']['upgradeStatusMessage'])
-                elif poll_source_details['agent']['upgradeStatus'] == 'kFinished':
-                    result['changed'] = True
-                    result['msg'] = "Successfully upgraded the agent"
-                    result['version'] = poll_source_details['agent']['version']
-                    module.exit_json(**result)
-                time.sleep(SLEEP_TIME_SECONDS)
-                wait_time = wait_time - (SLEEP_TIME_SECONDS/SECONDS_MINUTES_CONVERSION)
-            result['changed'] = True
-            result['msg'] = "The agent upgrade request is accepted." \
-                            " The upgrade is not finished in the wait time"
-            result['version'] = source_details['agent']['version']
-            module.exit_json(**result)
-        elif source_details['agent']['upgradability'] == 'kCurrent':
-            result['msg'] = "The host has the latest agent version"
-            result['version'] = source_details['agent']['version']
-            module.exit_json(**result)
-        elif source_details['agent']['upgradability'] == 'kNonUpgradableAgentIsNewer':
-            result['msg'] = "The agent version running on the host is newer" \
-                            " than the agent version on the cluster"
-            result['version'] = source_details['agent']['version']
-            module.exit_json(**result)
-        elif source_details['agent']['upgradability'] == 'kNonUpgradableAgentIsOld':
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        agents = get__physical__agents(session)
+        missing = [host for host in hosts if host not in agents]
+        if missing:
             module.fail_json(
                 changed=False,
-                msg="The agent version running on the host is too old to support upgrades")
-        else:
-            module.fail_json(
-                changed=False,
-                msg="Can't upgrade the agent due to unknown or invalid"
-                    " agent version running on the host")
+                msg="Can't find the host on the cluster",
+                missing=missing)
+
+        upgradable = []
+        outcomes = dict()
+        for host in hosts:
+            agent = agents[host]['agent']
+            if agent.get('upgradability') == 'kUpgradable':
+                upgradable.append(host)
+                continue
+            failed, msg = UPGRADABILITY_MESSAGES.get(
+                agent.get('upgradability'),
+                (True, "Can't upgrade the agent due to unknown or invalid agent version running on the host"))
+            outcomes[host] = dict(host=host, changed=False, failed=failed, msg=msg, version=agent.get('version'))
+
+        if upgradable:
+            tracker = AgentUpgradeTracker(session, agents)
+            tracker.start(upgradable)
+            tracker.wait(upgradable, module.params.get('wait_minutes') * SECONDS_MINUTES_CONVERSION,
+                         max_interval=SLEEP_TIME_SECONDS)
+            for outcome in get_upgrade_results(tracker, upgradable):
+                outcomes[outcome['host']] = outcome
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
         raise__cohesity_exception__handler(e.read(), module)
     except Exception as error:
         raise__cohesity_exception__handler(error, module)
 
+    outcomes = [outcomes[host] for host in hosts]
+    result['changed'] = any(outcome['changed'] for outcome in outcomes)
+    failures = [outcome for outcome in outcomes if outcome['failed']]
+    if not module.params.get('hosts'):
+        # => Report a single host as before.
+        result['msg'] = outcomes[0]['msg']
+        result['version'] = outcomes[0]['version']
+        if failures:
+            module.fail_json(changed=False, msg=result['msg'])
+        module.exit_json(**result)
+
+    result.pop('version')
+    result['hosts'] = outcomes
+    if failures:
+        result['msg'] = "Failed to upgrade the agents of " + str(len(failures)) + " of " + \
+            str(len(outcomes)) + " hosts"
+        module.fail_json(**result)
+    result['msg'] = "Requested the upgrade of the agents of " + str(len(upgradable)) + " of " + \
+        str(len(outcomes)) + " hosts"
+    module.exit_json(**result)
+
 
 def main():
     # => Load the default arguments including those specific to the Cohesity Agent.
@@ -637,8 +805,16 @@ def main():
             download_uri=dict(defaut=''),
             operating_system=dict(defalut="", type='str'),
             host=dict(type='str', default=''),
+            hosts=dict(type='list', default=[]),
             upgrade=dict(type='bool', default=False),
             wait_minutes=dict(type='int', default=30),
+            checksum=dict(type='str', default=''),
+            download_retries=dict(type='int', default=DOWNLOAD_RETRIES),
+            installer_path=dict(type='path', default=''),
+            repository_url=dict(type='str', default=''),
+            repository_version=dict(type='str', default=''),
+            repository_gpg_key=dict(type='str', default=''),
+            repository_trusted=dict(type='bool', default=False),
         )
     )
 
@@ -691,22 +867,41 @@ def main():
             module.exit_json(**check_mode_results)
 
         elif module.params.get('state') == "present" and not module.params.get('upgrade'):
+            # => Skip the checks on the host when the manifest shows that the agent of the
+            # => Cluster version, or of the given installer checksum, is installed.
+            probe = get__agent__probe()
+            manifest = probe.get__manifest()
+            cluster_version = None
+            if manifest and not module.params.get('checksum') and not module.params.get('repository_version'):
+                cluster_version = get_cluster_version(module)
+            if is_manifest_current(module, manifest, cluster_version):
+                results['version'] = manifest['version']
+                results['msg'] = "The installed Cohesity Agent matches the manifest.  No changes"
+                module.exit_json(**results)
+
             # => Check if the Cohesity Agent is currently installed and only trigger the install
             # => if the agent does not exist.
             results = check_agent(module, results)
 
             if not results['version']:
                 if not module.params.get('native_package'):
-                    results['filename'] = download_agent(module, tempdir)
+                    results['filename'] = get_installer(module, tempdir)
                     results['changed'], results['message'], results['installer'] = extract_agent(
                         module, results['filename'])
                     results['changed'], results['message'] = install_agent(
                         module, results['installer'], False)
                     results = check_agent(module, results)
+                elif module.params.get('repository_url'):
+                    results['changed'], results['message'] = install_agent_from_repository(module)
+                    results = check_agent(module, results)
                 else:
-                    results['filename'] = download_agent(module, tempdir)
+                    results['filename'] = get_installer(module, tempdir)
                     results['changed'], results['message'] = install_agent(module, results['filename'], True)
                     results = check_agent(module, results)
+                if results['version'] and results['version'] != "unknown":
+                    if cluster_version is None:
+                        cluster_version = get_cluster_version(module)
+                    record_manifest(module, results, cluster_version)
             elif results['version'] == "unknown":
                 # => There is a problem that we should invesitgate.
                 module.fail_json(
@@ -714,13 +909,17 @@ def main():
             else:
                 # => If we received a valid version then the assumption will be
                 # => that the Agent is installed.  We should simply pass it foward
-                # => and act like things are normal.
-                pass
+                # => and act like things are normal.  An agent of the Cluster version
+                # => is recorded so that later runs skip the checks.
+                if cluster_version is None:
+                    cluster_version = get_cluster_version(module)
+                if cluster_version and results['version'] == cluster_version:
+                    record_manifest(module, results, cluster_version)
         elif module.params.get('state') == "present" and module.params.get('upgrade'):
-            if not module.params.get('host'):
+            if not module.params.get('host') and not module.params.get('hosts'):
                 module.fail_json(
                     changed=False,
-                    msg="The host parameter is required for agent upgrades")
+                    msg="The host or hosts parameter is required for agent upgrades")
             update_agent(module)
         elif module.params.get('state') == "absent":
             # => Check if the Cohesity Agent is currently installed and only trigger the uninstall
@@ -735,13 +934,16 @@ def main():
                     results.pop('check_agent', None)
                     # => When removing the agent, we will need to download the installer once again,
                     # => and then run the --full-uninstall command.
-                    results['filename'] = download_agent(module, tempdir)
+                    results['filename'] = get_installer(module, tempdir)
                     results['changed'], results['message'], results['installer'] = extract_agent(
                         module, results['filename'])
                     results['changed'], results['message'] = remove_agent(
                         module, results['installer'], False)
                 else:
                     results['changed'], results['message'] = remove_agent(module, "", True)
+            # => The repository configuration is removed with the agent.
+            if module.params.get('native_package') and module.params.get('repository_url'):
+                results['changed'] = remove__repository__files() or results['changed']
         else:
             # => This error should never happen based on the set assigned to the parameter.
             # => However, in case, we should raise an appropriate error.
@@ -759,10 +961,10 @@ def main():
     finally:
         # => We should delete the downloaded installer regardless of our success.  This could be debated
         # => either way but seems like a better choice.
-        if module.params.get('download_location'):
-            if 'installer' in results:
-                shutil.rmtree(results['installer'])
-        else:
+        if 'installer' in results and (module.params.get('download_location') or
+                                       module.params.get('installer_path')):
+            shutil.rmtree(results['installer'])
+        if not module.params.get('download_location'):
             shutil.rmtree(tempdir)
 
     if success:
@@ -0,0 +1,325 @@
+#!/usr/bin/python
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import shutil
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import urllib_error
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_agent_repository import publish__package, REPOSITORY_FORMATS
+    from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_download import PackageCache, get__agent__package, \
+        get__agent__download__uri, get__package__cache__dir, DEFAULT_PACKAGE_CACHE_PATH, DOWNLOAD_RETRIES
+    from module_utils.storage.cohesity.cohesity_hints import get__cluster
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        raise__cohesity_exception__handler
+except ImportError:
+    from ansible.module_utils.storage.cohesity.cohesity_agent_repository import publish__package, \
+        REPOSITORY_FORMATS
+    from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_download import PackageCache, get__agent__package, \
+        get__agent__download__uri, get__package__cache__dir, DEFAULT_PACKAGE_CACHE_PATH, DOWNLOAD_RETRIES
+    from ansible.module_utils.storage.cohesity.cohesity_hints import get__cluster
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        raise__cohesity_exception__handler
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'supported_by': 'community',
+    'status': ['preview']
+}
+
+DOCUMENTATION = '''
+module: cohesity_agent_package
+short_description: Cache the Cohesity Physical Agent installer on the controller
+description:
+    - Ansible Module used to download the Cohesity Physical Agent installer from a Cohesity Cluster once
+    - and keep it in a cache, usually on the Ansible controller or a local mirror.
+    - The cache holds one installer for each Cluster, Cluster software version, host type and package type.
+    - When the Cluster is upgraded, the installer of the new version is downloaded and the installers of
+    - earlier versions are removed.
+    - Tasks running at the same time for many hosts wait for a single download and then share it.
+    - The cached installer can be copied to the hosts or served from a mirror and installed with the
+    - I(installer_path) or I(download_uri) options of cohesity_agent.
+    - With I(repository_path), a native package is also published into a package repository which the hosts
+    - install from with their package manager, using the I(repository_url) option of cohesity_agent.
+version_added: '2.6.5'
+author:
+  - Cohesity, Inc
+
+options:
+  state:
+    description:
+      - Determines if the installer should be C(present) in or C(absent) from the cache.
+    choices:
+      - present
+      - absent
+    default: 'present'
+  operating_system:
+    description:
+      - Operating system of the hosts on which the agent will be installed, usually C(ansible_distribution).
+    required: yes
+  native_package:
+    description:
+      - Cache the native package of the operating system instead of the script based installer.
+    type: bool
+    default: no
+  cache_path:
+    description:
+      - Directory holding the cached installers.
+    type: path
+    default: ~/.ansible/cohesity/agents
+  cluster_version:
+    description:
+      - Software version of the Cluster used as the cache key.  When not set, it is read from the Cluster.
+  download_retries:
+    description:
+      - Number of times an interrupted download is resumed from the bytes already received before failing.
+    type: int
+    default: 3
+  repository_path:
+    description:
+      - Directory of the package repositories, usually served by a web server.  When set, the cached native
+      - package is published into the repository C(<repository_path>/<hostType>-<pkgType>) and the repository
+      - metadata is generated.
+      - Debian packages are published as a flat repository.  The metadata of C(kRPM) and C(kSuseRPM)
+      - repositories is generated with C(createrepo_c) or C(createrepo), which must be installed.
+      - Only applies to native packages and to I(state=present).
+    type: path
+    default: ''
+  repository_gpg_key:
+    description:
+      - Id of the gpg key, in the keyring of the node running the module, which signs the metadata of the
+      - repository.  The public key is published in the repository as C(cohesity-agent.asc) and returned as
+      - I(repository.gpg_key) for the I(repository_gpg_key) option of cohesity_agent.
+      - Without a key the repository is unsigned and hosts only install from it with I(repository_trusted).
+    type: str
+    default: ''
+
+extends_documentation_fragment:
+    - cohesity
+requirements: []
+
+'''
+
+EXAMPLES = '''
+
+# Cache the installer for the hosts of a play once on the controller and copy it to each host
+- name: Cache the Cohesity Agent installer
+  cohesity_agent_package:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    operating_system: "{{ ansible_distribution }}"
+    native_package: yes
+  delegate_to: localhost
+  register: agent_package
+
+- name: Copy the installer to the host
+  copy:
+    src: "{{ agent_package.path }}"
+    dest: "/tmp/{{ agent_package.filename }}"
+  register: agent_installer
+
+- name: Install the Cohesity Agent
+  cohesity_agent:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    native_package: yes
+    service_user: cagent
+    operating_system: "{{ ansible_distribution }}"
+    installer_path: "{{ agent_installer.dest }}"
+
+# Publish the package into a repository served by a mirror and install it with the package manager
+- name: Publish the Cohesity Agent package
+  cohesity_agent_package:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    operating_system: "{{ ansible_distribution }}"
+    native_package: yes
+    repository_path: /var/www/html/cohesity/repos
+    repository_gpg_key: repository@mirror.lab
+  delegate_to: mirror.lab
+  register: agent_package
+
+- name: Install the Cohesity Agent
+  cohesity_agent:
+    native_package: yes
+    service_user: cagent
+    operating_system: "{{ ansible_distribution }}"
+    repository_url: "http://mirror.lab/cohesity/repos/{{ agent_package.repository.relative_path }}"
+    repository_version: "{{ agent_package.repository.version }}"
+    repository_gpg_key: "{{ agent_package.repository.gpg_key }}"
+
+# Remove the cached installer
+- cohesity_agent_package:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    operating_system: CentOS
+    state: absent
+  delegate_to: localhost
+
+'''
+
+RETURN = '''
+
+{
+    "changed": true,
+    "cached": false,
+    "checksum": "sha256:3b9a1c4e5f0d2a7b8c6e4f1a0d9b8c7e6f5a4b3c2d1e0f9a8b7c6d5e4f3a2b1c",
+    "cluster_version": "6.5.1d_release-20210325_6f1a4d08",
+    "filename": "el-cohesity-agent-6.5.1d-1.x86_64.rpm",
+    "msg": "Downloaded the Cohesity Agent installer to the cache",
+    "package": {
+        "hostType": "kLinux",
+        "pkgType": "kRPM"
+    },
+    "path": "/home/ansible/.ansible/cohesity/agents/cohesity.lab/6.5.1d_release-20210325_6f1a4d08/kLinux-kRPM/el-cohesity-agent-6.5.1d-1.x86_64.rpm",
+    "relative_path": "cohesity.lab/6.5.1d_release-20210325_6f1a4d08/kLinux-kRPM/el-cohesity-agent-6.5.1d-1.x86_64.rpm",
+    "repository": {
+        "changed": true,
+        "gpg_key": "-----BEGIN PGP PUBLIC KEY BLOCK-----\n...\n-----END PGP PUBLIC KEY BLOCK-----\n",
+        "name": "cohesity-agent",
+        "path": "/var/www/html/cohesity/repos/kLinux-kRPM/el-cohesity-agent-6.5.1d-1.x86_64.rpm",
+        "relative_path": "kLinux-kRPM",
+        "version": "6.5.1d-1"
+    },
+    "size": 52428800
+}
+
+'''
+
+
+def remove__previous__versions(cache_dir):
+    '''
+    Remove the installers cached for other versions of the Cluster.
+
+    :return: list of the removed directories
+    '''
+    package_name = os.path.basename(cache_dir)
+    version_dir = os.path.dirname(cache_dir)
+    cluster_dir = os.path.dirname(version_dir)
+    removed = []
+    for version in os.listdir(cluster_dir):
+        previous = os.path.join(cluster_dir, version, package_name)
+        if os.path.join(cluster_dir, version) == version_dir or not os.path.isdir(previous):
+            continue
+        shutil.rmtree(previous)
+        removed.append(previous)
+        try:
+            os.remove(previous + '.lock')
+            os.rmdir(os.path.join(cluster_dir, version))
+        except OSError:
+            # => Other packages are still cached for this version.
+            pass
+    return removed
+
+
+def main():
+    # => Load the default arguments including those specific to the Cohesity Agent Package.
+    argument_spec = cohesity_common_argument_spec()
+    argument_spec.update(
+        dict(
+            operating_system=dict(type='str', required=True),
+            native_package=dict(type='bool', default=False),
+            cache_path=dict(type='path', default=DEFAULT_PACKAGE_CACHE_PATH),
+            cluster_version=dict(type='str', default=''),
+            download_retries=dict(type='int', default=DOWNLOAD_RETRIES),
+            repository_path=dict(type='path', default=''),
+            repository_gpg_key=dict(type='str', default='')
+        )
+    )
+
+    # => Create a new module object
+    module = AnsibleModule(argument_spec=argument_spec,
+                           supports_check_mode=True)
+
+    server = module.params.get('cluster')
+    package = get__agent__package(module.params.get('operating_system'),
+                                  module.params.get('native_package'))
+    cache_path = os.path.expanduser(module.params.get('cache_path'))
+    repository_path = module.params.get('repository_path')
+    if repository_path and package.get('pkgType') not in REPOSITORY_FORMATS:
+        module.fail_json(msg="Only the native kDEB, kRPM and kSuseRPM packages can be published to a repository",
+                         package=package)
+    results = dict(
+        changed=False,
+        cached=False,
+        package=package
+    )
+
+    try:
+        token = get__cohesity_auth__token(module)
+        version = module.params.get('cluster_version')
+        if not version:
+            cluster = get__cluster(dict(server=server, token=token,
+                                        validate_certs=module.params.get('validate_certs')))
+            version = cluster.get('clusterSoftwareVersion') or 'unknown'
+        results['cluster_version'] = version
+
+        cache = PackageCache(get__package__cache__dir(cache_path, server, version, package))
+        manifest = cache.get()
+        results['cached'] = manifest is not None
+
+        if module.params.get('state') == 'absent':
+            results['changed'] = results['cached']
+            if results['cached'] and not module.check_mode:
+                cache.clear()
+            manifest = None
+            results['msg'] = "Removed the Cohesity Agent installer from the cache" if results['cached'] \
+                else "The Cohesity Agent installer is not cached"
+        elif module.check_mode:
+            results['changed'] = not results['cached']
+            results['msg'] = "Check Mode: The Cohesity Agent installer is cached.  No changes" if results['cached'] \
+                else "Check Mode: This action would download the Cohesity Agent installer to the cache"
+        else:
+            headers = {
+                "Accept": "application/octet-stream",
+                "Authorization": "Bearer " + token,
+                "user-agent": "cohesity-ansible/v2.3.4"}
+            manifest, downloaded = cache.fetch(
+                get__agent__download__uri(server, package), headers,
+                default_filename='cohesity-agent-installer',
+                retries=module.params.get('download_retries'))
+            if downloaded:
+                results['removed'] = remove__previous__versions(cache.cache_dir)
+            results['changed'] = downloaded
+            results['msg'] = "Downloaded the Cohesity Agent installer to the cache" if downloaded \
+                else "The Cohesity Agent installer is cached"
+            if repository_path:
+                repository_dir = os.path.join(os.path.expanduser(repository_path), package['hostType'] + '-' +
+                                              package['pkgType'])
+                results['repository'] = publish__package(module, repository_dir, manifest['path'],
+                                                         package['pkgType'],
+                                                         module.params.get('repository_gpg_key'))
+                results['repository']['relative_path'] = os.path.basename(repository_dir)
+                results['changed'] = results['changed'] or results['repository']['changed']
+    except urllib_error.URLError as e:
+        # => Capture and report any error messages.
+        raise__cohesity_exception__handler(e.read(), module)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+
+    if manifest:
+        results.update(
+            path=manifest['path'],
+            relative_path=os.path.relpath(manifest['path'], cache_path),
+            filename=manifest['filename'],
+            size=manifest['size'],
+            checksum=manifest['checksum'])
+    module.exit_json(**results)
+
+
+if __name__ == '__main__':
+    main()
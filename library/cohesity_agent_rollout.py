@@ -0,0 +1,273 @@
+#!/usr/bin/python
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import urllib_error
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents
+    from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        raise__cohesity_exception__handler
+except ImportError:
+    from ansible.module_utils.storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents
+    from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        raise__cohesity_exception__handler
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'supported_by': 'community',
+    'status': ['preview']
+}
+
+DOCUMENTATION = '''
+module: cohesity_agent_rollout
+short_description: Upgrade the Cohesity Physical Agents of many hosts in waves
+description:
+    - Ansible Module used to upgrade the Cohesity Physical Agents of a fleet of hosts from the Cohesity Cluster
+    - in rolling waves.
+    - All hosts are found in a single Protection Source listing.  The agents of each wave are upgraded with
+    - one request and every poll checks all of them with one listing.
+    - After each wave, the upgrade status and the health (C(agents[].status)) of every upgraded agent are
+    - checked.  When the share of failed upgrades crosses I(max_failure_rate), the rollout stops before the
+    - next wave and the module fails.
+version_added: '2.6.5'
+author:
+  - Cohesity, Inc
+
+options:
+  hosts:
+    description:
+      - List of the names or endpoints of the Physical Protection Sources whose agents are upgraded.
+    type: list
+    required: yes
+  waves:
+    description:
+      - Share of the hosts, in percent, whose agents are upgraded by the end of each wave.
+      - For example C([5, 25, 100]) upgrades 5% of the hosts, then up to 25% and then the rest.
+      - Every wave upgrades at least one host.  When the last wave is below 100, the remaining hosts
+      - are left for a later run.
+    type: list
+    default: [5, 25, 100]
+  max_failure_rate:
+    description:
+      - Highest share of failed upgrades, in percent of the hosts upgraded so far, at which the rollout
+      - continues with the next wave.
+    type: int
+    default: 10
+  wait_minutes:
+    description:
+      - Number of minutes to wait for the agents of each wave to finish the upgrade and be healthy again.
+      - Agents which are not healthy in time are counted as failed.
+    type: int
+    default: 30
+
+extends_documentation_fragment:
+    - cohesity
+requirements: []
+
+'''
+
+EXAMPLES = '''
+
+# Upgrade the agents of all Linux hosts, 5% first, then 25% and then the rest
+- name: Roll out the Cohesity Agent upgrade
+  cohesity_agent_rollout:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    hosts: "{{ groups['linux'] }}"
+    waves: [5, 25, 100]
+    max_failure_rate: 5
+  delegate_to: localhost
+  run_once: yes
+
+# Only show which hosts each wave would upgrade
+- cohesity_agent_rollout:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    hosts: "{{ groups['linux'] }}"
+  check_mode: yes
+
+'''
+
+RETURN = '''
+
+{
+    "changed": true,
+    "failure_rate": 0.0,
+    "halted": false,
+    "msg": "Upgraded the Cohesity Agents of 40 hosts in 3 waves",
+    "polls": 11,
+    "requests": 15,
+    "skipped": [
+        {
+            "host": "linux41.lab",
+            "upgradability": "Current",
+            "version": "6.5.1d_release-20210325_6f1a4d08"
+        }
+    ],
+    "waves": [
+        {
+            "failed": 0,
+            "hosts": [
+                {
+                    "agent_id": 12,
+                    "done": true,
+                    "failed": false,
+                    "healthy": true,
+                    "host": "linux01.lab",
+                    "message": "",
+                    "previous_version": "6.4.1_release-20200318_1c4f5d57",
+                    "source_id": 11,
+                    "status": "Healthy",
+                    "upgrade_status": "Finished",
+                    "version": "6.5.1d_release-20210325_6f1a4d08"
+                }
+            ],
+            "wave": 1
+        }
+    ]
+}
+
+'''
+
+
+def get__rollout__waves(hosts, waves):
+    '''
+    Split the hosts into waves.
+
+    :param waves: share of the hosts, in percent, upgraded by the end of each wave
+    :return: list of the hosts of each wave
+    '''
+    output = []
+    done = 0
+    for percent in waves:
+        # => Round up so that every wave upgrades at least one host.
+        target = min(len(hosts), max(done + 1, -(-len(hosts) * int(percent) // 100)))
+        if target > done:
+            output.append(hosts[done:target])
+            done = target
+    return output
+
+
+def get__failure__rate(statuses):
+    '''
+    Return the share of failed upgrades in percent.
+    '''
+    if not statuses:
+        return 0.0
+    return round(100.0 * len([status for status in statuses if status['failed']]) / len(statuses), 2)
+
+
+def main():
+    # => Load the default arguments including those specific to the Cohesity Agent Rollout.
+    argument_spec = cohesity_common_argument_spec()
+    argument_spec.update(
+        dict(
+            hosts=dict(type='list', required=True),
+            waves=dict(type='list', default=[5, 25, 100]),
+            max_failure_rate=dict(type='int', default=10),
+            wait_minutes=dict(type='int', default=30)
+        )
+    )
+
+    # => Create a new module object
+    module = AnsibleModule(argument_spec=argument_spec,
+                           supports_check_mode=True)
+
+    try:
+        waves = [int(percent) for percent in module.params.get('waves')]
+    except ValueError:
+        module.fail_json(msg="The waves must be percentages", waves=module.params.get('waves'))
+    if not waves or waves != sorted(waves) or waves[0] <= 0 or waves[-1] > 100:
+        module.fail_json(msg="The waves must be increasing percentages between 1 and 100", waves=waves)
+
+    server = module.params.get('cluster')
+    validate_certs = module.params.get('validate_certs')
+    token = get__cohesity_auth__token(module)
+    results = dict(
+        changed=False,
+        halted=False,
+        failure_rate=0.0,
+        skipped=[],
+        waves=[]
+    )
+
+    try:
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        agents = get__physical__agents(session)
+        hosts = []
+        for host in module.params.get('hosts'):
+            if host not in hosts:
+                hosts.append(host)
+        # => Find every host before upgrading any agent.
+        missing = [host for host in hosts if host not in agents]
+        if missing:
+            module.fail_json(msg="The hosts are not registered as Physical Protection Sources with an agent",
+                             missing=missing)
+
+        upgradable = []
+        for host in hosts:
+            agent = agents[host]['agent']
+            if agent.get('upgradability') == 'kUpgradable':
+                upgradable.append(host)
+            else:
+                results['skipped'].append(dict(
+                    host=host, version=agent.get('version'),
+                    upgradability=(agent.get('upgradability') or '').lstrip('k') or None))
+
+        plan = get__rollout__waves(upgradable, waves)
+        if module.check_mode:
+            results['changed'] = bool(plan)
+            results['waves'] = [dict(wave=index + 1, hosts=wave) for index, wave in enumerate(plan)]
+            results['msg'] = "Check Mode: This action would upgrade the Cohesity Agents of " + \
+                str(sum(len(wave) for wave in plan)) + " hosts in " + str(len(plan)) + " waves"
+            module.exit_json(**results)
+
+        tracker = AgentUpgradeTracker(session, agents)
+        upgraded = []
+        for index, wave in enumerate(plan):
+            tracker.start(wave)
+            results['changed'] = True
+            statuses = tracker.wait(wave, module.params.get('wait_minutes') * 60)
+            upgraded.extend(statuses)
+            results['waves'].append(dict(
+                wave=index + 1,
+                hosts=statuses,
+                failed=len([status for status in statuses if status['failed']])))
+            # => Health gate: only continue while the failures stay below the threshold.
+            results['failure_rate'] = get__failure__rate(upgraded)
+            if results['failure_rate'] > module.params.get('max_failure_rate'):
+                results['halted'] = index + 1 < len(plan)
+                break
+        # => The first listing is not counted by the tracker.
+        results['polls'] = tracker.polls
+        results['requests'] = tracker.requests + 1
+    except urllib_error.URLError as e:
+        # => Capture and report any error messages.
+        raise__cohesity_exception__handler(e.read(), module)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+
+    if results['failure_rate'] > module.params.get('max_failure_rate'):
+        module.fail_json(
+            msg="Stopped the rollout after wave " + str(len(results['waves'])) + " of " + str(len(plan)) +
+            ": " + str(results['failure_rate']) + "% of the agent upgrades failed", **results)
+    results['msg'] = "Upgraded the Cohesity Agents of " + str(len(upgraded)) + " hosts in " + \
+        str(len(results['waves'])) + " waves"
+    module.exit_json(**results)
+
+
+if __name__ == '__main__':
+    main()
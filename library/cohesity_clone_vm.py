@@ -9,23 +9,22 @@ import json
 import time
 
 from ansible.module_utils.basic import AnsibleModule
-from cohesity_management_sdk.cohesity_client import CohesityClient
-from cohesity_management_sdk.controllers.base_controller import BaseController
-from cohesity_management_sdk.models.clone_task_request import CloneTaskRequest
-from cohesity_management_sdk.models.vmware_clone_parameters import VmwareCloneParameters
-from cohesity_management_sdk.models.restore_object_details import RestoreObjectDetails
 from cohesity_management_sdk.exceptions.api_exception import APIException
 from datetime import datetime
 
 
 try:
     from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec,\
-        raise__cohesity_exception__handler
+        raise__cohesity_exception__handler, wait__for__state
     from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    from module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
 except Exception:
     from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec,\
-        raise__cohesity_exception__handler
+        raise__cohesity_exception__handler, wait__for__state
     from ansible.module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    from ansible.module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
 
 
 SLEEP_TIME_SECONDS = 90
@@ -94,6 +93,7 @@ def get_snapshot_details(module, timestamp, vm_name, job_id):
     :param job_id: protection job id
     :return:
     '''
+    from cohesity_management_sdk.models.restore_object_details import RestoreObjectDetails
     try:
         restore_object = RestoreObjectDetails()
         object_details = cohesity_client.restore_tasks.search_objects(search=vm_name, job_ids=[job_id])
@@ -138,23 +138,12 @@ def get_resource_pool_id(module, resource_pool, protection_source_id):
     :return:
     '''
     try:
-        nodes = []
         protection_sources = cohesity_client.protection_sources.\
             list_protection_sources(id=protection_source_id, exclude_types=['kVirtualMachine'])
-        for node in protection_sources[0].nodes:
-            if 'nodes' in node:
-                nodes.append(node['nodes'])
-            if ('protectionSource' in node) and (node['protectionSource']['name'] == resource_pool) and\
-                    node['protectionSource']['vmWareProtectionSource']['type'] == 'kResourcePool':
-                return node['protectionSource']['id']
-        while len(nodes) != 0:
-            objects = nodes.pop()
-            for node in objects:
-                if 'nodes' in node:
-                    nodes.append(node['nodes'])
-                if ('protectionSource' in node) and (node['protectionSource']['name'] == resource_pool) and \
-                        node['protectionSource']['vmWareProtectionSource']['type'] == 'kResourcePool':
-                    return node['protectionSource']['id']
+        resource_pool_id = SourceTreeIndex(protection_sources[0].nodes).get__id(
+            resource_pool, 'kResourcePool')
+        if resource_pool_id is not None:
+            return resource_pool_id
         raise__cohesity_exception__handler(
             "Failed to find the resource pool " + str(resource_pool), module)
     except APIException as ex:
@@ -164,25 +153,46 @@ def get_resource_pool_id(module, resource_pool, protection_source_id):
         raise__cohesity_exception__handler(error, module)
 
 
-def wait(module):
+def get_clone_task__by_id(module, clone_id):
+    '''
+    Get clone task details by id without listing every clone task
+    :param module: object that holds parameters passed to the module
+    :param clone_id: clone task id
+    :return:
+    '''
+    try:
+        restore_tasks = cohesity_client.restore_tasks.get_restore_tasks(task_ids=[clone_id])
+        if restore_tasks:
+            return True, restore_tasks[0]
+        return False, ''
+    except Exception as error:
+        return False, ''
+
+
+def wait(module, clone_id):
     '''
     function to wait for clone task, waits for wait minutes passed to the module
     :param module: object that holds parameters passed to the module
+    :param clone_id: clone task id
     :return:
     '''
     if module.params.get('wait_for_job'):
-        wait_time = module.params.get('wait_minutes')
-        while wait_time > 0:
-            clone_exist, clone_details = get_clone_task(module, True)
+        def check():
+            clone_exist, clone_details = get_clone_task__by_id(module, clone_id)
             if not clone_exist:
-                return "The clone VMs request is accepted. Failed to check clone status during wait time"
+                return True, "The clone VMs request is accepted. Failed to check clone status during wait time"
             elif clone_exist and clone_details.error:
                 raise__cohesity_exception__handler(
                     "The clone VMs task failed", module)
             elif clone_exist and clone_details.status == 'kFinished' and not clone_details.error:
-                return "The clone VMs task is successful"
-            time.sleep(SLEEP_TIME_SECONDS)
-            wait_time = wait_time - 1
+                return True, "The clone VMs task is successful"
+            return False, None
+
+        # => The delay between checks grows up to SLEEP_TIME_SECONDS.
+        waited = wait__for__state(check, module.params.get('wait_minutes') * 60,
+                                  max_interval=SLEEP_TIME_SECONDS)
+        if waited['done']:
+            return waited['value']
         return "The clone VMs request is accepted. The task is not finished in the wait time"
     else:
         return "The clone VMs request is accepted"
@@ -194,6 +204,8 @@ def clone_vm(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.clone_task_request import CloneTaskRequest
+    from cohesity_management_sdk.models.vmware_clone_parameters import VmwareCloneParameters
     try:
         protection_job_details = get_protection_job_details(module)
         objects = []
@@ -221,12 +233,13 @@ def clone_vm(module):
             create_clone_task(body=clone_request)
         if not clone_details:
             raise__cohesity_exception__handler("Failed to clone VMs", module)
-        status_message = wait(module)
+        status_message = wait(module, clone_details.id)
         result = dict(
             changed=True,
             msg=status_message,
             id=clone_details.id,
-            task_name=module.params.get('name')
+            task_name=module.params.get('name'),
+            task_handle=get__task__handle(module.params.get('cluster'), [clone_details.id])
         )
         module.exit_json(**result)
     except APIException as ex:
@@ -291,6 +304,8 @@ def main():
     )
 
     global cohesity_client
+    # => The SDK is only imported once the arguments are valid.
+    from cohesity_management_sdk.controllers.base_controller import BaseController
     base_controller = BaseController()
     base_controller.global_headers['user-agent'] = 'cohesity-ansible/v2.3.4'
     cohesity_client = get_cohesity_client(module)
@@ -6,25 +6,31 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 from ansible.module_utils.basic import AnsibleModule
 
+import hashlib
 import json
+import os
 import traceback
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 try:
     # => TODO:  Find a better way to handle this!!!
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
     from module_utils.storage.cohesity.cohesity_hints import get__cluster, get__nodes, \
         get__prot_source__all, get__prot_policy__all, get__prot_job__all, \
-        get__storage_domain_id__all, get__protection_run__all
+        get__storage_domain_id__all, get__protection_run__all, get__session, ACTIVE_RUN_STATES
+    from module_utils.storage.cohesity.cohesity_source_tree import SOURCE_NODE_FIELDS
 
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
     from ansible.module_utils.storage.cohesity.cohesity_hints import get__cluster, get__nodes, \
         get__prot_source__all, get__prot_policy__all, get__prot_job__all, \
-        get__storage_domain_id__all, get__protection_run__all
+        get__storage_domain_id__all, get__protection_run__all, get__session, ACTIVE_RUN_STATES
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SOURCE_NODE_FIELDS
 
 ANSIBLE_METADATA = {
     'metadata_version': '1.0',
@@ -81,6 +87,74 @@ options:
       - will filter the Protection Sources, Jobs, and Executions data and return only current information if I(include_deleted=no)
     type: bool
     default: no
+  view:
+    description:
+      - Determines how much detail is returned for each object.  Full returns the complete API
+      - response.  Summary returns only the id, name, environment and last run status of each
+      - source, job, policy, storage domain and run.
+    choices:
+      - full
+      - summary
+    default: full
+  include_fields:
+    description:
+      - List of fields to keep for each returned object.  All other fields are removed.
+    type: list
+  exclude_fields:
+    description:
+      - List of fields to remove from each returned object.
+    type: list
+  environments:
+    description:
+      - List of environments used to filter the Protection Sources and Jobs.  The filter is
+      - applied by the Cluster.
+    type: list
+    choices:
+      - Physical
+      - VMware
+      - GenericNas
+  job_names:
+    description:
+      - List of Protection Job names to return.  The filter is applied by the Cluster.
+    type: list
+  job_ids:
+    description:
+      - List of Protection Job ids to return.  The filter is applied by the Cluster.
+    type: list
+  policy_names:
+    description:
+      - List of Protection Policy names to return.  The filter is applied by the Cluster.
+    type: list
+  storage_domain_names:
+    description:
+      - List of Storage Domain names to return.  The filter is applied by the Cluster.
+    type: list
+  run_limit:
+    description:
+      - Maximum number of Protection Job executions returned, newest first.  When not set, all
+      - executions matching the filters are returned.
+    type: int
+  since:
+    description:
+      - Only return Protection Job executions started after this time, in microseconds since
+      - the Unix epoch.
+    type: int
+  since_snapshot:
+    description:
+      - Path to a snapshot file used to return only the differences since the previous call.
+      - The file stores the ids and modification times of the collected objects and the start
+      - time of the newest Protection Job execution.  When set, only executions started after
+      - the previous call (or still running at the time) are requested, and the result includes
+      - a I(delta) with the added, changed and removed objects in place of the complete
+      - protection and storage domain details.
+      - The file is written on the host running the module, usually the control node.
+    type: path
+  max_parallel_requests:
+    description:
+      - Maximum number of API requests issued to the Cluster at the same time while gathering facts.
+      - Set to 1 to collect each resource one after another.
+    type: int
+    default: 10
 
 extends_documentation_fragment:
     - cohesity
@@ -102,6 +176,36 @@ EXAMPLES = '''
     state: minimal
     include_sources: True
 
+# Gather facts about the 50 most recent job executions started in the last day
+- cohesity_facts:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    state: minimal
+    include_runs: True
+    run_limit: 50
+    since: "{{ (ansible_date_time.epoch | int - 86400) * 1000000 }}"
+
+# Gather a summary of two Protection Jobs and their last run status
+- cohesity_facts:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    state: minimal
+    include_jobs: True
+    view: summary
+    job_names:
+      - myhost
+      - myvcenter
+
+# Return only the jobs, policies and executions which changed since the previous call
+- cohesity_facts:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    since_snapshot: /var/lib/cohesity/facts-cohesity.lab.json
+  delegate_to: localhost
+
 # Gather facts about all nodes and return active job executions in a cluster
 - cohesity_facts:
     cluster: cohesity.lab
@@ -144,16 +248,210 @@ RETURN = '''
     "storage_domains": [
           # Array of Cohesity Backup Storage Domains
     ],
+  },
+  "fetches": {
+    "cluster": {
+      "elapsed": 0.214,   # Seconds taken by the request
+      "error": null       # Error message when the request failed
+    },
+    # One entry for each collected resource (nodes, sources_physical,
+    # sources_vmware, sources_genericnas, policies, jobs, storage_domains, runs)
+  },
+  "delta": {
+    # Only returned when since_snapshot is set.  One entry for each collected resource.
+    "jobs": {
+      "added": [],      # Objects which were not part of the previous snapshot
+      "changed": [],    # Objects with a new modification time or content
+      "removed": []     # Ids of objects which no longer exist
+    }
   }
 }
 
 '''
 
 
+# => Protection Source environments collected by this module.
+ENVIRONMENTS = ['Physical', 'VMware', 'GenericNas']
+
+
+# => Version of the since_snapshot file format.
+SNAPSHOT_VERSION = 1
+
+
 class FactsError(Exception):
     pass
 
 
+def load__facts__snapshot(path, server):
+    '''
+    Load the snapshot of the previous call or an empty snapshot if none exists.
+    '''
+    snapshot = dict(version=SNAPSHOT_VERSION, server=server, objects=dict(),
+                    runs=dict(cursor=0, seen=dict()))
+    try:
+        with open(path) as snapshot_file:
+            previous = json.load(snapshot_file)
+    except (IOError, OSError, ValueError):
+        return snapshot
+    # => Ignore snapshots written by another version or for a different Cluster.
+    if previous.get('version') != SNAPSHOT_VERSION or previous.get('server') != server:
+        return snapshot
+    return previous
+
+
+def save__facts__snapshot(path, snapshot):
+    '''
+    Atomically replace the snapshot file.
+    '''
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_filename = path + ".tmp." + str(os.getpid())
+    with open(tmp_filename, 'w') as snapshot_file:
+        json.dump(snapshot, snapshot_file, separators=(',', ':'))
+    os.rename(tmp_filename, path)
+
+
+def fingerprint__object(obj):
+    '''
+    Return a compact value which changes whenever the object is modified.
+    '''
+    if obj.get('modificationTimeUsecs'):
+        return str(obj['modificationTimeUsecs'])
+    content = json.dumps(obj.get('protectionSource', obj), sort_keys=True)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+def get__snapshot__items(name, objects):
+    '''
+    Return (id, object) pairs for the collected resource.
+    '''
+    if name.startswith('sources_'):
+        if isinstance(objects, dict):
+            objects = objects.get('nodes', [])
+        return [(str(obj['protectionSource']['id']), obj) for obj in objects or []]
+    return [(str(obj['id']), obj) for obj in objects or []]
+
+
+def diff__objects(previous, items):
+    '''
+    Compare the (id, object) pairs against the previous fingerprints.
+
+    :return: tuple of the delta and the new fingerprints
+    '''
+    fingerprints = dict()
+    delta = dict(added=[], changed=[], removed=[])
+    for obj_id, obj in items:
+        fingerprints[obj_id] = fingerprint__object(obj)
+        if obj_id not in previous:
+            delta['added'].append(obj)
+        elif previous[obj_id] != fingerprints[obj_id]:
+            delta['changed'].append(obj)
+    delta['removed'] = sorted(obj_id for obj_id in previous if obj_id not in fingerprints)
+    return delta, fingerprints
+
+
+def diff__protection_runs(previous, runs):
+    '''
+    Compare the Protection Runs against the runs seen by the previous call.
+
+    Runs are never reported as removed as older runs expire from the Cluster.
+    The new cursor is the start time of the oldest run which is still active,
+    or the newest run when none are active, so that running jobs are checked
+    again by the next call.
+
+    :return: tuple of the delta and the new run snapshot
+    '''
+    seen = previous.get('seen', dict())
+    delta = dict(added=[], changed=[], removed=[])
+    cursor = previous.get('cursor', 0)
+    newest = None
+    oldest_active = None
+    current = dict()
+    for run in runs:
+        backup_run = run['backupRun']
+        started = backup_run.get('stats', dict()).get('startTimeUsecs', 0)
+        run_id = str(run.get('jobId')) + ':' + str(backup_run.get('jobRunId'))
+        current[run_id] = [started, backup_run.get('status'),
+                           backup_run.get('stats', dict()).get('endTimeUsecs', 0)]
+        if run_id not in seen:
+            delta['added'].append(run)
+        elif seen[run_id] != current[run_id]:
+            delta['changed'].append(run)
+        newest = started if newest is None else max(newest, started)
+        if backup_run.get('status') in ACTIVE_RUN_STATES:
+            oldest_active = started if oldest_active is None else min(oldest_active, started)
+
+    if oldest_active is not None:
+        cursor = oldest_active
+    elif newest is not None:
+        cursor = max(cursor, newest)
+    # => Only keep the runs which will be returned again by the next call.
+    seen.update(current)
+    seen = dict((run_id, value) for run_id, value in seen.items() if value[0] >= cursor)
+    return delta, dict(cursor=cursor, seen=seen)
+
+
+def get__last_run__status(job):
+    last_run = job.get('lastRun') or dict()
+    status = (last_run.get('backupRun') or dict()).get('status')
+    return status.lstrip('k') if status else None
+
+
+def summarize__sources(sources):
+    '''
+    Return the id, name and environment of each registered Protection Source.
+    '''
+    if isinstance(sources, dict):
+        # => Physical and GenericNas sources are returned below a single root node.
+        sources = sources.get('nodes', [])
+    summary = []
+    for node in sources or []:
+        source = node.get('protectionSource', dict())
+        summary.append(dict(id=source.get('id'), name=source.get('name'),
+                            environment=source.get('environment', '').lstrip('k') or None,
+                            last_run_status=None))
+    return summary
+
+
+def summarize__objects(objects, kind):
+    '''
+    Return the id, name, environment and last run status of each object.
+    '''
+    summary = []
+    for obj in objects or []:
+        if kind == 'runs':
+            backup_run = obj.get('backupRun', dict())
+            item = dict(id=backup_run.get('jobRunId'), name=obj.get('jobName'),
+                        environment=backup_run.get('environment'),
+                        last_run_status=backup_run.get('status'))
+        else:
+            item = dict(id=obj.get('id'), name=obj.get('name'),
+                        environment=obj.get('environment'),
+                        last_run_status=get__last_run__status(obj) if kind == 'jobs' else None)
+        if item['environment']:
+            item['environment'] = item['environment'].lstrip('k')
+        if item['last_run_status']:
+            item['last_run_status'] = item['last_run_status'].lstrip('k')
+        summary.append(item)
+    return summary
+
+
+def project__fields(objects, include_fields=None, exclude_fields=None):
+    '''
+    Keep only the included fields and drop the excluded fields of each object.
+    '''
+    if not include_fields and not exclude_fields:
+        return objects
+    if isinstance(objects, list):
+        return [project__fields(obj, include_fields, exclude_fields) for obj in objects]
+    if not isinstance(objects, dict):
+        return objects
+    return dict((key, value) for key, value in objects.items()
+                if (not include_fields or key in include_fields) and
+                (not exclude_fields or key not in exclude_fields))
+
+
 def main():
     argument_spec = cohesity_common_argument_spec()
     argument_spec.update(
@@ -163,7 +461,19 @@ def main():
             include_jobs=dict(type='bool', default=False),
             include_runs=dict(type='bool', default=False),
             active_only=dict(type='bool', default=False),
-            include_deleted=dict(type='bool', default=False)
+            include_deleted=dict(type='bool', default=False),
+            view=dict(choices=['full', 'summary'], default='full'),
+            include_fields=dict(type='list'),
+            exclude_fields=dict(type='list'),
+            environments=dict(type='list', choices=ENVIRONMENTS),
+            job_names=dict(type='list'),
+            job_ids=dict(type='list'),
+            policy_names=dict(type='list'),
+            storage_domain_names=dict(type='list'),
+            run_limit=dict(type='int'),
+            since=dict(type='int'),
+            since_snapshot=dict(type='path'),
+            max_parallel_requests=dict(type='int', default=MAX_PARALLEL_REQUESTS)
         )
     )
 
@@ -178,7 +488,7 @@ def main():
         password=module.params.get('password'),
         validate_certs=module.params.get('validate_certs'),
         active_only=module.params.get('active_only'),
-        is_deleted=module.params.get('is_deleted')
+        is_deleted=module.params.get('include_deleted')
     )
     params['token'] = get__cohesity_auth__token(module)
     try:
@@ -195,53 +505,112 @@ def main():
             if module.params.get('include_runs'):
                 include_runs = True
 
-        results['cluster'] = get__cluster(params)
-        results['cluster']['nodes'] = get__nodes(params)
+        # => None of the collected resources depend on each other so each is
+        # => requested concurrently.  Every request receives its own copy of
+        # => the parameters as some of the helpers update the dictionary.
+        summary = module.params.get('view') == 'summary'
+        snapshot_path = module.params.get('since_snapshot')
+        since = module.params.get('since')
+        if snapshot_path:
+            snapshot = load__facts__snapshot(snapshot_path, params['server'])
+            since = max(since or 0, snapshot['runs']['cursor']) or None
+        environments = module.params.get('environments') or ENVIRONMENTS
+        requests = [
+            ('cluster', get__cluster, [dict(params)]),
+            ('nodes', get__nodes, [dict(params)])
+        ]
+        if include_sources:
+            for env_type in environments:
+                # => The summary view only needs the identity of each source so
+                # => the response is streamed and reduced while it is read.
+                requests.append(('sources_' + env_type.lower(), get__prot_source__all,
+                                 [dict(params, environment=env_type,
+                                       fields=SOURCE_NODE_FIELDS if summary else None)]))
+        requests.append(('policies', get__prot_policy__all, [dict(
+            params, names=module.params.get('policy_names'))]))
+        # => This value can be filtered by choosing
+        # => `active_only=True/False` and/or `is_deleted=True/False`
+        if include_jobs:
+            requests.append(('jobs', get__prot_job__all, [dict(
+                params, environments=module.params.get('environments'),
+                names=module.params.get('job_names'), ids=module.params.get('job_ids'),
+                include_last_run=summary)]))
+        requests.append(('storage_domains', get__storage_domain_id__all, [dict(
+            params, names=module.params.get('storage_domain_names'))]))
+        if include_runs:
+            requests.append(('runs', get__protection_run__all, [dict(
+                params, run_limit=module.params.get('run_limit'), since=since)]))
+
+        # => Create the shared session before fanning out so that every request
+        # => uses the same connection pool.
+        get__session(params)
+        outcomes = run__concurrent__requests(
+            requests, module.params.get('max_parallel_requests'))
+        results['fetches'] = dict(
+            (name, dict(elapsed=outcome['elapsed'], error=outcome['error']))
+            for name, outcome in outcomes.items())
+
+        def present(name, objects):
+            if summary:
+                if name.startswith('sources_'):
+                    objects = summarize__sources(objects)
+                elif name in ['policies', 'jobs', 'storage_domains', 'runs']:
+                    objects = summarize__objects(objects, name)
+            return project__fields(objects, module.params.get('include_fields'),
+                                   module.params.get('exclude_fields'))
+
+        def collected(name):
+            return present(name, outcomes[name]['result'])
+
+        results['cluster'] = outcomes['cluster']['result'] or dict()
+        results['cluster']['nodes'] = outcomes['nodes']['result']
 
         # => Create a root node for all protection related items
         results['cluster']['protection'] = dict()
 
-        # => We will group each Protection Source based on the
-        # => environment type so to do this, we will declare
-        # => sources as a dictionary.
-        results['cluster']['protection']['sources'] = dict()
+        if not snapshot_path:
+            # => We will group each Protection Source based on the
+            # => environment type so to do this, we will declare
+            # => sources as a dictionary.
+            results['cluster']['protection']['sources'] = dict()
+            if include_sources:
+                for env_type in environments:
+                    results['cluster']['protection'][
+                        'sources'][env_type] = collected('sources_' + env_type.lower())
 
-        # => Iterate each supported Environment type and collect each grouped
-        # => by type.
-        if include_sources:
-            env_types = ['Physical', 'VMware', 'GenericNas']
-            for env_type in env_types:
-                params['environment'] = env_type
-                results['cluster']['protection'][
-                    'sources'][env_type] = get__prot_source__all(params)
-                # => Let's remove this key since it is not needed for further processing.
-                params.pop('environment')
-
-        # => Collect all Cohesity Protection Policies
-        results['cluster']['protection'][
-            'policies'] = get__prot_policy__all(params)
-
-        # => Collect all registered Protection Jobs
-        # => This value can be filtered by choosing
-        # => `active_only=True/False` and/or `is_deleted=True/False`
-        if include_jobs:
-            results['cluster']['protection'][
-                'jobs'] = get__prot_job__all(params)
+            results['cluster']['protection']['policies'] = collected('policies')
+            if include_jobs:
+                results['cluster']['protection']['jobs'] = collected('jobs')
+            results['cluster']['storage_domains'] = collected('storage_domains')
+            if include_runs:
+                results['cluster']['protection']['runs'] = collected('runs')
 
-        # => Collect all Storage Domains
-        results['cluster'][
-            'storage_domains'] = get__storage_domain_id__all(params)
+        failed = sorted(name for name, outcome in outcomes.items() if outcome['error'])
+        if failed:
+            raise FactsError("Failed to collect: " + ", ".join(failed))
 
-        # => Collect all Protection Jobs execution details
-        # => This value can be filtered by choosing
-        # => `active_only=True/False` and/or `is_deleted=True/False`
-        if include_runs:
-            results['cluster']['protection'][
-                'runs'] = get__protection_run__all(params)
+        # => Compare the collected objects with the previous snapshot and
+        # => only replace the snapshot once everything was collected.
+        if snapshot_path:
+            results['delta'] = dict()
+            for name, outcome in outcomes.items():
+                if name in ['cluster', 'nodes']:
+                    continue
+                if name == 'runs':
+                    delta, snapshot['runs'] = diff__protection_runs(
+                        snapshot['runs'], outcome['result'])
+                else:
+                    delta, snapshot['objects'][name] = diff__objects(
+                        snapshot['objects'].get(name, dict()),
+                        get__snapshot__items(name, outcome['result']))
+                delta['added'] = present(name, delta['added'])
+                delta['changed'] = present(name, delta['changed'])
+                results['delta'][name] = delta
+            save__facts__snapshot(snapshot_path, snapshot)
 
     except Exception as error:
         module.fail_json(msg="Failure while collecting Cohesity Facts",
-                         exception=traceback.format_exc())
+                         exception=traceback.format_exc(), **results)
     module.exit_json(**results)
 
 
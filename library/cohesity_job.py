@@ -8,24 +8,30 @@ __metaclass__ = type
 import json
 from collections import defaultdict
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
-    from module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
+    from module_utils.storage.cohesity.cohesity_hints import get__prot_source_ids__by_endpoints, \
         get__prot_source_root_id__by_environment, get__prot_policy_id__by_name, \
         get__storage_domain_id__by_name, get__protection_jobs__by_environment, \
-        get__protection_run__all__by_id, get_cohesity_client
+        get__protection_run__all__by_id, ACTIVE_RUN_STATES
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, load__source_tree
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
-    from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
+    from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source_ids__by_endpoints, \
         get__prot_source_root_id__by_environment, get__prot_policy_id__by_name, \
         get__storage_domain_id__by_name, get__protection_jobs__by_environment, \
-        get__protection_run__all__by_id, get_cohesity_client
+        get__protection_run__all__by_id, ACTIVE_RUN_STATES
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, load__source_tree
 
 
 ANSIBLE_METADATA = {
@@ -134,6 +140,13 @@ options:
       - Optional and only valid when I(state=stopped)
     type: bool
     default: no
+  wait_minutes:
+    description:
+      - Number of minutes to wait for the Protection Job to start or stop.  The latest run is polled with
+      - an increasing delay between checks and the wait ends as soon as the transition is seen.
+      - Optional and only valid when I(state=started) or I(state=stopped)
+    type: int
+    default: 2
 
 extends_documentation_fragment:
     - cohesity
@@ -207,6 +220,9 @@ EXAMPLES = '''
 
 RETURN = '''
 Returns the registered Protection Job ID
+
+For VMware jobs, source_tree_downloads reports the number of Protection Source
+trees downloaded to resolve the include, exclude and include_tags names.
 '''
 
 
@@ -268,58 +284,45 @@ def check__protection_job__exists(module, self):
 
 
 def wait__for_job_state__transition(module, self, job_runs, state='start'):
+    '''
+    Wait for the latest Protection Run of the job to start or stop.
+
+    :param job_runs: ids of the runs which existed before the job was started
+                     or of the runs which are being stopped
+    '''
     if not job_runs:
         job_runs = []
     if state != 'start':
         state = 'stop'
-    import time
-    loop_cnt = 0
-    while loop_cnt <= 20:
-        payload = self.copy()
-        # => If the backup finishes before we check, we need to look
-        # => at previous backups to see if the last job is successful.
-        payload['active_only'] = False
-        if state == 'stop':
-            # => If we are checking to see if the job is stopped, then
-            # => Simply filtering out the active jobs will suffice.
-            payload['active_only'] = True
-        payload['is_deleted'] = False
-        for job_run in job_runs:
-            currently_active = get__protection_run__all__by_id(
-                module, payload)
-            if state == 'start':
-                if currently_active:
-                    status = currently_active[0][
-                        'backupRun']['status'].lstrip('k')
-                    valid_states = ['Accepted', 'Success', 'Running']
-                    for check_state in valid_states:
-                        if status == check_state:
-                            try:
-                                job_runs.pop(job_run)
-                            except Exception as e:
-                                if len(job_runs) == 1:
-                                    job_runs = []
-            else:
-                if not currently_active:
-                    try:
-                        job_runs.pop(job_run)
-                    except Exception as e:
-                        if len(job_runs) == 1:
-                            job_runs = []
-        if not job_runs:
-            break
-        else:
-            time.sleep(5)
-            loop_cnt += 1
-
-    if loop_cnt == 21:
+    payload = self.copy()
+    payload['active_only'] = False
+    payload['is_deleted'] = False
+    # => Only the most recent run is needed to follow the transition.
+    payload['run_limit'] = 1
+
+    def check():
+        latest_run = get__protection_run__all__by_id(module, payload)
+        if not latest_run:
+            return state == 'stop', None
+        backup_run = latest_run[0]['backupRun']
+        is_new_run = backup_run.get('jobRunId') not in job_runs
+        if state == 'start':
+            # => A new run in any state, including a terminal one, means
+            # => that the job has started.
+            return is_new_run, backup_run.get('status')
+        return is_new_run or backup_run.get('status') not in ACTIVE_RUN_STATES, \
+            backup_run.get('status')
+
+    waited = wait__for__state(check, module.params.get('wait_minutes', 2) * 60)
+    if not waited['done']:
         module.fail_json(
             msg="Failed to successfully " +
             state +
             " the Cohesity Protection Job",
             changed=False,
             id=self['id'],
-            loop_cnt=loop_cnt)
+            status=waited['value'],
+            attempts=waited['attempts'])
 
 
 def convert_windows_file_paths(path):
@@ -363,43 +366,34 @@ def create_paths_parameter(module, update_source_ids):
     return sources_with_paths
 
 
-def parse_vmware_protection_sources_json(response, vm_names):
-    ids = []
-    nodes = []
-    for node in response:
-        if 'nodes' in node:
-            nodes.append(node['nodes'])
-        if ('protectionSource' in node) and (node['protectionSource']['name'] in vm_names):
-            ids.append(node['protectionSource']['id'])
+# => Protection Source trees downloaded during this module run keyed by the vCenter id.
+_source_trees = dict()
 
-    while len(nodes) != 0:
-        objects = nodes.pop()
-        for node in objects:
-            if 'nodes' in node:
-                nodes.append(node['nodes'])
-            if ('protectionSource' in node) and (node['protectionSource']['name'] in vm_names):
-                ids.append(node['protectionSource']['id'])
-    return list(set(ids))
+
+def get__vmware_source_tree(module, token, parent_source_id):
+    '''
+    Return the SourceTreeIndex for the vCenter.  The tree is downloaded once per
+    module run and shared by the include, exclude and tag lookups.
+    '''
+    if parent_source_id not in _source_trees:
+        session = get__cohesity_rest__session(
+            module.params.get('cluster'), token, module.params.get('validate_certs'))
+        _source_trees[parent_source_id] = SourceTreeIndex(
+            load__source_tree(session, dict(id=parent_source_id)))
+    return _source_trees[parent_source_id]
 
 
-def _get_tag_ids(module, tags, parentSourceId):
+def _get_tag_ids(module, tags, parentSourceId, token):
     """
     Function to fetch VMware tag ids for list of tag names.
-    """ 
+    """
     try:
-        client = get_cohesity_client(module)
-        if not client:
-            module.fail_json(
-                msg="Error while creating cohesity client, err msg '%s'" % client,
-                changed=False)
-        result = client.protection_sources.list_protection_sources(
-            id=parentSourceId)
-        if not result or not result[0].nodes:
+        source_tree = get__vmware_source_tree(module, token, parentSourceId)
+        if not source_tree.sources:
             module.fail_json(
                 msg="Failed to fetch tags for source with id " + str(
                     parentSourceId), changed=False)
-        nodes = result[0].nodes
-        return parse_vmware_protection_sources_json(nodes, tags)
+        return source_tree.get__ids(tags)
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
         raise__cohesity_exception__handler(e.read(), module)
@@ -408,27 +402,10 @@ def _get_tag_ids(module, tags, parentSourceId):
 
 
 def get_vmware_ids(module, job_meta_data, job_details, vm_names):
-    server = module.params.get('cluster')
-    validate_certs = module.params.get('validate_certs')
-    token = job_details['token']
     try:
-        uri = "https://" + server + "/irisservices/api/v1/public/protectionSources?id=" + \
-            str(job_meta_data['parentSourceId'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(
-            url=uri,
-            method='GET',
-            headers=headers,
-            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        if not response.getcode() == 200:
-            raise ProtectionException(
-                msg="Failed to get VMware protection source details")
-        response = json.loads(response.read())
-        ids = parse_vmware_protection_sources_json(response, vm_names)
-        return ids
+        source_tree = get__vmware_source_tree(
+            module, job_details['token'], job_meta_data['parentSourceId'])
+        return source_tree.get__ids(vm_names)
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
         raise__cohesity_exception__handler(e.read(), module)
@@ -441,21 +418,9 @@ def get_vmware_vm_ids(module, job_meta_data, job_details, vm_names):
     validate_certs = module.params.get('validate_certs')
     token = job_details['token']
     try:
-        uri = "https://" + server + \
-              "/irisservices/api/v1/public/protectionSources/virtualMachines?vCenterId=" + str(job_meta_data['parentSourceId'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(
-            url=uri,
-            method='GET',
-            headers=headers,
-            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        if not response.getcode() == 200:
-            raise ProtectionException(
-                msg="Failed to get VMware protection source details")
-        response = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.get("/public/protectionSources/virtualMachines",
+                               params=dict(vCenterId=job_meta_data['parentSourceId']))
         vm_ids = []
         vm_names_lowercase = [v.lower() for v in vm_names]
         for vm in response:
@@ -482,13 +447,8 @@ def get_view_storage_domain_id(module, self):
     token = self['token']
     view_name = module.params.get('view_name')
     try:
-        uri = "https://" + server + "/irisservices/api/v1/public/views/" + view_name
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(url=uri, method="GET", headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-        response = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.get("/public/views/" + view_name)
         return response['viewBoxId']
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
@@ -535,10 +495,7 @@ def register_job(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + "/irisservices/api/v1/public/protectionJobs"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = self.copy()
 
         # => Remove the Authorization Token from the Payload
@@ -554,7 +511,7 @@ def register_job(module, self):
             if len(module.params.get('include_tags')) != 0:
                 tag_list = list()
                 for tags in module.params.get('include_tags'):
-                    tag_ids = _get_tag_ids(module, tags, self['parentSourceId'])
+                    tag_ids = _get_tag_ids(module, tags, self['parentSourceId'], token)
                     tag_list.append(tag_ids)
                 payload['vmTagIds'] = tag_list
             if len(module.params.get('include')) != 0:
@@ -563,11 +520,7 @@ def register_job(module, self):
             if len(module.params.get('exclude')) != 0:
                 vms = module.params.get('exclude')
                 payload['excludeSourceIds'] = get_vmware_ids(module, parent_source_id, self, vms)
-        data = json.dumps(payload)
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        response = session.post("/public/protectionJobs", data=payload)
 
         # => This dictionary will allow us to return a standardized output
         # => for all Protection Job.
@@ -595,6 +548,7 @@ def start_job(module, self):
     payload = self.copy()
     payload['active_only'] = True
     payload['is_deleted'] = False
+    payload['run_limit'] = 1
     currently_active = get__protection_run__all__by_id(module, payload)
     if currently_active:
         results = dict(
@@ -604,12 +558,13 @@ def start_job(module, self):
         )
         module.exit_json(**results)
 
+    # => Remember the latest run so that the new run can be told apart from it.
+    payload['active_only'] = False
+    previous_runs = [job_run['backupRun'].get('jobRunId')
+                     for job_run in get__protection_run__all__by_id(module, payload) or []]
+
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionJobs/run/" + str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         source_ids = payload.get('sourceIds', [])
         payload = dict()
         payload['runNowParameters'] = [{'sourceId':source_id} for source_id in source_ids]
@@ -618,15 +573,9 @@ def start_job(module, self):
 
         payload['runType'] = "k" + self['runType']
 
-        data = json.dumps(payload)
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-        # => There is no data output so if we get a 204 then we are
-        # => happy.
-        if not response.getcode() == 204:
-            raise ProtectionException(
-                msg="Something went wrong with the attempt to start protection job %s" %
-                self['id'])
+        # => There is no data output so if the request does not raise
+        # => an HTTPError then we are happy.
+        session.post("/public/protectionJobs/run/" + str(self['id']), data=payload)
 
         # => This dictionary will allow us to return a standardized output
         # => for all Protection Job.
@@ -634,11 +583,11 @@ def start_job(module, self):
             id=self['id']
         )
 
-        # => It can take a few moments for the job to actually stop.  In this case,
-        # => We will introduce a delay and check every (5) seconds for up to a minute
-        # => to see if the job stopped.
+        # => It can take a few moments for the job to actually start.  In this case,
+        # => we will poll the latest run, backing off between checks, for up to
+        # => `wait_minutes` to see if the job started.
         wait__for_job_state__transition(
-            module, self, [self['id']], state='start')
+            module, self, previous_runs, state='start')
 
         return output
     except urllib_error.URLError as e:
@@ -653,11 +602,7 @@ def update_job(module, job_details, update_source_ids=None):
     validate_certs = module.params.get('validate_certs')
     token = job_details['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionJobs/" + str(job_details['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = job_details.copy()
         del payload['token']
         if module.params.get('environment') == 'PhysicalFiles' and module.params.get('delete_sources') == False:
@@ -669,19 +614,8 @@ def update_job(module, job_details, update_source_ids=None):
                 payload['sourceSpecialParameters'] = updated_source_params
             if module.params.get('state') == 'present':
                 payload['sourceSpecialParameters'].extend(create_paths_parameter(module, update_source_ids))
-        data = json.dumps(payload)
-        response = open_url(
-            url=uri,
-            data=data,
-            headers=headers,
-            validate_certs=validate_certs,
-            method="PUT", timeout=REQUEST_TIMEOUT)
-        if not response.getcode() == 200:
-            raise ProtectionException(
-                msg="Something went wrong with the attempt to get protection job %s" %
-                job_details['id'])
-
-        response = json.loads(response.read())
+        response = session.put(
+            "/public/protectionJobs/" + str(job_details['id']), data=payload)
         output = dict(
             id=response['id'],
             name=response['name'],
@@ -700,20 +634,8 @@ def get_prot_job_details(self, module):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionJobs/" + str(self['id'])
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(url=uri, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-        if not response.getcode() == 200:
-            raise ProtectionException(
-                msg="Something went wrong with the attempt to get protection job %s" %
-                self['id'])
-
-        output = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        output = session.get("/public/protectionJobs/" + str(self['id']))
         return output
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
@@ -743,12 +665,7 @@ def stop_job(module, self):
             changed=False,
             msg="The Protection Job for this host is active and cannot be stopped")
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionRuns/cancel/" + \
-            str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = self.copy()
 
         # => Remove the Authorization Token from the Payload
@@ -762,24 +679,17 @@ def stop_job(module, self):
         for backup_run in currently_active:
             payload['jobRunId'] = backup_run['backupRun']['jobRunId']
 
-            data = json.dumps(payload)
-            response = open_url(url=uri, data=data, headers=headers,
-                                validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-            # => There is no data output so if we get a 204 then we are
-            # => happy.
-            if not response.getcode() == 204:
-                raise ProtectionException(
-                    msg="Something went wrong with the attempt to cancel protection job %s" % str(
-                        self['id']))
+            # => There is no data output so if the request does not raise
+            # => an HTTPError then we are happy.
+            session.post("/public/protectionRuns/cancel/" + str(self['id']), data=payload)
 
             # => This dictionary will allow us to return a standardized output
             # => for all Protection Job.
             output['jobRunIds'].append(payload['jobRunId'])
 
         # => It can take a few moments for the job to actually stop.  In this case,
-        # => We will introduce a delay and check every (5) seconds for up to a minute
-        # => to see if the job stopped.
+        # => we will poll the latest run, backing off between checks, for up to
+        # => `wait_minutes` to see if the job stopped.
         wait__for_job_state__transition(
             module, self, output['jobRunIds'], state='stop')
 
@@ -796,23 +706,12 @@ def unregister_job(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionJobs/" + str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = dict(
             deleteSnapshots=self['deleteSnapshots']
         )
-        data = json.dumps(payload)
-
-        response = open_url(
-            url=uri,
-            method='DELETE',
-            data=data,
-            headers=headers,
-            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
+        response = session.delete(
+            "/public/protectionJobs/" + str(self['id']), data=payload)
 
         return response
     except urllib_error.URLError as e:
@@ -844,13 +743,15 @@ def update_vmware_job(module, job_meta_data, job_details):
         if len(module.params.get('include_tags')) != 0:
             tag_list = list()
             for tags in module.params.get('include_tags'):
-                tag_ids = _get_tag_ids(module, tags, job_meta_data['parentSourceId'])
+                tag_ids = _get_tag_ids(module, tags, job_meta_data['parentSourceId'],
+                                       job_details['token'])
                 tag_list.append(tag_ids)
             job_meta_data['vmTagIds'] = tag_list
         response = update_job(module, job_meta_data, "")
         results = dict(
             changed=True,
             msg="Successfully updated the protection job",
+            source_tree_downloads=len(_source_trees),
             **response)
         module.exit_json(**results)
     else:
@@ -866,10 +767,10 @@ def delete_sources(module, job_meta_data, job_details):
     missing_sources = []
     job_details['environment'] = 'Physical'
     try:
-        for source in module.params.get('protection_sources'):
-            job_details['endpoint'] = source['endpoint']
-            source_id = get__prot_source_id__by_endpoint(
-                module, job_details)
+        protection_sources = module.params.get('protection_sources')
+        source_ids = get__prot_source_ids__by_endpoints(
+            module, job_details, [source['endpoint'] for source in protection_sources])
+        for source, source_id in zip(protection_sources, source_ids):
             if source_id in job_meta_data['sourceIds']:
                 job_meta_data['sourceIds'].remove(source_id)
             else:
@@ -921,17 +822,15 @@ def update_job_util(module, job_details, job_exists):
         environment=job_details['environment'],
         token=job_details['token']
     )
-    i = 0
-    for source in module.params.get('protection_sources'):
-        prot_source['endpoint'] = source['endpoint']
-        source_id = get__prot_source_id__by_endpoint(
-            module, prot_source)
+    protection_sources = module.params.get('protection_sources')
+    source_ids = get__prot_source_ids__by_endpoints(
+        module, prot_source, [source['endpoint'] for source in protection_sources])
+    for source, source_id in zip(protection_sources, source_ids):
         if source_id:
             job_details['sourceIds'].append(source_id)
-            module.params.get('protection_sources')[i]['endpoint'] = source_id
+            source['endpoint'] = source_id
         else:
-            module.params.get('protection_sources')[i]['endpoint'] = None
-        i += 1
+            source['endpoint'] = None
     job_details['parentSourceId'] = get__prot_source_root_id__by_environment(
         module, job_details)
     job_details['environment'] = module.params.get('environment')
@@ -1044,6 +943,7 @@ def main():
             ondemand_run_type=dict(
                 choices=['Regular', 'Full', 'Log', 'System'], default='Regular'),
             cancel_active=dict(type='bool', default=False),
+            wait_minutes=dict(type='int', default=2),
             validate_certs=dict(type='bool', default=False),
             append_to_existing=dict(type='bool', default=False),
             exclude=dict(type=list, default=''),
@@ -1132,17 +1032,15 @@ def main():
                     environment=job_details['environment'],
                     token=job_details['token']
                 )
-                i = 0
-                for source in module.params.get('protection_sources'):
-                    prot_source['endpoint'] = source['endpoint']
-                    source_id = get__prot_source_id__by_endpoint(
-                        module, prot_source)
+                protection_sources = module.params.get('protection_sources')
+                source_ids = get__prot_source_ids__by_endpoints(
+                    module, prot_source, [source['endpoint'] for source in protection_sources])
+                for source, source_id in zip(protection_sources, source_ids):
                     if source_id:
                         job_details['sourceIds'].append(source_id)
-                        module.params.get('protection_sources')[i]['endpoint'] = source_id
+                        source['endpoint'] = source_id
                     else:
-                        module.params.get('protection_sources')[i]['endpoint'] = None
-                    i += 1
+                        source['endpoint'] = None
 
                 job_details['parentSourceId'] = get__prot_source_root_id__by_environment(
                     module, job_details)
@@ -1199,12 +1097,11 @@ def main():
                     environment=job_details['environment'],
                     token=job_details['token']
                 )
-                for source in module.params.get('protection_sources'):
-                    prot_source['endpoint'] = source['endpoint']
-                    source_id = get__prot_source_id__by_endpoint(
-                        module, prot_source)
-                    if source_id:
-                        job_details['sourceIds'].append(source_id)
+                source_ids = get__prot_source_ids__by_endpoints(
+                    module, prot_source,
+                    [source['endpoint'] for source in module.params.get('protection_sources')])
+                job_details['sourceIds'].extend(
+                    source_id for source_id in source_ids if source_id)
                 job_details['parentSourceId'] = get__prot_source_root_id__by_environment(
                     module, job_details)
                 job_details['environment'] = module.params.get('environment')
@@ -1260,13 +1157,12 @@ def main():
                 job_details['sourceIds'] = ids
             elif 'Physical' in module.params.get('environment'):
                 prot_source['environment'] = 'Physical'
-                for source in module.params.get('protection_sources'):
-                    if source and type(source) == dict:
-                        prot_source['endpoint'] = source['endpoint']
-                        source_id = get__prot_source_id__by_endpoint(
-                            module, prot_source)
-                        if source_id:
-                            job_details['sourceIds'].append(source_id)
+                endpoints = [source['endpoint'] for source in module.params.get('protection_sources')
+                             if source and type(source) == dict]
+                if endpoints:
+                    source_ids = get__prot_source_ids__by_endpoints(module, prot_source, endpoints)
+                    job_details['sourceIds'].extend(
+                        source_id for source_id in source_ids if source_id)
             response = start_job(module, job_details)
 
             results = dict(
@@ -1304,6 +1200,8 @@ def main():
         module.fail_json(msg="Invalid State selected: {0}".format(
             module.params.get('state')), changed=False)
 
+    if module.params.get('environment') == 'VMware':
+        results['source_tree_downloads'] = len(_source_trees)
     module.exit_json(**results)
 
 
@@ -0,0 +1,472 @@
+#!/usr/bin/python
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import urllib_error
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
+    from module_utils.storage.cohesity.cohesity_hints import get__prot_job__all, get__prot_policy__all, \
+        get__storage_domain_id__all, get__prot_source__roots, get__prot_source__all
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
+    from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_job__all, get__prot_policy__all, \
+        get__storage_domain_id__all, get__prot_source__roots, get__prot_source__all
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
+
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'supported_by': 'community',
+    'status': ['preview']
+}
+
+DOCUMENTATION = '''
+module: cohesity_jobs
+short_description: Bulk management of Cohesity Protection Jobs
+description:
+    - Ansible Module used to register, update and remove many Cohesity Protection Jobs on a Cohesity Cluster
+    - in a single task.
+    - The Protection Jobs, Policies, Storage Domains and Protection Sources are each requested once, the
+    - changes are computed from the desired list of jobs and only the required creates, updates and deletes
+    - are sent to the Cluster, in parallel.
+version_added: '2.6.5'
+author:
+  - Cohesity, Inc
+
+options:
+  jobs:
+    description:
+      - List of dictionaries describing the desired Protection Jobs.
+      - Each dictionary accepts the keys I(name) (required), I(state), I(environment), I(protection_sources),
+      - I(protection_policy), I(storage_domain), I(description), I(time_zone), I(start_time) and
+      - I(delete_backups) with the same meaning and defaults as the cohesity_job module.
+      - Existing jobs are updated by adding the missing sources.  Policies, schedules and
+      - VMware include and exclude lists are only managed by the cohesity_job module.
+    type: list
+    required: yes
+  max_parallel_requests:
+    description:
+      - Maximum number of requests sent to the Cluster at the same time.
+    type: int
+    default: 10
+
+extends_documentation_fragment:
+    - cohesity
+requirements: []
+'''
+
+EXAMPLES = '''
+# Protect a list of Physical Servers, one job per server
+- cohesity_jobs:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    jobs:
+      - name: myhost1
+        environment: PhysicalFiles
+        protection_sources:
+          - endpoint: myhost1.domain.lab
+            paths:
+              - includeFilePath: /home
+      - name: myhost2
+        environment: Physical
+        protection_sources:
+          - endpoint: myhost2.domain.lab
+        protection_policy: Gold
+
+# Remove Protection Jobs and their Backups
+- cohesity_jobs:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    jobs:
+      - name: myhost1
+        state: absent
+        delete_backups: yes
+      - name: myhost2
+        state: absent
+'''
+
+RETURN = '''
+
+{
+    "changed": true,
+    "msg": "Cohesity Protection Jobs: 1 created, 0 updated, 0 deleted, 1 unchanged",
+    "requests": 1,
+    "jobs": [
+        {
+            "action": "create",
+            "changed": true,
+            "error": null,
+            "id": 24,
+            "name": "myhost1"
+        },
+        {
+            "action": "none",
+            "changed": false,
+            "error": null,
+            "id": 25,
+            "name": "myhost2"
+        }
+    ]
+}
+
+'''
+
+# => Default values applied to each job in the `jobs` list.
+JOB_DEFAULTS = dict(
+    state='present',
+    environment='PhysicalFiles',
+    protection_sources=[],
+    protection_policy='Bronze',
+    storage_domain='DefaultStorageDomain',
+    description='',
+    time_zone='America/Los_Angeles',
+    start_time='',
+    delete_backups=False
+)
+JOB_ALIASES = dict(job_name='name', sources='protection_sources', policy='protection_policy')
+JOB_ENVIRONMENTS = ['VMware', 'PhysicalFiles', 'Physical', 'GenericNas']
+
+
+def get__job__specs(jobs):
+    '''
+    Apply the aliases and defaults to each job and validate the keys.
+
+    :return: tuple of (specs, errors)
+    '''
+    specs = []
+    errors = []
+    names = set()
+    for job in jobs:
+        if not isinstance(job, dict):
+            errors.append("Each job must be a dictionary: " + str(job))
+            continue
+        spec = dict(JOB_DEFAULTS)
+        for key, value in job.items():
+            key = JOB_ALIASES.get(key, key)
+            if key not in JOB_DEFAULTS and key != 'name':
+                errors.append("Unsupported key (" + key + ") for job " + str(job.get('name')))
+            spec[key] = value
+        if not spec.get('name'):
+            errors.append("Each job requires a name")
+            continue
+        if spec['name'] in names:
+            errors.append("The job " + spec['name'] + " is listed more than once")
+        names.add(spec['name'])
+        if spec['state'] not in ['present', 'absent']:
+            errors.append("Invalid state (" + str(spec['state']) + ") for job " + spec['name'])
+        if spec['environment'] not in JOB_ENVIRONMENTS:
+            errors.append("Invalid environment (" + str(spec['environment']) + ") for job " + spec['name'])
+        # => Sources may be given as a list of endpoints or of dictionaries with paths.
+        spec['protection_sources'] = get__unique__sources([
+            dict(source) if isinstance(source, dict) else dict(endpoint=source)
+            for source in spec['protection_sources'] or []], 'endpoint')
+        specs.append(spec)
+    return specs, errors
+
+
+def get__unique__sources(sources, key):
+    '''
+    Return the sources with one entry for each value of the key.  The paths of
+    a source which is listed more than once are merged.
+    '''
+    unique = []
+    by_key = dict()
+    for source in sources:
+        first = by_key.get(source.get(key))
+        if first is None:
+            by_key[source.get(key)] = source
+            unique.append(source)
+        elif source.get('paths') and first.get('paths'):
+            first['paths'] = list(first['paths']) + [path for path in source['paths'] if path not in first['paths']]
+        else:
+            # => A source without paths is protected from its root.
+            first.pop('paths', None)
+    return unique
+
+
+def get__source__environment(environment):
+    # => File based jobs protect the sources registered as Physical Servers.
+    if environment == 'PhysicalFiles':
+        return 'Physical'
+    return environment
+
+
+def get__job__references(session_obj, specs, max_parallel_requests):
+    '''
+    Request every list needed to plan the changes once, in parallel.
+
+    :param session_obj: dictionary with the server, token and validate_certs keys
+    :return: dictionary of jobs, policies, storage_domains, roots and sources
+    '''
+    requests = [
+        ('jobs', get__prot_job__all, [dict(session_obj, is_deleted=False)]),
+        ('policies', get__prot_policy__all, [dict(session_obj)]),
+        ('storage_domains', get__storage_domain_id__all, [dict(session_obj)]),
+        ('roots', get__prot_source__roots, [dict(session_obj)])
+    ]
+    environments = sorted(set(
+        get__source__environment(spec['environment']) for spec in specs if spec['state'] == 'present'))
+    for environment in environments:
+        requests.append(('sources:' + environment, get__prot_source__all, [
+            dict(session_obj, environment=environment, fields=SOURCE_NODE_FIELDS)]))
+
+    outcomes = run__concurrent__requests(requests, max_parallel_requests)
+    for name, outcome in outcomes.items():
+        if outcome['error']:
+            raise Exception("Failed to get the Cohesity " + name + ": " + outcome['error'])
+
+    references = dict(jobs=dict(), policies=dict(), storage_domains=dict(), roots=dict(), sources=dict())
+    for job in outcomes['jobs']['result'] or []:
+        references['jobs'][job['name']] = job
+    # => Policies and Storage Domains can be referenced by name or by id.
+    for policy in outcomes['policies']['result'] or []:
+        references['policies'][policy['name']] = policy['id']
+        references['policies'][str(policy['id'])] = policy['id']
+    for domain in outcomes['storage_domains']['result'] or []:
+        references['storage_domains'][domain['name']] = domain['id']
+        references['storage_domains'][str(domain['id'])] = domain['id']
+    for node in outcomes['roots']['result'] or []:
+        source = node['protectionSource']
+        references['roots'].setdefault(source['environment'].lstrip('k'), source['id'])
+    for environment in environments:
+        source = outcomes['sources:' + environment]['result']
+        references['sources'][environment] = SourceTreeIndex(
+            [source] if isinstance(source, dict) else source or [])
+    return references
+
+
+def convert_windows_file_paths(path):
+    if ':' in path:
+        path_structure = path.split(":")
+        path = "/" + path_structure[0] + path_structure[1]
+        for char in ("\\\\", "\\"):
+            path = path.replace(char, "/")
+    return path
+
+
+def get__source__special_parameters(source_id, paths):
+    '''
+    Return the file paths to backup for a PhysicalFiles source.
+    '''
+    file_paths = []
+    for path in paths or [dict()]:
+        file_paths.append(dict(
+            backupFilePath=convert_windows_file_paths(path.get('includeFilePath', '/')),
+            excludedFilePaths=[convert_windows_file_paths(file) for file in path.get('excludeFilePaths', [])],
+            skipNestedVolumes=path.get('skipNestedVolumes', True)
+        ))
+    return dict(sourceId=source_id, physicalSpecialParameters=dict(filePaths=file_paths))
+
+
+def get__start_time(start_time):
+    start_time = str(start_time).replace(":", "")
+    if not len(start_time) == 4 or not start_time.isdigit():
+        return None
+    return dict(hour=int(start_time[:2]), minute=int(start_time[2:]))
+
+
+def get__job__plan(specs, references):
+    '''
+    Compare the desired jobs with the jobs on the Cluster.
+
+    :return: tuple of (actions, errors).  Each action contains the job name, the
+             action (create, update, delete or none), the job id and the request
+             (method, path and payload) needed to apply it.
+    '''
+    actions = []
+    errors = []
+    for spec in specs:
+        job = references['jobs'].get(spec['name'])
+        action = dict(name=spec['name'], action='none', id=job['id'] if job else None,
+                      method=None, path=None, payload=None)
+        actions.append(action)
+
+        if spec['state'] == 'absent':
+            if job:
+                action.update(action='delete', method='delete',
+                              path="/public/protectionJobs/" + str(job['id']),
+                              payload=dict(deleteSnapshots=spec['delete_backups']))
+            continue
+
+        environment = "k" + spec['environment']
+        if job and job['environment'] != environment:
+            errors.append("The job " + spec['name'] + " already exists with the environment " +
+                          job['environment'].lstrip('k'))
+            continue
+
+        # => Resolve each endpoint using the source tree of the environment.
+        source_environment = get__source__environment(spec['environment'])
+        index = references['sources'][source_environment]
+        error_count = len(errors)
+        for source in spec['protection_sources']:
+            source['id'] = index.get__id__by_endpoint(
+                source.get('endpoint'), source_environment in ['Physical', 'GenericNas'])
+            if source['id'] is None:
+                errors.append("The source " + str(source.get('endpoint')) + " for job " +
+                              spec['name'] + " is not registered")
+        if not spec['protection_sources']:
+            errors.append("The job " + spec['name'] + " requires protection_sources")
+        if len(errors) > error_count:
+            continue
+        # => A name and an address of the same host resolve to the same source.
+        sources = get__unique__sources(spec['protection_sources'], 'id')
+        source_ids = [source['id'] for source in sources]
+
+        if job:
+            new_sources = [source for source in sources
+                           if source['id'] not in job.get('sourceIds', [])]
+            if not new_sources:
+                continue
+            payload = dict(job)
+            payload['sourceIds'] = job.get('sourceIds', []) + [source['id'] for source in new_sources]
+            if environment == 'kPhysicalFiles':
+                payload['sourceSpecialParameters'] = list(job.get('sourceSpecialParameters') or []) + [
+                    get__source__special_parameters(source['id'], source.get('paths'))
+                    for source in new_sources]
+            action.update(action='update', method='put',
+                          path="/public/protectionJobs/" + str(job['id']), payload=payload)
+            continue
+
+        policy_id = references['policies'].get(str(spec['protection_policy']))
+        if policy_id is None:
+            errors.append("The policy " + str(spec['protection_policy']) + " for job " +
+                          spec['name'] + " does not exist")
+        storage_domain_id = references['storage_domains'].get(str(spec['storage_domain']))
+        if storage_domain_id is None:
+            errors.append("The storage domain " + str(spec['storage_domain']) + " for job " +
+                          spec['name'] + " does not exist")
+        # => VMware jobs protect objects below the vCenter itself.
+        parent_source_id = source_ids[0] if spec['environment'] == 'VMware' else \
+            references['roots'].get(source_environment)
+        if parent_source_id is None:
+            errors.append("There is no " + source_environment + " root node for job " + spec['name'])
+        start_time = None
+        if spec['start_time']:
+            start_time = get__start_time(spec['start_time'])
+            if start_time is None:
+                errors.append("Invalid start_time (" + str(spec['start_time']) + ") for job " + spec['name'])
+        if policy_id is None or storage_domain_id is None or parent_source_id is None or \
+                (spec['start_time'] and start_time is None):
+            continue
+
+        payload = dict(
+            name=spec['name'],
+            description=spec['description'],
+            environment=environment,
+            policyId=policy_id,
+            viewBoxId=storage_domain_id,
+            parentSourceId=parent_source_id,
+            sourceIds=source_ids,
+            timezone=spec['time_zone']
+        )
+        if start_time:
+            payload['startTime'] = start_time
+        if environment == 'kPhysicalFiles':
+            payload['sourceSpecialParameters'] = [
+                get__source__special_parameters(source['id'], source.get('paths'))
+                for source in sources]
+        action.update(action='create', method='post', path="/public/protectionJobs", payload=payload)
+    return actions, errors
+
+
+def apply__job__plan(session, actions, max_parallel_requests):
+    '''
+    Send the requests for every action which changes a job, in parallel.
+    '''
+    requests = []
+    for action in actions:
+        if action['method']:
+            requests.append((action['name'], getattr(session, action['method']),
+                             [action['path'], action['payload']]))
+    outcomes = run__concurrent__requests(requests, max_parallel_requests)
+    for action in actions:
+        outcome = outcomes.get(action['name'])
+        if not outcome:
+            continue
+        action['error'] = outcome['error']
+        if not outcome['error'] and action['action'] == 'create':
+            action['id'] = (outcome['result'] or dict()).get('id')
+    return len(requests)
+
+
+def main():
+    # => Load the default arguments including those specific to the Cohesity Protection Jobs.
+    argument_spec = cohesity_common_argument_spec()
+    argument_spec.update(
+        dict(
+            jobs=dict(type='list', required=True),
+            max_parallel_requests=dict(type='int', default=MAX_PARALLEL_REQUESTS)
+        )
+    )
+
+    # => Create a new module object
+    module = AnsibleModule(argument_spec=argument_spec,
+                           supports_check_mode=True)
+
+    specs, errors = get__job__specs(module.params.get('jobs'))
+    if errors:
+        module.fail_json(msg="Invalid Cohesity Protection Jobs: " + "; ".join(errors), changed=False)
+
+    server = module.params.get('cluster')
+    validate_certs = module.params.get('validate_certs')
+    token = get__cohesity_auth__token(module)
+    max_parallel_requests = module.params.get('max_parallel_requests')
+
+    try:
+        session_obj = dict(server=server, token=token, validate_certs=validate_certs)
+        references = get__job__references(session_obj, specs, max_parallel_requests)
+        actions, errors = get__job__plan(specs, references)
+        # => Nothing is changed unless every job in the list is valid.
+        if errors:
+            module.fail_json(msg="Unable to manage the Cohesity Protection Jobs: " + "; ".join(errors),
+                             changed=False)
+        requests = 0
+        if not module.check_mode:
+            session = get__cohesity_rest__session(server, token, validate_certs)
+            requests = apply__job__plan(session, actions, max_parallel_requests)
+    except urllib_error.URLError as e:
+        # => Capture and report any error messages.
+        raise__cohesity_exception__handler(e.read(), module)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+
+    jobs = [dict(name=action['name'], action=action['action'], id=action['id'],
+                 changed=action['action'] != 'none' and not action.get('error'),
+                 error=action.get('error')) for action in actions]
+    counts = dict((name, len([job for job in jobs if job['action'] == name]))
+                  for name in ['create', 'update', 'delete', 'none'])
+    results = dict(
+        changed=any(job['changed'] for job in jobs),
+        jobs=jobs,
+        requests=requests,
+        msg="Cohesity Protection Jobs: " + str(counts['create']) + " created, " +
+            str(counts['update']) + " updated, " + str(counts['delete']) + " deleted, " +
+            str(counts['none']) + " unchanged"
+    )
+    failed = [job['name'] for job in jobs if job['error']]
+    if failed:
+        results['msg'] = "Failed to manage the Cohesity Protection Jobs: " + ", ".join(failed)
+        module.fail_json(**results)
+    if module.check_mode:
+        results['msg'] = "Check Mode: " + results['msg']
+    module.exit_json(**results)
+
+
+if __name__ == '__main__':
+    main()
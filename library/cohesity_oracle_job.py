@@ -7,29 +7,21 @@ __metaclass__ = type
 
 import copy
 import json
-import time
 from ansible.module_utils.basic import AnsibleModule
-from cohesity_management_sdk.cohesity_client import CohesityClient
 from cohesity_management_sdk.exceptions.api_exception import APIException
-from cohesity_management_sdk.models.delete_protection_job_param import DeleteProtectionJobParam
-from cohesity_management_sdk.models.cancel_protection_job_run_param import CancelProtectionJobRunParam
-from cohesity_management_sdk.models.environment_type_job_parameters import EnvironmentTypeJobParameters
-from cohesity_management_sdk.models.oracle_special_parameters import OracleSpecialParameters
-from cohesity_management_sdk.models.oracle_env_job_parameters import OracleEnvJobParameters
-from cohesity_management_sdk.models.protection_job_request_body import ProtectionJobRequestBody
-from cohesity_management_sdk.models.source_special_parameter import SourceSpecialParameter
-from cohesity_management_sdk.models.run_protection_job_param import RunProtectionJobParam
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
+    from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client, ACTIVE_RUN_STATES
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
+    from ansible.module_utils.storage.cohesity.cohesity_hints import get_cohesity_client, ACTIVE_RUN_STATES
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
 
 ANSIBLE_METADATA = {
     'metadata_version': '1.0',
@@ -160,18 +152,15 @@ def get__storage_domain_id__by_name(module):
 
 def get_protection_run__status__by_id(module, job_id):
     try:
+        # => Only the most recent run is needed to know the state of the job.
         job_run = cohesity_client.protection_runs.get_protection_runs(
-            job_id=job_id)
+            job_id=job_id, num_runs=1)
         if not job_run:
             return False, '', ''
         # Fetch the status of last job run.
         last_run = job_run[0]
         status = last_run.backup_run.status
-        if status == 'kAccepted':
-            return True, status, last_run
-        elif status in ['kCanceled', 'kSuccess']:
-            return False, status, last_run
-        return False, status, ''
+        return status in ACTIVE_RUN_STATES, status, last_run
     except Exception as error:
         raise__cohesity_exception__handler(error, module)
 
@@ -191,33 +180,37 @@ def check__protection_job__exists(module):
         raise__cohesity_exception__handler(error, module)
 
 
-def wait__for_job_state__transition(module, job_id, state='start'):
+def wait__for_job_state__transition(module, job_id, state='start', previous_run=None):
+    '''
+    Wait for the latest Protection Run of the job to start or stop.
+
+    :param previous_run: id of the latest run before the job was started
+    '''
     if state != 'start':
         state = 'stop'
-    loop_cnt = 0
-    while loop_cnt <= 3:
-        # => If the backup finishes before we check, we need to look
-        # => at previous backups to see if the last job is successful.
+
+    def check():
         currently_active, status, last_run = get_protection_run__status__by_id(
             module, job_id)
-        if state == 'start' and status == 'kAccepted':
-            return
-        elif state == 'stop' and status in ['kSuccess', 'kCanceled']:
-            return
-        else:
-            time.sleep(5)
-            loop_cnt += 1
-
-    if loop_cnt == 21:
+        if state == 'start':
+            # => A new run in any state, including a terminal one, means
+            # => that the job has started.
+            return bool(last_run) and last_run.backup_run.job_run_id != previous_run, status
+        return not currently_active, status
+
+    waited = wait__for__state(check, module.params.get('wait_minutes', 2) * 60)
+    if not waited['done']:
         module.fail_json(msg='Failed to successfully ' + state +
             ' the Cohesity Protection Job',
             changed=False,
             id=job_id,
-            loop_cnt=loop_cnt)
+            status=waited['value'],
+            attempts=waited['attempts'])
 
 
 def start_job(module):
     # => Get job id.
+    from cohesity_management_sdk.models.run_protection_job_param import RunProtectionJobParam
     job_exists, job = check__protection_job__exists(module)
     if not job_exists:
         name=module.params.get('name')
@@ -235,6 +228,7 @@ def start_job(module):
             name=module.params.get('name')
         )
         module.exit_json(**results)
+    previous_run = last_run.backup_run.job_run_id if last_run else None
 
     try:
         body = RunProtectionJobParam()
@@ -248,11 +242,11 @@ def start_job(module):
             id=job_id
         )
 
-        # => It can take a few moments for the job to actually stop.  In this case,
-        # => We will introduce a delay and check every (5) seconds for up to a minute
-        # => to see if the job stopped.
+        # => It can take a few moments for the job to actually start.  In this case,
+        # => we will poll the latest run, backing off between checks, for up to
+        # => `wait_minutes` to see if the job started.
         wait__for_job_state__transition(
-            module, job_id, state='start')
+            module, job_id, state='start', previous_run=previous_run)
 
         return output
     except urllib_error.URLError as e:
@@ -263,6 +257,7 @@ def start_job(module):
 
 
 def stop_job(module, _id):
+    from cohesity_management_sdk.models.cancel_protection_job_run_param import CancelProtectionJobRunParam
     currently_active, status, last_run = get_protection_run__status__by_id(module, _id)
     if not currently_active:
         results = dict(
@@ -287,8 +282,8 @@ def stop_job(module, _id):
         resp = cohesity_client.protection_runs.create_cancel_protection_job_run(_id, body)
 
         # => It can take a few moments for the job to actually stop.  In this case,
-        # => We will introduce a delay and check every (5) seconds for up to a minute
-        # => to see if the job stopped.
+        # => we will poll the latest run, backing off between checks, for up to
+        # => `wait_minutes` to see if the job stopped.
         wait__for_job_state__transition(
             module, _id, state='stop')
 
@@ -301,6 +296,7 @@ def unregister_job(module, _id):
     '''
     Unregister a protection job.
     '''
+    from cohesity_management_sdk.models.delete_protection_job_param import DeleteProtectionJobParam
     try:
         body = DeleteProtectionJobParam()
         body.delete_snapshots = module.params.get('delete_backups')
@@ -328,6 +324,7 @@ def main():
             ondemand_run_type=dict(
                 choices=['Regular', 'Full', 'Log', 'System'], default='Regular'),
             cancel_active=dict(type='bool', default=False),
+            wait_minutes=dict(type='int', default=2),
             validate_certs=dict(type='bool', default=False),
             endpoint=dict(type=str, default=''),
             databases=dict(type=list, default=[]),
@@ -378,6 +375,9 @@ def main():
         if not (parent_id and source_id):
             module.fail_json(msg="Source '%s' is not registered to cluster, Please register the source and try again." % module.params.get('endpoint'))
         check__mandatory__params(module)
+        from cohesity_management_sdk.models.oracle_special_parameters import OracleSpecialParameters
+        from cohesity_management_sdk.models.protection_job_request_body import ProtectionJobRequestBody
+        from cohesity_management_sdk.models.source_special_parameter import SourceSpecialParameter
         body = ProtectionJobRequestBody()
         body.name = module.params.get('name')
         body.parent_source_id = source_id
@@ -458,12 +458,8 @@ def main():
             job_id = job_meta_data.uid.id
             status, _, _ = get_protection_run__status__by_id(module, job_id)
             if status:
+                # => stop_job waits for the run to reach a terminal state.
                 stop_job(module, job_id)
-                while True: 
-                    status, _, _ = get_protection_run__status__by_id(module, job_id)
-                    if not status:
-                        time.sleep(10)
-                        break
             response = unregister_job(module, job_exists)
 
             results = dict(
@@ -9,24 +9,20 @@ import datetime
 import json
 import time
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url
-from cohesity_management_sdk.cohesity_client import CohesityClient
 from cohesity_management_sdk.exceptions.api_exception import APIException
-from cohesity_management_sdk.models.delete_protection_job_param import DeleteProtectionJobParam
-from cohesity_management_sdk.models.cancel_protection_job_run_param import CancelProtectionJobRunParam
-from cohesity_management_sdk.models.protection_job_request_body import ProtectionJobRequestBody
-from cohesity_management_sdk.models.run_protection_job_param import RunProtectionJobParam
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
     from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
     from ansible.module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
 
 ANSIBLE_METADATA = {
     'metadata_version': '1.0',
@@ -112,13 +108,8 @@ def create_recover_job(module, token, database_info):
                                       ownerRestoreInfo=owner_restore_info,
                                       restoreAppObjectVec=[restore_obj_vec]))
     try:
-        uri = 'https://' + server + '/irisservices/api/v1/recoverApplication'
-        headers = {'Accept': 'application/json',
-                   'Authorization': 'Bearer ' + token}
-        response = open_url(url=uri,data=json.dumps(body), method='POST', headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.post('/recoverApplication', data=body)
         return response
     except Exception as err:
         module.fail_json(msg='Error while recovery task creation, error message: "%s".' % err)
@@ -145,13 +136,8 @@ def search_for_database(token, module):
     source_server = module.params.get('source_server') 
     validate_certs = module.params.get('validate_certs') 
     try:
-        uri = 'https://' + server + '/irisservices/api/v1/searchvms?entityTypes=kOracle&vmName=%s' % sourcedb
-        headers = {'Accept': 'application/json',
-                   'Authorization': 'Bearer ' + token}
-        response = open_url(url=uri, method='GET', headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.get('/searchvms', params=dict(entityTypes='kOracle', vmName=sourcedb))
         if not response:
             raise Exception('Source database %s not available.' % sourcedb)
         vms = response['vms']
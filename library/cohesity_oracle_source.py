@@ -8,21 +8,20 @@ __metaclass__ = type
 import json
 import time
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url, urllib_error
-from cohesity_management_sdk.cohesity_client import CohesityClient
+from ansible.module_utils.urls import urllib_error
 from cohesity_management_sdk.exceptions.api_exception import APIException
-from cohesity_management_sdk.models.register_protection_source_parameters import RegisterProtectionSourceParameters
-from cohesity_management_sdk.models.environment_enum import EnvironmentEnum as env_enum
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
     from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
     from ansible.module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
 
 
@@ -92,9 +91,7 @@ def register_oracle_source(module, self, _id):
     db_pwd = module.params.get('db_password')
 
     try:
-        uri = 'https://' + server + '/irisservices/api/v1/applicationSourceRegistration'
-        headers = {'Accept': 'application/json',
-                   'Authorization': 'Bearer ' + token}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         # Payload to register Oracle source.
         payload = dict(appEnvVec=[19],
                        usesPersistentAgent=True,
@@ -105,11 +102,7 @@ def register_oracle_source(module, self, _id):
             cred = dict(username=db_user, password=db_pwd)
             payload['appCredentialsVec'] = list() 
             payload['appCredentialsVec'].append(dict(credentials=cred, envType=19))
-        data = json.dumps(payload)
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        response = session.post('/applicationSourceRegistration', data=payload)
         return response
     except Exception as err:
         return payload
@@ -137,6 +130,7 @@ def get__protection_source_registration__status(module, self):
 
 # => Register the Endpoint as a Cohesity Physical Protection Source.
 def register_source(module, self):
+    from cohesity_management_sdk.models.register_protection_source_parameters import RegisterProtectionSourceParameters
     try:
         body = RegisterProtectionSourceParameters()
         body.endpoint = self['endpoint']
@@ -8,19 +8,7 @@ __metaclass__ = type
 import json
 
 from ansible.module_utils.basic import AnsibleModule
-from cohesity_management_sdk.cohesity_client import CohesityClient
-from cohesity_management_sdk.controllers.base_controller import BaseController
 from cohesity_management_sdk.exceptions.api_exception import APIException
-from cohesity_management_sdk.models.archival_external_target import ArchivalExternalTarget
-from cohesity_management_sdk.models.blackout_period import BlackoutPeriod
-from cohesity_management_sdk.models.continuous_schedule import ContinuousSchedule
-from cohesity_management_sdk.models.daily_schedule import DailySchedule
-from cohesity_management_sdk.models.extended_retention_policy import ExtendedRetentionPolicy
-from cohesity_management_sdk.models.monthly_schedule import MonthlySchedule
-from cohesity_management_sdk.models.protection_policy_request import ProtectionPolicyRequest
-from cohesity_management_sdk.models.scheduling_policy import SchedulingPolicy
-from cohesity_management_sdk.models.snapshot_archival_copy_policy import SnapshotArchivalCopyPolicy
-from cohesity_management_sdk.models.time_of_day import TimeOfDay
 
 try:
     from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
@@ -63,6 +51,8 @@ def blackout_window(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.blackout_period import BlackoutPeriod
+    from cohesity_management_sdk.models.time_of_day import TimeOfDay
     try:
         blackout_windows = []
         for window in module.params.get('blackout_window'):
@@ -89,6 +79,10 @@ def policy_schedule(module, scheduling_policy):
     :param scheduling_policy: dictionary that has the scheduing details
     :return:
     '''
+    from cohesity_management_sdk.models.continuous_schedule import ContinuousSchedule
+    from cohesity_management_sdk.models.daily_schedule import DailySchedule
+    from cohesity_management_sdk.models.monthly_schedule import MonthlySchedule
+    from cohesity_management_sdk.models.scheduling_policy import SchedulingPolicy
     try:
         schedule = SchedulingPolicy()
         schedule.periodicity = 'k' + scheduling_policy['periodicity']
@@ -118,6 +112,7 @@ def extended_retention(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.extended_retention_policy import ExtendedRetentionPolicy
     try:
         extended_retentions = []
         for retention in module.params.get('extended_retention'):
@@ -159,6 +154,8 @@ def archival_copy_policies(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.archival_external_target import ArchivalExternalTarget
+    from cohesity_management_sdk.models.snapshot_archival_copy_policy import SnapshotArchivalCopyPolicy
     try:
         archival_policies = []
         for policy in module.params.get('archival_copy'):
@@ -186,6 +183,7 @@ def create_policy(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.protection_policy_request import ProtectionPolicyRequest
     try:
         policy_request = ProtectionPolicyRequest()
         policy_request.name = module.params.get('name')
@@ -287,6 +285,8 @@ def main():
     )
 
     global cohesity_client
+    # => The SDK is only imported once the arguments are valid.
+    from cohesity_management_sdk.controllers.base_controller import BaseController
     base_controller = BaseController()
     base_controller.global_headers['user-agent'] = 'cohesity-ansible/v2.3.4'
     cohesity_client = get_cohesity_client(module)
@@ -9,19 +9,25 @@ import json
 import time
 from datetime import datetime
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
     from module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
         get__protection_jobs__by_environment, get__file_snapshot_information__by_filename, \
         get__prot_source_root_id__by_environment, get__restore_job__by_type
 except ImportError:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
     from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
         get__protection_jobs__by_environment, get__file_snapshot_information__by_filename, \
         get__prot_source_root_id__by_environment, get__restore_job__by_type
@@ -204,7 +210,13 @@ RETURN = '''
             "username": "VALUE_SPECIFIED_IN_NO_LOG_PARAMETER",
             "viewBoxId": 5
         }
-    ]
+    ],
+    "task_handle": {
+        "cluster": "cohesity.lab",
+        "task_ids": [
+            54295
+        ]
+    }
 }
 
 '''
@@ -374,21 +386,13 @@ def start_restore(module, uri, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + uri
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = self.copy()
 
         # => Remove the Authorization Token from the Payload
         payload.pop('token', None)
 
-        data = json.dumps(payload)
-
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        response = session.post(uri, data=payload)
 
         # => Remove the Job name as it will be duplicated back to our process.
         response.pop('name')
@@ -405,7 +409,7 @@ def wait_restore_complete(module, self):
     server = module.params.get('cluster')
     validate_certs = module.params.get('validate_certs')
     token = self['token']
-    wait_counter = int(module.params.get('wait_minutes')) * 2
+    wait_timeout = int(module.params.get('wait_minutes')) * 60
 
     wait_results = dict(
         changed=False,
@@ -414,47 +418,36 @@ def wait_restore_complete(module, self):
         error=list()
     )
     try:
-        import time
-
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/tasks/" + str(self['id'])
-        headers = {
-            "Accept": "application/json",
-            "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        attempts = 0
-        # => Wait for the restore based on a predetermined number of minutes with checks every 30 seconds.
-        while attempts < wait_counter:
-
-            response = open_url(
-                url=uri,
-                headers=headers,
-                validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-            response = json.loads(response.read())
-
-            # => If the status is Finished then break out and check for errors.
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        uri = "/public/restore/tasks/" + str(self['id'])
+
+        def check():
+            response = session.get(uri)
+            # => If the status is Finished then stop waiting and check for errors.
             if response['status'] == "kFinished":
-                wait_results['changed'] = True
-                wait_results['status'] = "Finished"
-                break
-            # => Otherwise, pause and try again.
-            else:
-                attempt_tracker = dict(
-                    attempt=attempts,
-                    status=response['status']
-                )
-                wait_results['attempts'].append(attempt_tracker)
-                attempts += 1
-                time.sleep(30)
-
-                if attempts >= wait_counter:
-                    wait_results['changed'] = False
-                    wait_results['status'] = response['status']
-                    wait_results['error'] = "Failed to wait for the restore to complete after " + \
-                        module.params.get('wait_minutes') + " minutes."
-                    if wait_results['status'] == "kInProgress":
-                        wait_results['error'] = wait_results['error'] + \
-                            " The restore is still in progress and the timeout might be too short."
+                return True, response
+            attempt_tracker = dict(
+                attempt=len(wait_results['attempts']),
+                status=response['status']
+            )
+            wait_results['attempts'].append(attempt_tracker)
+            return False, response
+
+        # => Wait for the restore for a predetermined number of minutes.  The delay
+        # => between checks grows up to 30 seconds so short restores return quickly.
+        waited = wait__for__state(check, wait_timeout)
+        response = waited['value']
+        if waited['done']:
+            wait_results['changed'] = True
+            wait_results['status'] = "Finished"
+        else:
+            wait_results['changed'] = False
+            wait_results['status'] = response['status']
+            wait_results['error'] = "Failed to wait for the restore to complete after " + \
+                module.params.get('wait_minutes') + " minutes."
+            if wait_results['status'] == "kInProgress":
+                wait_results['error'] = wait_results['error'] + \
+                    " The restore is still in progress and the timeout might be too short."
         # => If the error key exists in the response, then something happened during the restore
         if 'error' in response:
             wait_results['status'] = "Failed"
@@ -638,7 +631,11 @@ def main():
                 name=module.params.get('job_name') +
                 ": " +
                 module.params.get('name'),
-                restore_jobs=response)
+                restore_jobs=response,
+                # => The handle can be passed to cohesity_task_wait to follow
+                # => the restore when `wait_for_job` is disabled.
+                task_handle=get__task__handle(
+                    module.params.get('cluster'), [jobCheck['id'] for jobCheck in response]))
             if 'file_names' in job_details:
                 results['filenames'] = job_details['file_names']
 
@@ -6,24 +6,28 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import json
-try:
-    from urllib import quote
-except ImportError as e:
-    from urllib.parse import quote
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, load__source_tree
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
     from module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
         get__protection_jobs__by_environment, get__file_snapshot_information__by_filename, get__vmware_snapshot_information__by_vmname, \
         get__prot_source_root_id__by_environment, get__restore_job__by_type, get_cohesity_client
 except ImportError:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_task_tracker import get__task__handle
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, load__source_tree
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        wait__for__state
     from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source_id__by_endpoint, \
         get__protection_jobs__by_environment, get__file_snapshot_information__by_filename, get__vmware_snapshot_information__by_vmname, \
         get__prot_source_root_id__by_environment, get__restore_job__by_type, get_cohesity_client
@@ -243,7 +247,13 @@ RETURN = '''
             ],
             "vmwareParameters": {}
         }
-    ]
+    ],
+    "task_handle": {
+        "cluster": "cohesity.lab",
+        "task_ids": [
+            54879
+        ]
+    }
 }
 
 '''
@@ -281,17 +291,9 @@ def get_source_details(module, restore_to_source):
     validate_certs = module.params.get('validate_certs')
     token = get__cohesity_auth__token(module)
     try:
-        uri = "https://" + server + \
-              "/irisservices/api/v1/public/protectionSources/rootNodes?environments=kVMware"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        response = open_url(
-            url=uri,
-            headers=headers,
-            validate_certs=validate_certs,
-            method="GET", timeout=REQUEST_TIMEOUT)
-        response = json.loads(response.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.get("/public/protectionSources/rootNodes",
+                               params=dict(environments="kVMware"))
         source_details = dict()
         for source in response:
             if not restore_to_source and source['protectionSource']['name'] == module.params.get('endpoint'):
@@ -320,21 +322,15 @@ def get_vmware_source_objects(module, source_id):
     validate_certs = module.params.get('validate_certs')
     token = get__cohesity_auth__token(module)
     try:
-        uri = "https://" + server + "/irisservices/api/v1/public/protectionSources?id=" + str(
-            source_id) + "&excludeTypes=kVirtualMachine" + "&includeDatastores=true" + \
-                "&includeNetworks=true" + "&includeVMFolders=true"
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-
-        response = open_url(
-            url=uri,
-            method='GET',
-            headers=headers,
-            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-        response = json.loads(response.read())
-        return response
+        params = [
+            ('id', source_id),
+            ('excludeTypes', 'kVirtualMachine'),
+            ('includeDatastores', 'true'),
+            ('includeNetworks', 'true'),
+            ('includeVMFolders', 'true')
+        ]
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        return load__source_tree(session, params)
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
         raise__cohesity_exception__handler(e.read(), module)
@@ -344,28 +340,14 @@ def get_vmware_source_objects(module, source_id):
 
 def get_vmware_object_id(source_objects, object_name, object_type):
     '''
-    :param source_objects: protection source object tree
+    :param source_objects: protection source object tree or SourceTreeIndex
     :param object_name: resource pool name or datastore name
     :param object_type: type of the object like kResourcePool, kDatastore
     :return:
     '''
-    nodes = []
-    for node in source_objects:
-        if 'nodes' in node:
-            nodes.append(node['nodes'])
-        if ('protectionSource' in node) and (node['protectionSource']['name'] == object_name) and\
-                node['protectionSource']['vmWareProtectionSource']['type'] == object_type:
-            return node['protectionSource']['id']
-
-    while len(nodes) != 0:
-        objects = nodes.pop()
-        for node in objects:
-            if 'nodes' in node:
-                nodes.append(node['nodes'])
-            if ('protectionSource' in node) and (node['protectionSource']['name'] == object_name) and \
-                    node['protectionSource']['vmWareProtectionSource']['type'] == object_type:
-                return node['protectionSource']['id']
-    return None
+    if not isinstance(source_objects, SourceTreeIndex):
+        source_objects = SourceTreeIndex(source_objects)
+    return source_objects.get__id(object_name, object_type)
 
 
 def get__vmware_snapshot_information__by_source(module, self, source_details):
@@ -380,17 +362,13 @@ def get__vmware_snapshot_information__by_source(module, self, source_details):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/objects" + \
-            "?environments=kVMware&search=" + quote(self['restore_obj']['vmname']) +\
-              "&registeredSourceIds=" + str(source_details['id'])
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-        objects = json.loads(objects.read())
+        params = [
+            ('environments', 'kVMware'),
+            ('search', self['restore_obj']['vmname']),
+            ('registeredSourceIds', source_details['id'])
+        ]
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        objects = session.get("/public/restore/objects", params=params)
         return objects
     except urllib_error.URLError as e:
         # => Capture and report any error messages.
@@ -512,21 +490,13 @@ def start_restore(module, uri, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + uri
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = self.copy()
 
         # => Remove the Authorization Token from the Payload
         payload.pop('token', None)
 
-        data = json.dumps(payload)
-
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        response = session.post(uri, data=payload)
 
         # => Remove the Job name as it will be duplicated back to our process.
         response.pop('name')
@@ -543,7 +513,7 @@ def wait_restore_complete(module, self):
     server = module.params.get('cluster')
     validate_certs = module.params.get('validate_certs')
     token = self['token']
-    wait_counter = int(module.params.get('wait_minutes')) * 2
+    wait_timeout = int(module.params.get('wait_minutes')) * 60
 
     wait_results = dict(
         changed=False,
@@ -552,44 +522,36 @@ def wait_restore_complete(module, self):
         error=list()
     )
     try:
-        import time
-
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/tasks/" + str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-        attempts = 0
-        # => Wait for the restore based on a predetermined number of minutes with checks every 30 seconds.
-        while attempts < wait_counter:
-
-            response = open_url(url=uri, headers=headers,
-                                validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-            response = json.loads(response.read())
-
-            # => If the status is Finished then break out and check for errors.
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        uri = "/public/restore/tasks/" + str(self['id'])
+
+        def check():
+            response = session.get(uri)
+            # => If the status is Finished then stop waiting and check for errors.
             if response['status'] == "kFinished":
-                wait_results['changed'] = True
-                wait_results['status'] = "Finished"
-                break
-            # => Otherwise, pause and try again.
-            else:
-                attempt_tracker = dict(
-                    attempt=attempts,
-                    status=response['status']
-                )
-                wait_results['attempts'].append(attempt_tracker)
-                attempts += 1
-                time.sleep(30)
-
-                if attempts >= wait_counter:
-                    wait_results['changed'] = False
-                    wait_results['status'] = response['status']
-                    wait_results['error'] = "Failed to wait for the restore to complete after " + \
-                        module.params.get('wait_minutes') + " minutes."
-                    if wait_results['status'] == "kInProgress":
-                        wait_results['error'] = wait_results['error'] + \
-                            " The restore is still in progress and the timeout might be too short."
+                return True, response
+            attempt_tracker = dict(
+                attempt=len(wait_results['attempts']),
+                status=response['status']
+            )
+            wait_results['attempts'].append(attempt_tracker)
+            return False, response
+
+        # => Wait for the restore for a predetermined number of minutes.  The delay
+        # => between checks grows up to 30 seconds so short restores return quickly.
+        waited = wait__for__state(check, wait_timeout)
+        response = waited['value']
+        if waited['done']:
+            wait_results['changed'] = True
+            wait_results['status'] = "Finished"
+        else:
+            wait_results['changed'] = False
+            wait_results['status'] = response['status']
+            wait_results['error'] = "Failed to wait for the restore to complete after " + \
+                module.params.get('wait_minutes') + " minutes."
+            if wait_results['status'] == "kInProgress":
+                wait_results['error'] = wait_results['error'] + \
+                    " The restore is still in progress and the timeout might be too short."
         # => If the error key exists in the response, then something happened during the restore
         if 'error' in response:
             wait_results['status'] = "Failed"
@@ -766,7 +728,9 @@ def main():
                     datastore_id = module.params.get('datastore_id')
                     resource_pool_id = module.params.get('resource_pool_id')
                     restore_to_source_details = get_source_details(module, True)
-                    restore_to_source_objects = get_vmware_source_objects(module, restore_to_source_details['id'])
+                    # => Index the target source tree once for every lookup below.
+                    restore_to_source_objects = SourceTreeIndex(
+                        get_vmware_source_objects(module, restore_to_source_details['id']))
                     if (module.params.get('resource_pool_id') or module.params.get('resource_pool_name')) and\
                             (module.params.get('datastore_id') or module.params.get('datastore_name')):
 
@@ -846,7 +810,11 @@ def main():
                 msg="Registration of Cohesity Restore Job Complete",
                 name=module.params.get('job_name') + ": " +
                 module.params.get('name'),
-                restore_jobs=response
+                restore_jobs=response,
+                # => The handle can be passed to cohesity_task_wait to follow
+                # => the restore when `wait_for_job` is disabled.
+                task_handle=get__task__handle(
+                    module.params.get('cluster'), [jobCheck['id'] for jobCheck in response])
             )
 
             if not task['changed'] and module.params.get('wait_for_job'):
@@ -7,17 +7,19 @@ __metaclass__ = type
 
 import json
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import open_url, urllib_error
+from ansible.module_utils.urls import urllib_error
 
 try:
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
     from module_utils.storage.cohesity.cohesity_hints import get__prot_source__all
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
-    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, REQUEST_TIMEOUT
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
     from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source__all
 
 DOCUMENTATION = '''
@@ -334,10 +336,7 @@ def register_source(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + "/irisservices/api/v1/public/protectionSources/register"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
+        session = get__cohesity_rest__session(server, token, validate_certs)
         payload = self.copy()
         payload['environment'] = "k" + self['environment']
         if self['environment'] == "Physical":
@@ -345,11 +344,7 @@ def register_source(module, self):
             payload['physicalType'] = "k" + self['physicalType']
         elif self['environment'] == "VMware":
             payload['vmwareType'] = "k" + self['vmwareType']
-        data = json.dumps(payload)
-        response = open_url(url=uri, data=data, headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
-
-        response = json.loads(response.read())
+        response = session.post("/public/protectionSources/register", data=payload)
 
         # => This switcher will allow us to return a standardized output
         # => for all Protection Sources.
@@ -376,14 +371,8 @@ def unregister_source(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/protectionSources/" + str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token,
-                   "user-agent": "cohesity-ansible/v2.3.4"}
-
-        response = open_url(url=uri, method='DELETE', headers=headers,
-                            validate_certs=validate_certs, timeout=REQUEST_TIMEOUT)
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        response = session.delete("/public/protectionSources/" + str(self['id']))
 
         return response
     except urllib_error.URLError as e:
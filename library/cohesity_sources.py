@@ -0,0 +1,424 @@
+#!/usr/bin/python
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import urllib_error
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
+    from module_utils.storage.cohesity.cohesity_hints import get__prot_source__all
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler, \
+        run__concurrent__requests, MAX_PARALLEL_REQUESTS
+    from ansible.module_utils.storage.cohesity.cohesity_hints import get__prot_source__all
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
+
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'supported_by': 'community',
+    'status': ['preview']
+}
+
+DOCUMENTATION = '''
+module: cohesity_sources
+short_description: Bulk management of Cohesity Protection Sources
+description:
+    - Ansible Module used to register or remove many Cohesity Protection Sources on a Cohesity Cluster
+    - in a single task.
+    - The registered sources are listed once for each environment and only the endpoints which are
+    - missing (or which must be removed) are sent to the Cluster, in parallel.
+version_added: '2.6.5'
+author:
+  - Cohesity, Inc
+
+options:
+  sources:
+    description:
+      - List of endpoints to manage.  Each item is either the endpoint or a dictionary with the
+      - I(endpoint) key and any of the other options of this module, which then apply only to that endpoint.
+      - The items are not hidden from the logs, so I(source_password) and I(nas_password) are rejected
+      - in the items and must be set with the module options.
+    type: list
+    required: yes
+  state:
+    description:
+      - Default state of each Protection Source.
+    choices:
+      - present
+      - absent
+    default: 'present'
+  environment:
+    description:
+      - Default environment type of each Protection Source.
+    choices:
+      - VMware
+      - Physical
+      - GenericNas
+    default: 'Physical'
+  host_type:
+    description:
+      - Default OS type of each Physical Protection Source.
+    choices:
+      - Linux
+      - Windows
+      - Aix
+    default: 'Linux'
+  physical_type:
+    description:
+      - Default entity type of each Physical Protection Source.
+    choices:
+      - Host
+      - WindowsCluster
+    default: 'Host'
+  force_register:
+    description:
+      - Enabling this option will force the registration of the Cohesity Protection Sources.
+    type: bool
+    default: no
+  vmware_type:
+    description:
+      - Specifies the entity type such as C(VCenter) if the environment is C(VMware).
+    default: 'VCenter'
+  source_username:
+    description:
+      - Specifies username to access the VMware sources.
+  source_password:
+    description:
+      - Specifies the password to access the VMware sources.
+      - This parameter will not be logged.
+  nas_protocol:
+    description:
+      - Specifies the type of connection for the NAS Mountpoints.
+    choices:
+      - NFS
+      - SMB
+    default: 'NFS'
+  nas_username:
+    description:
+      - Specifies username to access the NAS Mountpoints.
+  nas_password:
+    description:
+      - Specifies the password to access the NAS Mountpoints.
+      - This parameter will not be logged.
+  max_parallel_requests:
+    description:
+      - Maximum number of requests sent to the Cluster at the same time.
+    type: int
+    default: 10
+
+extends_documentation_fragment:
+    - cohesity
+requirements: []
+'''
+
+EXAMPLES = '''
+# Register every Linux host in the inventory as a Physical Protection Source
+- cohesity_sources:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    sources: "{{ groups['linux'] }}"
+    host_type: Linux
+
+# Register Windows hosts and an NFS export in one task
+- cohesity_sources:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    host_type: Windows
+    sources:
+      - mywindows1.host.lab
+      - mywindows2.host.lab
+      - endpoint: mynfs.host.lab:/exports
+        environment: GenericNas
+
+# Unregister a list of Physical Protection Sources
+- cohesity_sources:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    state: absent
+    sources:
+      - mylinux1.host.lab
+      - mylinux2.host.lab
+'''
+
+RETURN = '''
+
+{
+    "changed": true,
+    "msg": "Cohesity Protection Sources: 1 registered, 0 unregistered, 1 unchanged",
+    "requests": 1,
+    "sources": [
+        {
+            "action": "register",
+            "changed": true,
+            "endpoint": "mylinux1.host.lab",
+            "environment": "Physical",
+            "error": null,
+            "id": 240
+        },
+        {
+            "action": "none",
+            "changed": false,
+            "endpoint": "mylinux2.host.lab",
+            "environment": "Physical",
+            "error": null,
+            "id": 241
+        }
+    ]
+}
+
+'''
+
+# => Options which can be set for all sources and overridden for each source.
+SOURCE_OPTIONS = dict(
+    state=['present', 'absent'],
+    environment=['VMware', 'Physical', 'GenericNas'],
+    host_type=['Linux', 'Windows', 'Aix'],
+    physical_type=['Host', 'WindowsCluster'],
+    force_register=None,
+    vmware_type=None,
+    source_username=None,
+    source_password=None,
+    nas_protocol=['NFS', 'SMB'],
+    nas_username=None,
+    nas_password=None,
+    nas_type=None,
+    skip_validation=None
+)
+SOURCE_ALIASES = dict(hostname='endpoint', ip_address='endpoint')
+# => Items of the sources list are not hidden from the logs, so the passwords
+# => are only taken from the module options.
+SOURCE_SECRETS = ['source_password', 'nas_password']
+
+
+def get__source__specs(params):
+    '''
+    Apply the module options to each source and validate the keys.
+
+    :return: tuple of (specs, errors)
+    '''
+    specs = []
+    errors = []
+    seen = set()
+    for source in params.get('sources'):
+        if not isinstance(source, dict):
+            source = dict(endpoint=source)
+        spec = dict((key, params.get(key)) for key in SOURCE_OPTIONS)
+        for key, value in source.items():
+            key = SOURCE_ALIASES.get(key, key)
+            if key not in SOURCE_OPTIONS and key != 'endpoint':
+                errors.append("Unsupported key (" + key + ") for source " + str(source.get('endpoint')))
+            if key in SOURCE_SECRETS:
+                errors.append("The " + key + " of source " + str(source.get('endpoint')) +
+                              " must be set with the " + key + " option, which is not logged")
+                continue
+            spec[key] = value
+        if not spec.get('endpoint'):
+            errors.append("Each source requires an endpoint")
+            continue
+        for key, choices in SOURCE_OPTIONS.items():
+            if choices and spec[key] not in choices:
+                errors.append("Invalid " + key + " (" + str(spec[key]) + ") for source " + spec['endpoint'])
+        if (spec['environment'], spec['endpoint']) in seen:
+            errors.append("The source " + spec['endpoint'] + " is listed more than once")
+        seen.add((spec['environment'], spec['endpoint']))
+        if spec['state'] == 'present' and spec['environment'] == 'GenericNas' and spec['nas_protocol'] == 'SMB':
+            if not spec['nas_username'] or not spec['nas_password']:
+                errors.append("The nas_username and nas_password are mandatory for source " + spec['endpoint'])
+        specs.append(spec)
+    return specs, errors
+
+
+def get__source__secrets(sources):
+    '''
+    Return the passwords set in the items of the sources list.
+    '''
+    return set(source[key] for source in sources if isinstance(source, dict)
+               for key in SOURCE_SECRETS if source.get(key))
+
+
+def get__source__indexes(session_obj, specs, max_parallel_requests):
+    '''
+    List the registered sources once for each environment, in parallel.
+
+    :return: dictionary of SourceTreeIndex keyed by environment
+    '''
+    environments = sorted(set(spec['environment'] for spec in specs))
+    outcomes = run__concurrent__requests([
+        (environment, get__prot_source__all, [
+            dict(session_obj, environment=environment, fields=SOURCE_NODE_FIELDS)])
+        for environment in environments], max_parallel_requests)
+
+    indexes = dict()
+    for environment in environments:
+        outcome = outcomes[environment]
+        if outcome['error']:
+            raise Exception("Failed to get the Cohesity " + environment + " Protection Sources: " +
+                            outcome['error'])
+        source = outcome['result']
+        indexes[environment] = SourceTreeIndex([source] if isinstance(source, dict) else source or [])
+    return indexes
+
+
+def get__registration__payload(spec):
+    '''
+    Return the body of the registration request for a source.
+    '''
+    payload = dict(
+        endpoint=spec['endpoint'],
+        environment="k" + spec['environment'],
+        forceRegister=spec['force_register']
+    )
+    if spec['environment'] == "Physical":
+        payload['hostType'] = "k" + spec['host_type']
+        payload['physicalType'] = "k" + spec['physical_type']
+    elif spec['environment'] == "VMware":
+        payload['username'] = spec['source_username']
+        payload['password'] = spec['source_password']
+        payload['vmwareType'] = "k" + spec['vmware_type']
+    elif spec['environment'] == "GenericNas":
+        credentials = dict(nasProtocol='kNfs3')
+        if spec['nas_protocol'] == 'SMB':
+            credentials['nasProtocol'] = 'kCifs1'
+            if "\\" in spec['nas_username']:
+                credentials['domain'], credentials['username'] = spec['nas_username'].split("\\", 1)
+            else:
+                credentials['username'] = spec['nas_username']
+            credentials['password'] = spec['nas_password']
+        credentials['nasType'] = 'k' + spec['nas_type']
+        credentials['skipValidation'] = spec['skip_validation']
+        payload['nasMountCredentials'] = credentials
+    return payload
+
+
+def get__source__plan(specs, indexes):
+    '''
+    Compare the desired sources with the registered sources.
+
+    :return: list of actions containing the endpoint, environment, action
+             (register, unregister or none), source id and request.
+    '''
+    actions = []
+    for spec in specs:
+        # => Physical and GenericNas sources can also be matched by name.
+        source_id = indexes[spec['environment']].get__id__by_endpoint(
+            spec['endpoint'], spec['environment'] in ['Physical', 'GenericNas'])
+        action = dict(endpoint=spec['endpoint'], environment=spec['environment'], action='none',
+                      id=source_id, method=None, path=None, payload=None)
+        if spec['state'] == 'present' and source_id is None:
+            action.update(action='register', method='post', path="/public/protectionSources/register",
+                          payload=get__registration__payload(spec))
+        elif spec['state'] == 'absent' and source_id is not None:
+            action.update(action='unregister', method='delete',
+                          path="/public/protectionSources/" + str(source_id))
+        actions.append(action)
+    return actions
+
+
+def apply__source__plan(session, actions, max_parallel_requests):
+    '''
+    Send the requests for every action which changes a source, in parallel.
+    '''
+    requests = []
+    for index, action in enumerate(actions):
+        if action['method']:
+            requests.append((index, getattr(session, action['method']),
+                             [action['path'], action['payload']]))
+    outcomes = run__concurrent__requests(requests, max_parallel_requests)
+    for index, outcome in outcomes.items():
+        action = actions[index]
+        action['error'] = outcome['error']
+        if not outcome['error'] and action['action'] == 'register':
+            action['id'] = (outcome['result'] or dict()).get('id')
+    return len(requests)
+
+
+def main():
+    # => Load the default arguments including those specific to the Cohesity Protection Sources.
+    argument_spec = cohesity_common_argument_spec()
+    argument_spec.update(
+        dict(
+            sources=dict(type='list', required=True),
+            state=dict(choices=['present', 'absent'], default='present'),
+            environment=dict(choices=['VMware', 'Physical', 'GenericNas'], default='Physical'),
+            host_type=dict(choices=['Linux', 'Windows', 'Aix'], default='Linux'),
+            physical_type=dict(choices=['Host', 'WindowsCluster'], default='Host'),
+            force_register=dict(type='bool', default=False),
+            vmware_type=dict(type='str', default='VCenter'),
+            source_username=dict(type='str', default=''),
+            source_password=dict(type='str', no_log=True, default=''),
+            nas_protocol=dict(choices=['NFS', 'SMB'], default='NFS'),
+            nas_username=dict(type='str', default=''),
+            nas_password=dict(type='str', no_log=True, default=''),
+            nas_type=dict(type='str', default='Host'),
+            skip_validation=dict(type='bool', default=False),
+            max_parallel_requests=dict(type='int', default=MAX_PARALLEL_REQUESTS)
+        )
+    )
+
+    # => Create a new module object
+    module = AnsibleModule(argument_spec=argument_spec,
+                           supports_check_mode=True)
+
+    specs, errors = get__source__specs(module.params)
+    if errors:
+        # => Do not echo the rejected passwords back in the task output.
+        module.no_log_values.update(get__source__secrets(module.params.get('sources')))
+        module.fail_json(msg="Invalid Cohesity Protection Sources: " + "; ".join(errors), changed=False)
+
+    server = module.params.get('cluster')
+    validate_certs = module.params.get('validate_certs')
+    token = get__cohesity_auth__token(module)
+    max_parallel_requests = module.params.get('max_parallel_requests')
+
+    try:
+        session_obj = dict(server=server, token=token, validate_certs=validate_certs)
+        actions = get__source__plan(specs, get__source__indexes(session_obj, specs, max_parallel_requests))
+        requests = 0
+        if not module.check_mode:
+            session = get__cohesity_rest__session(server, token, validate_certs)
+            requests = apply__source__plan(session, actions, max_parallel_requests)
+    except urllib_error.URLError as e:
+        # => Capture and report any error messages.
+        raise__cohesity_exception__handler(e.read(), module)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+
+    sources = [dict(endpoint=action['endpoint'], environment=action['environment'],
+                    action=action['action'], id=action['id'], error=action.get('error'),
+                    changed=action['action'] != 'none' and not action.get('error')) for action in actions]
+    counts = dict((name, len([source for source in sources if source['action'] == name]))
+                  for name in ['register', 'unregister', 'none'])
+    results = dict(
+        changed=any(source['changed'] for source in sources),
+        sources=sources,
+        requests=requests,
+        msg="Cohesity Protection Sources: " + str(counts['register']) + " registered, " +
+            str(counts['unregister']) + " unregistered, " + str(counts['none']) + " unchanged"
+    )
+    failed = [source['endpoint'] for source in sources if source['error']]
+    if failed:
+        results['msg'] = "Failed to manage the Cohesity Protection Sources: " + ", ".join(failed)
+        module.fail_json(**results)
+    if module.check_mode:
+        results['msg'] = "Check Mode: " + results['msg']
+    module.exit_json(**results)
+
+
+if __name__ == '__main__':
+    main()
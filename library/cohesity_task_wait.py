@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import urllib_error
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_task_tracker import RestoreTaskTracker, get__task_ids__by_handles
+    from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
+except ImportError:
+    from ansible.module_utils.storage.cohesity.cohesity_auth import get__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_task_tracker import RestoreTaskTracker, get__task_ids__by_handles
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.0',
+    'supported_by': 'community',
+    'status': ['preview']
+}
+
+DOCUMENTATION = '''
+module: cohesity_task_wait
+short_description: Wait for or check the status of Cohesity Restore and Clone Tasks
+description:
+    - Ansible Module used to wait for Restore and Clone Tasks on a Cohesity Cluster.
+    - Every poll requests the status of all pending tasks together and the delay between polls
+    - grows while none of the tasks make progress.
+    - Together with I(wait_for_job=no) on the restore and clone modules, many tasks can be started
+    - at once and followed from a single task.
+version_added: '2.6.5'
+author:
+  - Cohesity, Inc
+
+options:
+  task_ids:
+    description:
+      - List of Restore or Clone Task ids to wait for.
+      - At least one of I(task_ids) or I(task_handles) is required.
+    type: list
+  task_handles:
+    description:
+      - List of the C(task_handle) values returned by the restore and clone modules.
+    type: list
+  wait_minutes:
+    description:
+      - Number of minutes to wait for every task to finish.
+      - When set to 0, the current status of each task is returned without waiting.
+    type: int
+    default: 30
+  fail_on_error:
+    description:
+      - Fail the module when any of the tasks finished with an error, was canceled or does not exist.
+    type: bool
+    default: yes
+
+extends_documentation_fragment:
+    - cohesity
+requirements: []
+
+'''
+
+EXAMPLES = '''
+
+# Wait for a list of restores to complete
+- name: Wait for the restores
+  cohesity_task_wait:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    task_ids:
+      - 54879
+      - 54881
+    wait_minutes: 60
+
+# Check the status of restores started with wait_for_job set to no
+- name: Check the restores
+  cohesity_task_wait:
+    cluster: cohesity.lab
+    username: admin
+    password: password
+    task_handles: "{{ restores.results | map(attribute='task_handle') | list }}"
+    wait_minutes: 0
+    fail_on_error: no
+
+'''
+
+RETURN = '''
+
+{
+    "changed": false,
+    "msg": "All Cohesity Tasks finished",
+    "failed_task_ids": [],
+    "pending_task_ids": [],
+    "polls": 4,
+    "requests": 4,
+    "tasks": [
+        {
+            "done": true,
+            "errors": [],
+            "failed": false,
+            "id": 54879,
+            "name": "myvcenter.cohesity.demo: Ansible Test VM Restore",
+            "status": "Finished",
+            "type": "RecoverVMs"
+        }
+    ]
+}
+
+'''
+
+
+def main():
+    # => Load the default arguments including those specific to the Cohesity Task Wait.
+    argument_spec = cohesity_common_argument_spec()
+    argument_spec.update(
+        dict(
+            task_ids=dict(type='list', default=[]),
+            task_handles=dict(type='list', default=[]),
+            wait_minutes=dict(type='int', default=30),
+            fail_on_error=dict(type='bool', default=True)
+        )
+    )
+
+    # => Create a new module object
+    module = AnsibleModule(argument_spec=argument_spec,
+                           required_one_of=[['task_ids', 'task_handles']],
+                           supports_check_mode=True)
+
+    server = module.params.get('cluster')
+    validate_certs = module.params.get('validate_certs')
+    token = get__cohesity_auth__token(module)
+
+    try:
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        task_ids = module.params.get('task_ids') + get__task_ids__by_handles(
+            server, module.params.get('task_handles'))
+        tracker = RestoreTaskTracker(session, task_ids)
+        # => In Check Mode or with `wait_minutes=0`, only report the current
+        # => status of each task.
+        status_only = module.check_mode or not module.params.get('wait_minutes')
+        timeout = 0 if status_only else module.params.get('wait_minutes') * 60
+        tasks = tracker.wait(timeout)
+    except urllib_error.URLError as e:
+        # => Capture and report any error messages.
+        raise__cohesity_exception__handler(e.read(), module)
+    except Exception as error:
+        raise__cohesity_exception__handler(error, module)
+
+    results = dict(
+        changed=False,
+        tasks=tasks,
+        pending_task_ids=[task['id'] for task in tasks if not task['done']],
+        failed_task_ids=[task['id'] for task in tasks if task['failed']],
+        polls=tracker.polls,
+        requests=tracker.requests
+    )
+
+    if results['pending_task_ids'] and not status_only:
+        module.fail_json(
+            msg="Timed out waiting for " + str(len(results['pending_task_ids'])) +
+            " of " + str(len(tasks)) + " Cohesity Tasks to finish", **results)
+    if results['failed_task_ids'] and module.params.get('fail_on_error'):
+        module.fail_json(
+            msg=str(len(results['failed_task_ids'])) + " of " + str(len(tasks)) +
+            " Cohesity Tasks failed", **results)
+
+    results['msg'] = "All Cohesity Tasks finished"
+    if results['pending_task_ids']:
+        results['msg'] = str(len(results['pending_task_ids'])) + \
+            " of " + str(len(tasks)) + " Cohesity Tasks are still running"
+    if module.check_mode:
+        results['msg'] = "Check Mode: " + results['msg']
+    module.exit_json(**results)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,16 +8,7 @@ __metaclass__ = type
 import json
 
 from ansible.module_utils.basic import AnsibleModule
-from cohesity_management_sdk.cohesity_client import CohesityClient
-from cohesity_management_sdk.controllers.base_controller import BaseController
 from cohesity_management_sdk.exceptions.api_exception import APIException
-from cohesity_management_sdk.models.create_view_request import CreateViewRequest
-from cohesity_management_sdk.models.nfs_root_permissions import NfsRootPermissions
-from cohesity_management_sdk.models.qo_s import QoS
-from cohesity_management_sdk.models.quota_policy import QuotaPolicy
-from cohesity_management_sdk.models.storage_policy_override import StoragePolicyOverride
-from cohesity_management_sdk.models.subnet import Subnet
-from cohesity_management_sdk.models.update_view_param import UpdateViewParam
 
 try:
     from module_utils.storage.cohesity.cohesity_hints import get_cohesity_client
@@ -80,6 +71,7 @@ def set_security(view_request, module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.subnet import Subnet
     try:
 
         if module.params.get('protocol') == "All" and module.params.get('security').get('security_mode', None):
@@ -111,6 +103,7 @@ def set_quota(view_request, module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.quota_policy import QuotaPolicy
     try:
         quota_policy = QuotaPolicy()
         if module.params.get('quota').get('set_logical_quota', False):
@@ -133,6 +126,7 @@ def set_nfs_options(view_request, module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.nfs_root_permissions import NfsRootPermissions
     try:
         view_request.enable_nfs_view_discovery = module.params.\
             get('nfs_options').get('view_discovery', True)
@@ -171,6 +165,9 @@ def create_view(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.create_view_request import CreateViewRequest
+    from cohesity_management_sdk.models.qo_s import QoS
+    from cohesity_management_sdk.models.storage_policy_override import StoragePolicyOverride
     try:
         create_view_request = CreateViewRequest()
         create_view_request.name = module.params.get('name')
@@ -218,6 +215,9 @@ def update_view(module):
     :param module: object that holds parameters passed to the module
     :return:
     '''
+    from cohesity_management_sdk.models.qo_s import QoS
+    from cohesity_management_sdk.models.storage_policy_override import StoragePolicyOverride
+    from cohesity_management_sdk.models.update_view_param import UpdateViewParam
     try:
         update_view_params = UpdateViewParam()
         update_view_params.description = module.params.get('description')
@@ -299,6 +299,8 @@ def main():
     )
 
     global cohesity_client
+    # => The SDK is only imported once the arguments are valid.
+    from cohesity_management_sdk.controllers.base_controller import BaseController
     base_controller = BaseController()
     base_controller.global_headers['user-agent'] = 'cohesity-ansible/v2.3.4'
     cohesity_client = get_cohesity_client(module)
@@ -0,0 +1,172 @@
+#
+# cohesity_agent_probe
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityAgentProbe** utils module finds the state of the Cohesity Agent
+on a Linux host by reading `/proc` instead of running `ps`, `grep` and `kill`
+commands, and keeps the manifest of the installed agent.
+'''
+
+import errno
+import json
+import os
+import signal
+
+
+AIX_AGENT_PATH = "/usr/local/cohesity/agent/aix_agent.sh"
+DEFAULT_AGENT_PATH = "/etc/init.d/cohesity-agent"
+AGENT_CONFIG_PATH = "/etc/cohesity-agent"
+# => Any process running this executable while the agent is not installed is an orphan.
+AGENT_EXECUTABLE = "crux/bin/linux_agent"
+# => Record of the agent installed by the module, kept outside of the agent
+# => directories so that it is not changed by the agent installers.
+AGENT_MANIFEST_PATH = "/var/lib/cohesity-ansible/agent.json"
+
+
+def get__process__command(proc_path, pid):
+    '''
+    Return the arguments of a process or None when it has exited.
+    '''
+    try:
+        with open(os.path.join(proc_path, pid, 'cmdline'), 'rb') as cmdline:
+            return [arg.decode('utf-8', 'replace') for arg in cmdline.read().split(b'\0') if arg]
+    except (IOError, OSError):
+        return None
+
+
+class AgentProbe(object):
+    '''
+    Probe of the Cohesity Agent installed on this host
+
+    Every result is computed once and kept for the module run.  The module
+    calls reset() once it has installed or removed the agent.
+    '''
+
+    def __init__(self, proc_path='/proc', manifest_path=AGENT_MANIFEST_PATH):
+        self.proc_path = proc_path
+        self.manifest_path = manifest_path
+        self.results = dict()
+
+    def reset(self):
+        self.results = dict()
+
+    def _memoize(self, name, fetch):
+        if name not in self.results:
+            self.results[name] = fetch()
+        return self.results[name]
+
+    def get__agent__path(self):
+        '''
+        Return the path of the agent service script or None when not installed.
+        '''
+        def fetch():
+            for path in (DEFAULT_AGENT_PATH, AIX_AGENT_PATH):
+                if os.path.exists(path):
+                    return path
+            return None
+        return self._memoize('agent_path', fetch)
+
+    def get__version(self, module):
+        '''
+        Return the installed version with the output of the version command.
+
+        The agent is asked for its version once, whichever way it was
+        installed, so that the version always has the format of the Cluster
+        version.
+
+        :return: tuple of the version ('' when unknown), stdout and stderr
+        '''
+        def fetch():
+            rc, out, err = module.run_command("%s version" % self.get__agent__path())
+            for line in out.split("\n"):
+                if line.startswith('Version'):
+                    return line.split(" ")[-1], out, err
+            return '', out, err
+        return self._memoize('version', fetch)
+
+    def get__orphaned__processes(self, module):
+        '''
+        Return the ids of the processes running the agent executable.
+        '''
+        def fetch():
+            if not os.path.exists(os.path.join(self.proc_path, 'self', 'cmdline')):
+                # => Without a Linux /proc, fall back to listing the processes.
+                rc, out, err = module.run_command(
+                    "ps -aux | grep %s | grep -v python | awk '{print $2}'" % AGENT_EXECUTABLE,
+                    check_rc=True, use_unsafe_shell=True)
+                return [int(pid) for pid in out.split() if pid.isdigit()]
+            pids = []
+            for pid in os.listdir(self.proc_path):
+                if not pid.isdigit() or int(pid) == os.getpid():
+                    continue
+                command = get__process__command(self.proc_path, pid)
+                if command and command[0].endswith(AGENT_EXECUTABLE):
+                    pids.append(int(pid))
+            return sorted(pids)
+        return self._memoize('orphans', fetch)
+
+    def kill__orphaned__processes(self, module):
+        '''
+        Send SIGKILL to every orphaned agent process.
+
+        :return: dictionary of the process id => error for the processes
+                 which could not be killed
+        '''
+        failures = dict()
+        for pid in self.get__orphaned__processes(module):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError as error:
+                # => The process has already exited.
+                if error.errno != errno.ESRCH:
+                    failures[pid] = os.strerror(error.errno)
+        self.results['orphans'] = sorted(failures)
+        return failures
+
+    def get__manifest(self):
+        '''
+        Return the manifest written when the agent was installed or None.
+        '''
+        def fetch():
+            try:
+                with open(self.manifest_path, 'r') as manifest_file:
+                    manifest = json.load(manifest_file)
+            except (IOError, OSError, ValueError):
+                return None
+            return manifest if isinstance(manifest, dict) else None
+        return self._memoize('manifest', fetch)
+
+    def set__manifest(self, manifest):
+        '''
+        Record the installed agent, replacing the manifest atomically.
+        '''
+        directory = os.path.dirname(self.manifest_path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        tmp_filename = self.manifest_path + ".tmp." + str(os.getpid())
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, sort_keys=True)
+        os.rename(tmp_filename, self.manifest_path)
+        self.results['manifest'] = manifest
+
+    def remove__manifest(self):
+        try:
+            os.remove(self.manifest_path)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+        self.results['manifest'] = None
+
+
+# => Probe shared by every check in this module run.
+_agent_probe = AgentProbe()
+
+
+def get__agent__probe():
+    return _agent_probe
@@ -0,0 +1,428 @@
+#
+# cohesity_agent_repository
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityAgentRepository** utils module publishes the native agent
+packages into a local package repository and writes the repository
+configuration of the hosts, so that the hosts install the agent with their
+own package manager.
+'''
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tarfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ansible.module_utils._text import to_bytes, to_native
+
+
+AGENT_PACKAGE_NAME = "cohesity-agent"
+REPOSITORY_NAME = "cohesity-agent"
+# => Repository format of each native package type of the agent.
+REPOSITORY_FORMATS = dict(
+    kDEB='deb',
+    kRPM='rpm',
+    kSuseRPM='rpm'
+)
+# => The rpm metadata is generated by the first of these commands found on the mirror.
+CREATEREPO_COMMANDS = ('createrepo_c', 'createrepo')
+DEB_INDEX_FILES = ('Packages', 'Packages.gz')
+RPM_LEAD_MAGIC = b'\xed\xab\xee\xdb'
+RPM_HEADER_MAGIC = b'\x8e\xad\xe8\x01'
+RPM_TAGS = {1000: 'name', 1001: 'version', 1002: 'release', 1022: 'arch'}
+RPM_STRING_TYPES = (6, 9)
+DEB_SOURCES_PATH = "/etc/apt/sources.list.d/cohesity-agent.list"
+DEB_PREFERENCES_PATH = "/etc/apt/preferences.d/cohesity-agent"
+DEB_KEYRING_PATH = "/etc/apt/keyrings/cohesity-agent.asc"
+RPM_KEY_PATH = "/etc/pki/rpm-gpg/RPM-GPG-KEY-cohesity-agent"
+RPM_REPOSITORY_PATH = "/etc/yum.repos.d/cohesity-agent.repo"
+SUSE_REPOSITORY_PATH = "/etc/zypp/repos.d/cohesity-agent.repo"
+# => Public key of a signed repository, published next to the metadata.
+REPOSITORY_KEY_FILE = "cohesity-agent.asc"
+# => Signature file of the metadata of each repository format.
+SIGNATURE_FILES = dict(
+    deb='InRelease',
+    rpm=os.path.join('repodata', 'repomd.xml.asc')
+)
+
+
+class RepositoryError(Exception):
+    pass
+
+
+def get__file__digests(filename, algorithms=('md5', 'sha1', 'sha256'), chunk_size=1024 * 1024):
+    '''
+    Return the hex digests of the file for each algorithm from a single read.
+    '''
+    digests = [hashlib.new(algorithm) for algorithm in algorithms]
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            for digest in digests:
+                digest.update(chunk)
+    return dict((algorithm, digest.hexdigest()) for algorithm, digest in zip(algorithms, digests))
+
+
+def get__deb__control(filename):
+    '''
+    Return the text of the control file of a Debian package.
+    '''
+    with open(filename, 'rb') as f:
+        if f.read(8) != b'!<arch>\n':
+            raise RepositoryError(filename + " is not a Debian package")
+        while True:
+            header = f.read(60)
+            if len(header) < 60:
+                break
+            name = to_native(header[:16]).strip().rstrip('/')
+            size = int(to_native(header[48:58]).strip())
+            if not name.startswith('control.tar'):
+                # => Members are aligned to an even offset.
+                f.seek(size + size % 2, 1)
+                continue
+            try:
+                with tarfile.open(fileobj=io.BytesIO(f.read(size))) as control:
+                    for member in control.getmembers():
+                        if member.isfile() and os.path.basename(member.name) == 'control':
+                            return to_native(control.extractfile(member).read())
+            except tarfile.TarError as error:
+                raise RepositoryError("Failed to read " + name + " of " + filename + ": " + to_native(error))
+    raise RepositoryError(filename + " does not have a control file")
+
+
+def get__deb__fields(control):
+    '''
+    Return the top level fields of a control file.
+    '''
+    fields = dict()
+    for line in control.splitlines():
+        if line and not line[0].isspace() and ':' in line:
+            name, value = line.split(':', 1)
+            fields[name] = value.strip()
+    return fields
+
+
+def _read__rpm__header(f):
+    intro = f.read(16)
+    if intro[:4] != RPM_HEADER_MAGIC:
+        raise RepositoryError("Invalid rpm header")
+    count, size = struct.unpack('>II', intro[8:16])
+    return f.read(16 * count), f.read(size)
+
+
+def get__rpm__header(filename):
+    '''
+    Return the name, version, release and arch of an rpm package from its
+    header.
+    '''
+    with open(filename, 'rb') as f:
+        if f.read(96)[:4] != RPM_LEAD_MAGIC:
+            raise RepositoryError(filename + " is not an rpm package")
+        # => The signature header is padded to a multiple of 8 bytes.
+        index, store = _read__rpm__header(f)
+        f.seek((8 - len(store) % 8) % 8, 1)
+        index, store = _read__rpm__header(f)
+    fields = dict()
+    for position in range(0, len(index), 16):
+        tag, tag_type, offset, count = struct.unpack('>IIII', index[position:position + 16])
+        if tag in RPM_TAGS and tag_type in RPM_STRING_TYPES:
+            fields[RPM_TAGS[tag]] = to_native(store[offset:store.index(b'\0', offset)])
+    return fields
+
+
+def get__package__info(filename, repository_format):
+    '''
+    Return the name and version of a package.  The version of an rpm package
+    includes its release.
+    '''
+    if repository_format == 'deb':
+        fields = get__deb__fields(get__deb__control(filename))
+        return dict(name=fields.get('Package'), version=fields.get('Version'))
+    header = get__rpm__header(filename)
+    return dict(name=header.get('name'), version=header.get('version') + '-' + header.get('release'))
+
+
+def _write__atomic(filename, content):
+    temp = filename + '.tmp.' + str(os.getpid())
+    with open(temp, 'wb') as f:
+        f.write(content)
+    os.chmod(temp, 0o644)
+    os.rename(temp, filename)
+
+
+def write__deb__index(repository_dir):
+    '''
+    Write the Packages, Packages.gz and Release files of a flat Debian
+    repository holding every package of the directory.
+    '''
+    stanzas = []
+    for name in sorted(os.listdir(repository_dir)):
+        filename = os.path.join(repository_dir, name)
+        if not name.endswith('.deb') or not os.path.isfile(filename):
+            continue
+        digests = get__file__digests(filename)
+        stanzas.append(get__deb__control(filename).rstrip('\n') + "\n" +
+                       "Filename: ./" + name + "\n" +
+                       "Size: " + str(os.path.getsize(filename)) + "\n" +
+                       "MD5sum: " + digests['md5'] + "\n" +
+                       "SHA1: " + digests['sha1'] + "\n" +
+                       "SHA256: " + digests['sha256'] + "\n")
+    packages = to_bytes("\n".join(stanzas))
+    compressed = io.BytesIO()
+    # => A fixed mtime keeps Packages.gz unchanged while the packages are unchanged.
+    with gzip.GzipFile(fileobj=compressed, mode='wb', mtime=0) as f:
+        f.write(packages)
+    indexes = dict(zip(DEB_INDEX_FILES, (packages, compressed.getvalue())))
+    release = "Origin: Cohesity\nLabel: " + REPOSITORY_NAME + "\n" + \
+        "Date: " + time.strftime("%a, %d %b %Y %H:%M:%S UTC", time.gmtime()) + "\n"
+    for field, algorithm in (('MD5Sum', 'md5'), ('SHA256', 'sha256')):
+        release += field + ":\n"
+        for name in DEB_INDEX_FILES:
+            release += " " + hashlib.new(algorithm, indexes[name]).hexdigest() + " " + \
+                str(len(indexes[name])) + " " + name + "\n"
+    for name in DEB_INDEX_FILES:
+        _write__atomic(os.path.join(repository_dir, name), indexes[name])
+    _write__atomic(os.path.join(repository_dir, 'Release'), to_bytes(release))
+
+
+def write__rpm__metadata(module, repository_dir):
+    '''
+    Generate the repodata of an rpm repository with createrepo.
+    '''
+    for command in CREATEREPO_COMMANDS:
+        createrepo = module.get_bin_path(command)
+        if createrepo:
+            break
+    else:
+        raise RepositoryError("createrepo_c or createrepo is required to publish rpm packages")
+    rc, out, err = module.run_command([createrepo, repository_dir])
+    if rc:
+        raise RepositoryError("Failed to generate the repository metadata: " + (err or out))
+
+
+def get__repository__key(module, gpg_key):
+    '''
+    Return the ASCII armored public key of the gpg key which signs the repository.
+    '''
+    gpg = module.get_bin_path('gpg')
+    if not gpg:
+        raise RepositoryError("gpg is required to sign the repository")
+    rc, out, err = module.run_command([gpg, '--batch', '--armor', '--export', gpg_key])
+    if rc or not out.strip():
+        raise RepositoryError("Failed to export the gpg key " + gpg_key + ": " + (err or "the key was not found"))
+    return out
+
+
+def sign__repository(module, repository_dir, repository_format, gpg_key):
+    '''
+    Sign the metadata of the repository with the gpg key.  Debian repositories
+    get both the InRelease and Release.gpg signatures of the Release file.
+    '''
+    gpg = module.get_bin_path('gpg', required=True)
+    command = [gpg, '--batch', '--yes', '--local-user', gpg_key]
+    if repository_format == 'deb':
+        release = os.path.join(repository_dir, 'Release')
+        signatures = [(['--clearsign'], os.path.join(repository_dir, 'InRelease'), release),
+                      (['--armor', '--detach-sign'], os.path.join(repository_dir, 'Release.gpg'), release)]
+    else:
+        repomd = os.path.join(repository_dir, 'repodata', 'repomd.xml')
+        signatures = [(['--armor', '--detach-sign'], repomd + '.asc', repomd)]
+    for options, signature, filename in signatures:
+        temp = signature + '.tmp.' + str(os.getpid())
+        rc, out, err = module.run_command(command + options + ['--output', temp, filename])
+        if rc:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise RepositoryError("Failed to sign " + filename + ": " + (err or out))
+        os.chmod(temp, 0o644)
+        os.rename(temp, signature)
+
+
+def is__repository__current(repository_dir, repository_format, key=None):
+    if repository_format == 'deb':
+        current = all(os.path.exists(os.path.join(repository_dir, name)) for name in DEB_INDEX_FILES)
+    else:
+        current = os.path.exists(os.path.join(repository_dir, 'repodata', 'repomd.xml'))
+    if current and key:
+        # => The metadata must also be signed by the current key.
+        try:
+            with open(os.path.join(repository_dir, REPOSITORY_KEY_FILE), 'r') as f:
+                current = f.read() == key
+        except (IOError, OSError):
+            current = False
+        current = current and os.path.exists(os.path.join(repository_dir, SIGNATURE_FILES[repository_format]))
+    return current
+
+
+def publish__package(module, repository_dir, filename, package_type, gpg_key=None):
+    '''
+    Add a package to the repository and regenerate the repository metadata,
+    signed with the gpg key when given.
+
+    A lock is held while the repository is changed so that tasks running at
+    the same time for many hosts publish the package once.
+
+    :return: dictionary of the path, name and version of the published
+             package, the public key of the repository and whether the
+             repository changed
+    '''
+    repository_format = REPOSITORY_FORMATS[package_type]
+    key = get__repository__key(module, gpg_key) if gpg_key else None
+    if not os.path.isdir(repository_dir):
+        try:
+            os.makedirs(repository_dir)
+        except OSError:
+            # => Created by another task in the meantime.
+            if not os.path.isdir(repository_dir):
+                raise
+    lock = open(repository_dir + '.lock', 'w')
+    try:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        target = os.path.join(repository_dir, os.path.basename(filename))
+        changed = not os.path.isfile(target) or \
+            get__file__digests(target, ('sha256',)) != get__file__digests(filename, ('sha256',))
+        if changed:
+            temp = target + '.tmp.' + str(os.getpid())
+            try:
+                # => The cache and the repository are usually on the same file system.
+                os.link(filename, temp)
+            except OSError:
+                shutil.copyfile(filename, temp)
+            os.chmod(temp, 0o644)
+            os.rename(temp, target)
+        if changed or not is__repository__current(repository_dir, repository_format, key):
+            changed = True
+            if repository_format == 'deb':
+                write__deb__index(repository_dir)
+            else:
+                write__rpm__metadata(module, repository_dir)
+            if key:
+                sign__repository(module, repository_dir, repository_format, gpg_key)
+                _write__atomic(os.path.join(repository_dir, REPOSITORY_KEY_FILE), to_bytes(key))
+        return dict(get__package__info(target, repository_format), path=target, gpg_key=key or '',
+                    changed=changed)
+    finally:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+
+def get__repository__files(package_type, url, version='', gpg_key='', trusted=False):
+    '''
+    Return the repository configuration of a host which installs the agent
+    from the repository at the url, pinned to the version when given.
+
+    The metadata of the repository is verified with the ASCII armored public
+    key.  Without a key the repository is only used when it is explicitly
+    trusted.
+
+    :return: dictionary of the path => content of each configuration file
+    '''
+    if not gpg_key and not trusted:
+        raise RepositoryError("The public key of the repository is required unless the repository is trusted")
+    if package_type == 'kDEB':
+        if gpg_key:
+            files = {DEB_SOURCES_PATH: "deb [signed-by=" + DEB_KEYRING_PATH + "] " + url + " ./\n",
+                     DEB_KEYRING_PATH: gpg_key}
+        else:
+            files = {DEB_SOURCES_PATH: "deb [trusted=yes] " + url + " ./\n"}
+        if version:
+            files[DEB_PREFERENCES_PATH] = "Package: " + AGENT_PACKAGE_NAME + "\n" + \
+                "Pin: version " + version + "\n" + \
+                "Pin-Priority: 1001\n"
+        return files
+    repository = "[" + REPOSITORY_NAME + "]\n" + \
+        "name=Cohesity Agent\n" + \
+        "baseurl=" + url + "\n" + \
+        "enabled=1\n"
+    files = dict()
+    if gpg_key:
+        # => The packages are published as downloaded from the Cluster, so the signed
+        # => metadata, which holds the checksum of each package, is what is verified.
+        repository += "gpgcheck=0\n" + \
+            "repo_gpgcheck=1\n" + \
+            "gpgkey=file://" + RPM_KEY_PATH + "\n"
+        files[RPM_KEY_PATH] = gpg_key
+    else:
+        repository += "gpgcheck=0\n"
+    if package_type == 'kSuseRPM':
+        if gpg_key:
+            repository += "pkg_gpgcheck=0\n"
+        files[SUSE_REPOSITORY_PATH] = repository + "autorefresh=1\ntype=rpm-md\n"
+        return files
+    # => Only the pinned version of the agent is offered by the repository.
+    repository += "metadata_expire=0\n"
+    if version:
+        repository += "includepkgs=" + AGENT_PACKAGE_NAME + "-" + version + "\n"
+    files[RPM_REPOSITORY_PATH] = repository
+    return files
+
+
+def get__repository__commands(package_type, version='', signed=False):
+    '''
+    Return the commands which refresh the repository and install the agent.
+    '''
+    commands = []
+    if signed and package_type != 'kDEB':
+        # => Trust the key before the package manager first reads the signed metadata.
+        commands.append(['rpm', '--import', RPM_KEY_PATH])
+    if package_type == 'kDEB':
+        return [
+            ['apt-get', 'update', '-o', 'Dir::Etc::sourcelist=' + DEB_SOURCES_PATH,
+             '-o', 'Dir::Etc::sourceparts=/dev/null', '-o', 'APT::Get::List-Cleanup=0'],
+            ['apt-get', 'install', '-y', AGENT_PACKAGE_NAME + ('=' + version if version else '')]]
+    if package_type == 'kSuseRPM':
+        return commands + [
+            ['zypper', '--non-interactive', 'refresh', REPOSITORY_NAME],
+            ['zypper', '--non-interactive', 'install', AGENT_PACKAGE_NAME + ('=' + version if version else '')]]
+    return commands + [['yum', '-y', 'install', AGENT_PACKAGE_NAME + ('-' + version if version else '')]]
+
+
+def set__repository__files(files):
+    '''
+    Write the configuration files whose content differs.
+
+    :return: True when a file was written
+    '''
+    changed = False
+    for path in sorted(files):
+        try:
+            with open(path, 'r') as f:
+                if f.read() == files[path]:
+                    continue
+        except (IOError, OSError):
+            pass
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), 0o755)
+        _write__atomic(path, to_bytes(files[path]))
+        changed = True
+    return changed
+
+
+def remove__repository__files():
+    '''
+    Remove the repository configuration of every package manager.
+
+    :return: True when a file was removed
+    '''
+    changed = False
+    for path in (DEB_SOURCES_PATH, DEB_PREFERENCES_PATH, DEB_KEYRING_PATH, RPM_REPOSITORY_PATH,
+                 SUSE_REPOSITORY_PATH, RPM_KEY_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+            changed = True
+    return changed
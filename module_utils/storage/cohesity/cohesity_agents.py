@@ -0,0 +1,195 @@
+#
+# cohesity_agents
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityAgents** utils module finds the Physical Agents of many hosts in
+a single Protection Source listing and follows the Cluster side upgrade of all
+of them together.
+'''
+
+import time
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+    from module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay, WAIT_INTERVAL, WAIT_MAX_INTERVAL
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay, WAIT_INTERVAL, WAIT_MAX_INTERVAL
+
+
+# => Fields kept for each Physical Protection Source when the listing is streamed.
+AGENT_FIELDS = dict((name, True) for name in (
+    'id', 'name', 'version', 'status', 'statusMessage',
+    'upgradability', 'upgradeStatus', 'upgradeStatusMessage'))
+AGENT_NODE_FIELDS = dict(
+    protectionSource=dict(id=True, name=True, physicalProtectionSource=dict(agents=AGENT_FIELDS)),
+    registrationInfo=dict(accessInfo=dict(endpoint=True))
+)
+AGENT_NODE_FIELDS['nodes'] = AGENT_NODE_FIELDS
+
+AGENT_HEALTHY_STATUS = 'kHealthy'
+AGENT_UPGRADE_PATH = "/public/physicalAgents/upgrade"
+# => Number of agent ids sent in a single upgrade request.
+AGENT_UPGRADE_BATCH_SIZE = 100
+
+
+def get__physical__agents(session):
+    '''
+    Return the agent of every Physical Protection Source from one listing.
+
+    :param session: CohesityRestSession
+    :return: dictionary of host name and endpoint => dictionary of the
+             source_id, name and agent of the host
+    '''
+    with session.stream("/public/protectionSources", params=dict(environments="kPhysical")) as response:
+        roots = load__json__fields(response, AGENT_NODE_FIELDS)
+    agents = dict()
+    for root in roots or []:
+        for node in root.get('nodes') or []:
+            source = node.get('protectionSource') or dict()
+            host_agents = (source.get('physicalProtectionSource') or dict()).get('agents') or []
+            if not host_agents:
+                continue
+            record = dict(source_id=source.get('id'), name=source.get('name'), agent=host_agents[0])
+            endpoint = ((node.get('registrationInfo') or dict()).get('accessInfo') or dict()).get('endpoint')
+            for key in (source.get('name'), endpoint):
+                if key:
+                    agents.setdefault(key, record)
+    return agents
+
+
+def get__agent__upgrade__state(agent):
+    '''
+    Return 'failed', 'finished' or 'pending' for the upgrade of an agent.
+    '''
+    if not agent or agent.get('upgradeStatusMessage'):
+        return 'failed'
+    # => The status of an earlier upgrade is still reported until the Cluster
+    # => picks up the new request, but the agent is then no longer upgradable.
+    if agent.get('upgradeStatus') == 'kFinished' and agent.get('upgradability') != 'kUpgradable':
+        return 'finished'
+    return 'pending'
+
+
+class AgentUpgradeTracker(object):
+    '''
+    Upgrade the Physical Agents of many hosts from the Cluster
+
+    The upgrade of each group of hosts is requested with the ids of all of their
+    agents and every poll refreshes all of the agents from a single listing
+    instead of one listing per host.  An upgrade is only done once the agent is
+    healthy again.
+    '''
+
+    def __init__(self, session, agents):
+        '''
+        :param agents: dictionary returned by get__physical__agents
+        '''
+        self.session = session
+        self.agents = agents
+        # => host => version before the upgrade
+        self.previous = dict()
+        self.polls = 0
+        self.requests = 0
+
+    def start(self, hosts):
+        '''
+        Request the upgrade of the agents of the hosts.
+        '''
+        agent_ids = [self.agents[host]['agent']['id'] for host in hosts]
+        for start in range(0, len(agent_ids), AGENT_UPGRADE_BATCH_SIZE):
+            self.session.post(AGENT_UPGRADE_PATH, data=dict(
+                agentIds=agent_ids[start:start + AGENT_UPGRADE_BATCH_SIZE]))
+            self.requests += 1
+        for host in hosts:
+            agent = self.agents[host]['agent']
+            self.previous[host] = agent.get('version')
+            self.agents[host] = dict(self.agents[host], agent=dict(
+                agent, upgradeStatus='kAccepted', upgradeStatusMessage=None))
+
+    def get__agent(self, host):
+        return (self.agents.get(host) or dict()).get('agent')
+
+    def is__healthy(self, host):
+        return (self.get__agent(host) or dict()).get('status') == AGENT_HEALTHY_STATUS
+
+    def is__done(self, host):
+        state = get__agent__upgrade__state(self.get__agent(host))
+        return state == 'failed' or (state == 'finished' and self.is__healthy(host))
+
+    def get__pending(self, hosts):
+        return [host for host in hosts if not self.is__done(host)]
+
+    def poll(self):
+        '''
+        Refresh the agent of every host from one listing.
+        '''
+        agents = get__physical__agents(self.session)
+        self.requests += 1
+        self.polls += 1
+        for host in self.previous:
+            # => A host which is no longer registered is reported as failed.
+            self.agents[host] = agents.get(host)
+
+    def wait(self, hosts, timeout, interval=None, max_interval=None):
+        '''
+        Poll until the upgrade of every host has finished or the deadline passes.
+
+        The delay between polls is reset whenever a host finishes and grows
+        while none of the hosts make progress.
+
+        :param timeout: number of seconds to wait
+        :return: list of upgrade status dictionaries
+        '''
+        deadline = time.time() + timeout
+        idle = 0
+        pending = self.get__pending(hosts)
+        while pending:
+            self.poll()
+            still_pending = self.get__pending(hosts)
+            if len(still_pending) < len(pending):
+                idle = 0
+            elif (interval or WAIT_INTERVAL) * 2 ** idle < (max_interval or WAIT_MAX_INTERVAL):
+                # => Stop growing once the delay has reached max_interval.
+                idle += 1
+            pending = still_pending
+            remaining = deadline - time.time()
+            if not pending or remaining <= 0:
+                break
+            delay = get__backoff__delay(idle, interval, max_interval)
+            time.sleep(min(delay, remaining))
+        return self.get__status(hosts)
+
+    def get__status(self, hosts):
+        '''
+        Return the upgrade status and health of the agent of each host.  Hosts
+        which are still upgrading or are not healthy again are reported as
+        failed.
+        '''
+        output = []
+        for host in hosts:
+            agent = self.get__agent(host) or dict()
+            state = get__agent__upgrade__state(self.get__agent(host))
+            done = self.is__done(host)
+            output.append(dict(
+                host=host,
+                source_id=(self.agents.get(host) or dict()).get('source_id'),
+                agent_id=agent.get('id'),
+                previous_version=self.previous.get(host),
+                version=agent.get('version'),
+                status=(agent.get('status') or '').lstrip('k') or None,
+                upgrade_status=(agent.get('upgradeStatus') or '').lstrip('k') or None,
+                healthy=self.is__healthy(host),
+                done=done,
+                failed=state == 'failed' or not done,
+                message=agent.get('upgradeStatusMessage') or agent.get('statusMessage') or
+                ('' if agent else "The host is no longer registered")
+            ))
+        return output
@@ -12,11 +12,28 @@ for Cohesity Platforms.
 '''
 
 
+import errno
+import hashlib
 import json
+import os
+import time
+from contextlib import contextmanager
 from ansible.module_utils.urls import open_url, urllib_error
 import ansible.module_utils.six.moves.urllib.error as urllib_error
 from ansible.module_utils._text import to_bytes, to_native, to_text
 
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# => The Cohesity Cluster issues Bearer Tokens which are valid for 24 hours.  Cached
+# => tokens are retired a few minutes early so that a token never expires mid-task.
+TOKEN_LIFETIME = 24 * 60 * 60
+TOKEN_EXPIRY_MARGIN = 5 * 60
+DEFAULT_TOKEN_CACHE_PATH = '~/.ansible/cohesity/tokens'
+
 
 class ParameterViolation(Exception):
     pass
@@ -26,15 +43,93 @@ class TokenException(Exception):
     pass
 
 
+class TokenCache(object):
+    '''
+    Control node cache for Cohesity Bearer Tokens
+
+    Tokens are stored per cluster, username and domain in a file which is only
+    readable by the current user.  Every read and write is done while holding a
+    lock so that parallel forks can share a single token.
+    '''
+
+    def __init__(self, server, username, domain="", path=None):
+        self.path = os.path.expanduser(path or DEFAULT_TOKEN_CACHE_PATH)
+        key = "|".join([server.lower(), (domain or "").lower(), username.lower()])
+        self.filename = os.path.join(
+            self.path, hashlib.sha256(to_bytes(key)).hexdigest() + ".json")
+
+    @contextmanager
+    def lock(self):
+        '''
+        Hold an exclusive lock on the cache entry for the duration of the block.
+        '''
+        self._ensure_path()
+        fd = os.open(self.filename + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield self
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def load(self):
+        '''
+        Return the cached token and the time it was issued.  Missing, unreadable
+        or expired entries return an empty token.
+        '''
+        try:
+            with open(self.filename, 'r') as cache_file:
+                entry = json.load(cache_file)
+            token = entry['accessToken']
+            issued_at = float(entry['issuedAt'])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return "", 0
+        if time.time() - issued_at >= TOKEN_LIFETIME - TOKEN_EXPIRY_MARGIN:
+            return "", 0
+        return token, issued_at
+
+    def store(self, token, issued_at):
+        '''
+        Atomically replace the cache entry with the selected token.
+        '''
+        self._ensure_path()
+        tmp_filename = self.filename + ".tmp." + str(os.getpid())
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(dict(accessToken=token, issuedAt=issued_at), cache_file)
+        os.rename(tmp_filename, self.filename)
+
+    def invalidate(self, token=None):
+        '''
+        Remove the cache entry.  When a token is provided, the entry is only
+        removed if it still holds that token.
+        '''
+        if token is not None and self.load()[0] not in ("", token):
+            return
+        try:
+            os.remove(self.filename)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+
+    def _ensure_path(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+
+
 class Authentication(object):
     ''' Cohesity API Authentication Mechanism '''
 
     def __init__(self):
         self.token = ""
+        self.issued_at = 0
         self.username = ""
         self.password = ""
         self.domain = ""
         self.ssl_validation = False
+        self.cache = None
 
     def get_token(self, server):
         '''
@@ -61,6 +156,11 @@ class Authentication(object):
             if errors:
                 raise ParameterViolation(errors)
 
+        # => When a token cache is configured, try to reuse a token which was issued
+        # => to another task or fork before requesting a new one.
+        if self.token == "" and self.cache:
+            self.token, self.issued_at = self.cache.load()
+
         valid_token = False
         # => The generated token is valid for 24 hours. If a request is made with an expired
         # => token, the 'Token expired' error message is returned.
@@ -69,67 +169,115 @@ class Authentication(object):
 
         # => Without a valid token, we will need to make a call to request the accessToken.
         if not valid_token:
-            uri = "https://" + server + "/irisservices/api/v1/public/accessTokens"
-            headers = {"Accept": "application/json"}
-            payload = {"username": self.username, "password": self.password}
-            # => If the domain property is set, then we should include this into the Dict
-            if self.domain:
-                payload['domain'] = self.domain
-            data = json.dumps(payload)
-            try:
-                # => Attempt to POST the data to the /public/accessTokens endpoint and get back
-                # => a valid Token that will be placed into `self.token`.
-                data = open_url(url=uri, data=data, headers=headers,
-                                validate_certs=self.ssl_validation, timeout=120)
-                response = json.loads(data.read())
-                self.token = response['accessToken']
-                return self.token
-            except urllib_error.URLError as error:
-                try:
-                    # => Fixing this to deal with issues during unit testing
-                    error = error.read()
-                except Exception as e:
-                    pass
-                raise TokenException(error)
-            except IOError as error:
-                raise TokenException(error)
+            if not self.cache:
+                return self._request_token(server)
+            with self.cache.lock():
+                # => Another fork may have refreshed the token while we were waiting
+                # => on the lock so check the cache once more before requesting one.
+                token, issued_at = self.cache.load()
+                if token and token != self.token:
+                    self.token, self.issued_at = token, issued_at
+                    return self.token
+                self._request_token(server)
+                self.cache.store(self.token, self.issued_at)
+            return self.token
         else:
             return self.token
 
+    def _request_token(self, server):
+        '''
+        Request a new Bearer Token from the Cluster
+        '''
+        uri = "https://" + server + "/irisservices/api/v1/public/accessTokens"
+        headers = {"Accept": "application/json"}
+        payload = {"username": self.username, "password": self.password}
+        # => If the domain property is set, then we should include this into the Dict
+        if self.domain:
+            payload['domain'] = self.domain
+        data = json.dumps(payload)
+        try:
+            # => Attempt to POST the data to the /public/accessTokens endpoint and get back
+            # => a valid Token that will be placed into `self.token`.
+            data = open_url(url=uri, data=data, headers=headers,
+                            validate_certs=self.ssl_validation, timeout=120)
+            response = json.loads(data.read())
+            self.token = response['accessToken']
+            self.issued_at = time.time()
+            return self.token
+        except urllib_error.URLError as error:
+            try:
+                # => Fixing this to deal with issues during unit testing
+                error = error.read()
+            except Exception as e:
+                pass
+            raise TokenException(error)
+        except IOError as error:
+            raise TokenException(error)
+
     def check_token(self, server):
         '''
         Verify an existing Bearer Token
 
-        If the token is expired, then clear the stored Token and return execute
-        the method `get_token` to generate a new token.
+        The token is validated locally against the time it was issued so no
+        request is made to the Cluster.  Tokens which are close to the end of
+        their 24 hour lifetime are dropped from the cache and False is returned
+        so that the method `get_token` generates a new token.  Tokens which the
+        Cluster expires early are handled by `refresh_token`.
 
         requires:
-          username
-          password
-          domain
           token
         '''
-        # => This method will validate an existing Token if configured to see if
-        # => this object needs to be refreshed.
-        check_uri = "https://" + server + "/irisservices/api/v1/public/nodes"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self.token}
-        try:
-            open_url(url=check_uri, headers=headers,
-                     validate_certs=self.ssl_validation, timeout=120)
-            return self
-        except urllib_error.HTTPError as e:
-            try:
-                msg = json.loads(e.read())['message']
-            except Exception as e:
-                # => For HTTPErrors that return no JSON with a message (bad errors), we
-                # => will need to handle this by setting the msg variable to some default.
-                msg = "no-json-data"
-            if msg == "Token expired":
-                self.token = ""
-                self.get_token(server)
-            else:
-                raise TokenException(e)
+        # => Tokens without a known issue time were handed to us by the caller so
+        # => we trust them until the Cluster reports otherwise.
+        if not self.issued_at:
+            return True
+        if time.time() - self.issued_at < TOKEN_LIFETIME - TOKEN_EXPIRY_MARGIN:
+            return True
+        if self.cache:
+            self.cache.invalidate(self.token)
+        return False
+
+    def refresh_token(self, server, expired_token):
+        '''
+        Replace a Bearer Token which was rejected by the Cluster as expired
+
+        If the token was already replaced (e.g. by an earlier request which
+        received the same error), the current token is returned and no new
+        token is requested.
+        '''
+        if self.token and self.token != expired_token:
+            return self.token
+        if self.cache:
+            self.cache.invalidate(expired_token)
+        self.token = ""
+        self.issued_at = 0
+        return self.get_token(server)
+
+
+# => Authentication objects created by `get__cohesity_auth__token` are kept per
+# => Cluster so that a request which fails with 'Token expired' can be retried
+# => once with a new token.
+_authentications = dict()
+
+
+def is__token_expired__error(error):
+    '''
+    Determine if the HTTP error body (already read) reports an expired token.
+    '''
+    try:
+        return json.loads(to_text(error))['message'] == "Token expired"
+    except Exception:
+        return False
+
+
+def refresh__cohesity_auth__token(server, expired_token):
+    '''
+    Return a valid Bearer Token for the Cluster in place of an expired one.
+    '''
+    auth = _authentications.get(server)
+    if not auth:
+        raise TokenException("Token expired")
+    return auth.refresh_token(server, expired_token)
 
 
 def get__cohesity_auth__token(self):
@@ -153,4 +301,9 @@ def get__cohesity_auth__token(self):
         auth.username = user_domain[0]
         auth.domain = user_domain[1]
 
+    if self.params.get('token_cache'):
+        auth.cache = TokenCache(server, auth.username, auth.domain,
+                                self.params.get('token_cache_path'))
+
+    _authentications[server] = auth
     return auth.get_token(server)
@@ -0,0 +1,133 @@
+#
+# cohesity_controller
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityController** utils module provides the action plugin used to run
+the Cohesity modules which only call the Cluster API inside the Ansible worker
+on the controller instead of as a new Python process for every task.
+'''
+
+import json
+import os
+import sys
+import traceback
+
+from ansible.module_utils import basic
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.module_utils.six import StringIO
+from ansible.plugins.action import ActionBase
+
+try:
+    from ansible.utils.display import Display
+    display = Display()
+except ImportError:
+    display = None
+
+# => Root of the role, which holds the library and module_utils directories.
+ROLE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.realpath(__file__)))))
+LIBRARY_PATH = os.path.join(ROLE_PATH, 'library')
+
+
+def load__library__module(name, path=LIBRARY_PATH):
+    '''
+    Load a fresh copy of a module from the library directory.
+
+    The module utilities it imports (SDK, authentication, REST sessions) stay in
+    sys.modules so that every later call in the worker reuses them, while the
+    state kept by the module itself starts empty for each call.
+
+    :return: the Python module or None when the module is not in the library
+    '''
+    filename = os.path.join(path, name + '.py')
+    if not os.path.isfile(filename):
+        return None
+    if ROLE_PATH not in sys.path:
+        sys.path.append(ROLE_PATH)
+    module_name = 'cohesity_controller_' + name
+    try:
+        from importlib.util import spec_from_file_location, module_from_spec
+    except ImportError:
+        import imp
+        return imp.load_source(module_name, filename)
+    spec = spec_from_file_location(module_name, filename)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run__module__main(module, module_args):
+    '''
+    Run the main() function of a module with the arguments and return the
+    result it passed to exit_json or fail_json.
+    '''
+    stdout = sys.stdout
+    sys.stdout = output = StringIO()
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps(dict(ANSIBLE_MODULE_ARGS=module_args)))
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    except Exception as error:
+        return dict(failed=True, msg="Unexpected error caused while running the Cohesity Module: " +
+                    to_text(error), exception=traceback.format_exc())
+    finally:
+        sys.stdout = stdout
+        basic._ANSIBLE_ARGS = None
+
+    # => The result is printed as a single line of JSON after any other output.
+    lines = [line for line in output.getvalue().splitlines() if line.strip()]
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return dict(failed=True, msg="The Cohesity Module did not return a result",
+                    module_stdout=output.getvalue())
+
+
+class CohesityControllerAction(ActionBase):
+    '''
+    Action plugin for the Cohesity modules which only call the Cluster API
+
+    When the task runs with a local connection (including delegate_to localhost)
+    the module is run inside the worker process.  This skips building, copying
+    and starting a new Python process for the module, and every item of a loop
+    reuses the imports, Bearer Token, SDK client and REST connection pool of the
+    first item.  Any other connection, or `cohesity_controller_execution: false`,
+    runs the module on the target as usual.
+    '''
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or dict()
+        result = super(CohesityControllerAction, self).run(tmp, task_vars)
+        del tmp
+
+        module_name = self._task.action.split('.')[-1]
+        module = None
+        if self._use__controller(task_vars):
+            try:
+                module = load__library__module(module_name)
+            except ImportError as error:
+                # => Most likely the SDK is not installed for the Python running Ansible.
+                if display:
+                    display.vvv("Running " + module_name + " on the target: " + to_text(error))
+
+        if module is None:
+            result.update(self._execute_module(module_name=module_name, task_vars=task_vars))
+            return result
+
+        module_args = self._task.args.copy()
+        self._update_module_args(module_name, module_args, task_vars)
+        result.update(run__module__main(module, module_args))
+        return result
+
+    def _use__controller(self, task_vars):
+        if not boolean(task_vars.get('cohesity_controller_execution', True), strict=False):
+            return False
+        transport = getattr(self._connection, 'transport', None) or self._play_context.connection
+        return str(transport).split('.')[-1] == 'local'
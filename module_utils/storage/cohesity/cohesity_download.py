@@ -0,0 +1,383 @@
+#
+# cohesity_download
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityDownload** utils module streams agent installers and other large
+files to disk in fixed size chunks, resuming partial downloads and verifying
+the result before it is moved into place.  Installers can also be kept in a
+versioned cache so that they are downloaded from the Cluster only once.
+'''
+
+import hashlib
+import json
+import os
+import re
+import socket
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ansible.module_utils.six.moves import http_client
+import ansible.module_utils.six.moves.urllib.error as urllib_error
+from ansible.module_utils._text import to_bytes, to_native
+from ansible.module_utils.urls import open_url
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay, REQUEST_TIMEOUT
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay, REQUEST_TIMEOUT
+
+
+# => Number of bytes read from the response and written to disk at a time.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# => Number of times an interrupted download is resumed before giving up.
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_RETRY_INTERVAL = 5
+DOWNLOAD_RETRY_MAX_INTERVAL = 60
+DEFAULT_CHECKSUM_ALGORITHM = 'sha256'
+
+# => Errors after which the download is resumed from the partial file.
+RETRYABLE_DOWNLOAD_ERRORS = (http_client.HTTPException, socket.error, socket.timeout)
+CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+AGENT_DOWNLOAD_PATH = "/irisservices/api/v1/public/physicalAgents/download"
+DEFAULT_PACKAGE_CACHE_PATH = '~/.ansible/cohesity/agents'
+# => Native package type of the agent for each supported Linux distribution.
+AGENT_PACKAGE_TYPES = dict(
+    CentOS='kRPM',
+    RedHat='kRPM',
+    OracleLinux='kRPM',
+    SLES='kSuseRPM',
+    Ubuntu='kDEB'
+)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class IncompleteDownloadError(DownloadError):
+    pass
+
+
+def get__checksum__spec(checksum):
+    '''
+    Split a checksum given as `<algorithm>:<value>` or as a bare value, which
+    is taken to be a sha256 hash.
+
+    :return: tuple of the algorithm and the expected lowercase hex digest
+    '''
+    if not checksum:
+        return DEFAULT_CHECKSUM_ALGORITHM, ''
+    if ':' in checksum:
+        algorithm, value = checksum.split(':', 1)
+    else:
+        algorithm, value = DEFAULT_CHECKSUM_ALGORITHM, checksum
+    algorithm = algorithm.strip().lower()
+    try:
+        hashlib.new(algorithm)
+    except ValueError:
+        raise DownloadError("Unsupported checksum algorithm: " + algorithm)
+    return algorithm, value.strip().lower()
+
+
+def get__file__digest(filename, algorithm=DEFAULT_CHECKSUM_ALGORITHM, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    '''
+    Return a hash object updated with the contents of the file, read in chunks.
+    '''
+    digest = hashlib.new(algorithm)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest
+
+
+def get__download__filename(headers, default):
+    '''
+    Return the file name from the Content-Disposition header of the response.
+    '''
+    disposition = headers.get('content-disposition') or ''
+    if '=' not in disposition:
+        return default
+    filename = disposition.split('=', 1)[1].split(';')[0].strip().strip('"\'')
+    # => Never let the server choose a directory.
+    return os.path.basename(filename) or default
+
+
+def get__partial__filename(path, uri):
+    '''
+    Return the name of the partial file for a download.  It only depends on the
+    uri so that an interrupted download is found again by the next attempt.
+    '''
+    return os.path.join(path, '.cohesity-download-' + hashlib.sha1(to_bytes(uri)).hexdigest()[:16] + '.part')
+
+
+def _load__partial__state(partial):
+    try:
+        with open(partial + '.json') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _save__partial__state(partial, state):
+    with open(partial + '.json', 'w') as f:
+        json.dump(state, f)
+
+
+def _remove__partial(partial):
+    for filename in (partial, partial + '.json'):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+def _download__attempt(uri, partial, headers, validate_certs, timeout, chunk_size, algorithm):
+    '''
+    Request the file, resuming from the partial file when one exists, and append
+    the response to it.
+
+    :return: tuple of the response headers, the hash object of the whole partial
+             file and the number of bytes reused from an earlier attempt
+    '''
+    state = _load__partial__state(partial)
+    offset = os.path.getsize(partial) if state and os.path.exists(partial) else 0
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers['Range'] = 'bytes=%d-' % offset
+        # => If the file changed on the server, it is sent again in full.
+        if state.get('validator'):
+            request_headers['If-Range'] = state['validator']
+
+    try:
+        response = open_url(url=uri, headers=request_headers,
+                            validate_certs=validate_certs, timeout=timeout)
+    except urllib_error.HTTPError as error:
+        if error.code == 416:
+            # => The partial file does not match the file on the server.
+            _remove__partial(partial)
+            raise IncompleteDownloadError("The partial download did not match the file on the server")
+        raise
+
+    try:
+        resp_headers = response.headers
+        length = resp_headers.get('content-length')
+        total = int(length) if length and length.isdigit() else None
+        match = CONTENT_RANGE.match(resp_headers.get('content-range') or '')
+        if response.getcode() == 206 and match and int(match.group(1)) == offset:
+            if match.group(3) != '*':
+                total = int(match.group(3))
+            elif total is not None:
+                total += offset
+            if state.get('total') and total != state['total']:
+                _remove__partial(partial)
+                raise IncompleteDownloadError("The file on the server changed during the download")
+        else:
+            # => The server ignored the range, so start over with the full file.
+            offset = 0
+
+        _save__partial__state(partial, dict(
+            uri=uri,
+            total=total,
+            validator=resp_headers.get('etag') or resp_headers.get('last-modified') or ''))
+
+        digest = get__file__digest(partial, algorithm, chunk_size) if offset else hashlib.new(algorithm)
+        with open(partial, 'ab' if offset else 'wb') as f:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+    finally:
+        response.close()
+
+    size = os.path.getsize(partial)
+    if total is not None and size != total:
+        raise IncompleteDownloadError(
+            "Received " + str(size) + " of " + str(total) + " bytes")
+    return resp_headers, digest, offset
+
+
+def download__file(uri, path, headers=None, checksum='', default_filename='cohesity-download',
+                   retries=DOWNLOAD_RETRIES, validate_certs=False, timeout=REQUEST_TIMEOUT,
+                   chunk_size=DOWNLOAD_CHUNK_SIZE, mode=0o755):
+    '''
+    Download a file into the directory `path`.
+
+    The response is written to a partial file in chunks of `chunk_size` bytes so
+    that the file is never held in memory.  When the transfer is interrupted,
+    the next attempt requests only the missing bytes with an HTTP Range header,
+    which also resumes downloads left behind by an earlier run into the same
+    directory.  Once the size reported by the server and the optional
+    `checksum` match, the file is moved to its final name in a single rename so
+    that a truncated installer is never found under that name.
+
+    :param checksum: expected checksum as `<algorithm>:<value>`, or a sha256 value
+    :param default_filename: file name used when the response has no Content-Disposition header
+    :return: dictionary of the filename, size, checksum, the number of bytes
+             reused from an earlier attempt and the number of attempts
+    '''
+    algorithm, expected = get__checksum__spec(checksum)
+    partial = get__partial__filename(path, uri)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            resp_headers, digest, resumed = _download__attempt(
+                uri, partial, headers, validate_certs, timeout, chunk_size, algorithm)
+            if expected and digest.hexdigest() != expected:
+                _remove__partial(partial)
+                raise IncompleteDownloadError(
+                    "The " + algorithm + " checksum of the download is " + digest.hexdigest() +
+                    " but " + expected + " was expected")
+            break
+        except urllib_error.HTTPError as error:
+            # => Errors reported by the server, such as authentication or a
+            # => missing file, are not retried unless the server is unavailable.
+            if error.code < 500 or attempt > retries:
+                raise
+        except (IncompleteDownloadError, urllib_error.URLError) + RETRYABLE_DOWNLOAD_ERRORS as error:
+            if attempt > retries:
+                raise DownloadError("Failed to download " + uri + " after " + str(attempt) +
+                                    " attempts: " + to_native(error))
+        time.sleep(get__backoff__delay(attempt - 1, DOWNLOAD_RETRY_INTERVAL, DOWNLOAD_RETRY_MAX_INTERVAL))
+
+    target = os.path.join(path, get__download__filename(resp_headers, default_filename))
+    os.chmod(partial, mode)
+    os.rename(partial, target)
+    _remove__partial(partial)
+    return dict(
+        filename=target,
+        size=os.path.getsize(target),
+        checksum=algorithm + ':' + digest.hexdigest(),
+        resumed_bytes=resumed,
+        attempts=attempt
+    )
+
+
+def get__agent__package(operating_system, native_package=False):
+    '''
+    Return the query parameters which select the agent installer for a host.
+    '''
+    if operating_system == "AIX":
+        return dict(hostType='kAix', agentType='kJava')
+    package_type = 'kScript'
+    if native_package:
+        package_type = AGENT_PACKAGE_TYPES.get(operating_system, package_type)
+    return dict(hostType='kLinux', pkgType=package_type)
+
+
+def get__agent__download__uri(server, package):
+    '''
+    Return the uri from which the Cluster serves the agent installer.
+    '''
+    # => The parameters are always sent in the same order so the uri, which also
+    # => names the partial download, is stable.
+    query = '&'.join(key + '=' + package[key] for key in ('hostType', 'pkgType', 'agentType') if key in package)
+    return "https://" + server + AGENT_DOWNLOAD_PATH + "?" + query
+
+
+def get__package__cache__dir(cache_path, server, version, package):
+    '''
+    Return the directory caching the agent installer for a Cluster version.
+    Each Cluster software version has its own directory so that an upgraded
+    Cluster never hands out the installer of the previous version.
+    '''
+    name = '-'.join(package[key] for key in ('hostType', 'pkgType', 'agentType') if key in package)
+    return os.path.join(os.path.expanduser(cache_path),
+                        re.sub(r'[^\w.-]', '_', server), re.sub(r'[^\w.-]', '_', version), name)
+
+
+class PackageCache(object):
+    '''
+    Versioned cache of downloaded installers
+
+    Each cache directory holds a single installer and a manifest describing it.
+    A lock is held while the installer is downloaded so that tasks running at
+    the same time for many hosts wait for a single download and then share it.
+    '''
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get(self):
+        '''
+        Return the manifest of the cached installer, or None when there is no
+        complete installer in the cache.
+        '''
+        try:
+            with open(os.path.join(self.cache_dir, self.MANIFEST)) as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        filename = os.path.join(self.cache_dir, manifest.get('filename', ''))
+        if not os.path.isfile(filename) or os.path.getsize(filename) != manifest.get('size'):
+            return None
+        manifest['path'] = filename
+        return manifest
+
+    def fetch(self, uri, headers=None, **kwargs):
+        '''
+        Return the manifest of the cached installer, downloading it first when
+        it is not cached yet.
+
+        :return: tuple of the manifest and whether the installer was downloaded
+        '''
+        if not os.path.isdir(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # => Created by another task in the meantime.
+                if not os.path.isdir(self.cache_dir):
+                    raise
+        lock = open(self.cache_dir + '.lock', 'w')
+        try:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            manifest = self.get()
+            if manifest:
+                return manifest, False
+            download = download__file(uri, self.cache_dir, headers=headers, mode=0o644, **kwargs)
+            manifest = dict(
+                filename=os.path.basename(download['filename']),
+                size=download['size'],
+                checksum=download['checksum'],
+                uri=uri,
+                downloaded=int(time.time()))
+            temp = os.path.join(self.cache_dir, self.MANIFEST + '.tmp')
+            with open(temp, 'w') as f:
+                json.dump(manifest, f)
+            os.rename(temp, os.path.join(self.cache_dir, self.MANIFEST))
+            manifest['path'] = download['filename']
+            return manifest, True
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def clear(self):
+        '''
+        Remove the cached installer.
+
+        :return: True when an installer was removed
+        '''
+        manifest = self.get()
+        for filename in os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []:
+            os.remove(os.path.join(self.cache_dir, filename))
+        if os.path.isdir(self.cache_dir):
+            os.rmdir(self.cache_dir)
+        return manifest is not None
@@ -11,29 +11,44 @@ The **CohesityHints** utils module provides standard methods for returning query
 from Cohesity Platforms.
 '''
 
+import hashlib
 import json
+import os
+import time
 import traceback
-try:
-    from urllib import quote
-except ImportError as e:
-    from urllib.parse import quote
-from ansible.module_utils.urls import open_url, urllib_error
-import ansible.module_utils.six.moves.urllib_parse as urllib_parse
-
-from cohesity_management_sdk.cohesity_client import CohesityClient
-from cohesity_management_sdk.controllers.base_controller import BaseController
+from itertools import islice
+from ansible.module_utils.urls import urllib_error
+from ansible.module_utils._text import to_bytes
 
 try:
     # => TODO:  Find a better way to handle this!!!
     # => When unit testing, we need to look in the correct location however, when run via ansible,
     # => the expectation is that the modules will live under ansible.
     from module_utils.storage.cohesity.cohesity_auth import Authentication, TokenException, ParameterViolation
+    from module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
     from module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
 except Exception as e:
     from ansible.module_utils.storage.cohesity.cohesity_auth import Authentication, TokenException, ParameterViolation
+    from ansible.module_utils.storage.cohesity.cohesity_rest import get__cohesity_rest__session
+    from ansible.module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex, SOURCE_NODE_FIELDS
     from ansible.module_utils.storage.cohesity.cohesity_utilities import cohesity_common_argument_spec, raise__cohesity_exception__handler
 
 
+# => Number of Protection Runs in the first request; each later request doubles it.
+RUN_PAGE_SIZE = 100
+
+# => Protection Run states which have not yet reached a terminal state.
+ACTIVE_RUN_STATES = ['kAccepted', 'kRunning']
+
+# => Policy, Storage Domain and root node ids rarely change, so lookups by name
+# => are memoized per Cluster for this number of seconds.
+REFERENCE_CACHE_TTL = 300
+DEFAULT_REFERENCE_CACHE_PATH = '~/.ansible/cohesity/references'
+
+
 class ParameterViolation(Exception):
     pass
 
@@ -46,6 +61,122 @@ class HTTPException(Exception):
     pass
 
 
+class ReferenceCache(object):
+    '''
+    Memoization of reference data lookups keyed by Cluster and query
+
+    Entries are kept in memory for the module run.  When a path is configured
+    they are also stored in one file per Cluster on the node running the module
+    so that later tasks and loop items reuse them until the TTL expires.
+    '''
+
+    def __init__(self, ttl=REFERENCE_CACHE_TTL, path=None):
+        self.ttl = ttl
+        self.path = os.path.expanduser(path) if path else None
+        # => server => query => [stored_at, value]
+        self.entries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, server, query):
+        '''
+        Return the cached value or None when missing or expired.
+        '''
+        server = str(server).lower()
+        entries = self.entries.get(server)
+        if entries is None:
+            entries = self.entries[server] = self._load(server)
+        entry = entries.get(query)
+        if not entry or time.time() - entry[0] >= self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, server, query, value):
+        server = str(server).lower()
+        entries = self.entries.setdefault(server, dict())
+        entries[query] = [time.time(), value]
+        if self.path:
+            # => Merge with the entries stored by other tasks since the file was read.
+            stored = self._load(server)
+            stored[query] = entries[query]
+            self._store(server, stored)
+
+    def memoize(self, server, query, fetch):
+        '''
+        Return the cached value for the query or call fetch() and cache the result.
+        '''
+        value = self.get(server, query)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.set(server, query, value)
+        return value
+
+    def clear(self):
+        self.entries = dict()
+
+    def _filename(self, server):
+        return os.path.join(self.path, hashlib.sha256(to_bytes(server)).hexdigest() + ".json")
+
+    def _load(self, server):
+        if not self.path:
+            return dict()
+        try:
+            with open(self._filename(server), 'r') as cache_file:
+                entries = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return dict()
+        if not isinstance(entries, dict):
+            return dict()
+        now = time.time()
+        return dict((query, entry) for query, entry in entries.items()
+                    if isinstance(entry, list) and len(entry) == 2 and now - entry[0] < self.ttl)
+
+    def _store(self, server, entries):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+        filename = self._filename(server)
+        tmp_filename = filename + ".tmp." + str(os.getpid())
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        os.rename(tmp_filename, filename)
+
+
+# => Reference caches shared by every lookup in this process keyed by (ttl, path).
+_reference_caches = dict()
+
+
+def get__reference_cache(module):
+    '''
+    Return the ReferenceCache selected by the reference_cache options of the module.
+    '''
+    ttl = module.params.get('reference_cache_ttl')
+    if ttl is None:
+        ttl = REFERENCE_CACHE_TTL
+    path = None
+    if module.params.get('reference_cache'):
+        path = module.params.get('reference_cache_path') or DEFAULT_REFERENCE_CACHE_PATH
+    if (ttl, path) not in _reference_caches:
+        _reference_caches[(ttl, path)] = ReferenceCache(ttl, path)
+    return _reference_caches[(ttl, path)]
+
+
+def get__session(self):
+    '''
+    Return the shared REST session for the Cluster described by the
+    server, token and validate_certs keys.
+    '''
+    return get__cohesity_rest__session(
+        self['server'], self['token'], self['validate_certs'])
+
+
+# => CohesityClient objects created in this process.
+_cohesity_clients = dict()
+
+
 def get_cohesity_client(module):
     '''
     function to get cohesity cohesity client
@@ -67,11 +198,18 @@ def get_cohesity_client(module):
             username = user_domain[0]
             domain = user_domain[1]
 
-        cohesity_client = CohesityClient(cluster_vip=cluster_vip,
-                                         username=username,
-                                         password=password,
-                                         domain=domain)
-        return cohesity_client
+        # => Modules run by the controller action plugin call this once for each
+        # => loop item, so reuse the client (and the token it holds).
+        key = (cluster_vip, username, domain, password)
+        if key not in _cohesity_clients:
+            # => The SDK client takes a significant time to import, so it is only
+            # => loaded by the modules which use it.
+            from cohesity_management_sdk.cohesity_client import CohesityClient
+            _cohesity_clients[key] = CohesityClient(cluster_vip=cluster_vip,
+                                                    username=username,
+                                                    password=password,
+                                                    domain=domain)
+        return _cohesity_clients[key]
     except Exception as error:
         raise__cohesity_exception__handler(error, module)
 
@@ -79,62 +217,37 @@ def get_cohesity_client(module):
 def get__cluster(self):
 
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/basicClusterInfo"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        cluster = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        cluster = json.loads(cluster.read())
+        cluster = get__session(self).get("/public/basicClusterInfo")
     except urllib_error.HTTPError as e:
-        try:
-            msg = json.loads(e.read())['message']
-        except Exception as e:
-            # => For HTTPErrors that return no JSON with a message (bad errors), we
-            # => will need to handle this by setting the msg variable to some default.
-            msg = "no-json-data"
-        else:
-            raise HTTPException(e.read())
+        raise HTTPException(e.read())
     return cluster
 
 
 def get__nodes(self):
 
     try:
-        uri = "https://" + self['server'] + "/irisservices/api/v1/public/nodes"
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        nodes = open_url(url=uri, headers=headers,
-                         validate_certs=self['validate_certs'], timeout=120)
-        nodes = json.loads(nodes.read())
+        nodes = get__session(self).get("/public/nodes")
     except urllib_error.HTTPError as e:
-        try:
-            msg = json.loads(e.read())['message']
-        except Exception as e:
-            # => For HTTPErrors that return no JSON with a message (bad errors), we
-            # => will need to handle this by setting the msg variable to some default.
-            msg = "no-json-data"
-        else:
-            raise HTTPException(e.read())
+        raise HTTPException(e.read())
     return nodes
 
 
 def get__prot_source__all(self):
     try:
         if self['environment'] == "VMware":
-            uri = "https://" + self['server'] + \
-                  "/irisservices/api/v1/public/protectionSources/rootNodes"
+            uri = "/public/protectionSources/rootNodes"
         else:
-            uri = "https://" + self['server'] + \
-                "/irisservices/api/v1/public/protectionSources"
+            uri = "/public/protectionSources"
 
+        params = dict()
         if 'environment' in self:
-            uri = uri + "?environments=k" + self['environment']
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
+            params['environments'] = "k" + self['environment']
+        if self.get('fields'):
+            # => Only keep the selected fields while the response is streamed.
+            with get__session(self).stream(uri, params=params) as response:
+                objects = load__json__fields(response, self['fields'])
+        else:
+            objects = get__session(self).get(uri, params=params)
         if len(objects) and self['environment'] != "VMware":
             objects = objects[0]
         return objects
@@ -144,106 +257,138 @@ def get__prot_source__all(self):
 
 def get__prot_source__roots(self):
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/protectionSources/rootNodes"
-
+        params = dict()
         if 'environment' in self:
-            uri = uri + "?environments=k" + self['environment']
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
-        return objects
+            params['environments'] = "k" + self['environment']
+        return get__session(self).get("/public/protectionSources/rootNodes", params=params)
     except urllib_error.URLError as error:
         raise HTTPException(error.read())
 
 
 def get__prot_policy__all(self):
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/protectionPolicies"
-
+        params = dict()
         if 'policyId' in self:
-            uri = uri + "?" + urllib_parse.urlencode({"names": self['policyId']})
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
-        return objects
-    except urllib_error as error:
+            params['names'] = self['policyId']
+        for key in ['names', 'ids']:
+            if self.get(key):
+                params[key] = self[key]
+        return get__session(self).get("/public/protectionPolicies", params=params)
+    except urllib_error.URLError as error:
         raise HTTPException(error.read())
 
 
 def get__prot_job__all(self):
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/protectionJobs"
+        params = dict()
         if 'environment' in self:
-            uri = uri + "?environments=k" + self['environment']
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
+            params['environments'] = "k" + self['environment']
+        if self.get('environments'):
+            params['environments'] = ["k" + environment for environment in self['environments']]
+        for key in ['names', 'ids']:
+            if self.get(key):
+                params[key] = self[key]
+        if self.get('include_last_run'):
+            params['includeLastRunAndStats'] = True
+        if 'is_deleted' in self and not self['is_deleted']:
+            params['isDeleted'] = False
+        objects = get__session(self).get("/public/protectionJobs", params=params)
 
         if 'is_deleted' in self:
             if not self['is_deleted']:
                 objects = [objects_item for objects_item in objects if not objects_item.get(
                     'name').startswith('_DELETED_')]
         return objects
-    except urllib_error as error:
+    except urllib_error.URLError as error:
         raise HTTPException(error.read())
 
 
 def get__storage_domain_id__all(self):
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/viewBoxes"
+        params = dict()
         if 'viewBoxId' in self:
             if 'type' not in self:
                 self['type'] = 'name'
                 if isinstance(self['viewBoxId'], int):
                     self['type'] = 'id'
-            uri = uri + "?" + urllib_parse.urlencode({self['type']: self['viewBoxId']})
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
-        return objects
+            params[self['type']] = self['viewBoxId']
+        for key in ['names', 'ids']:
+            if self.get(key):
+                params[key] = self[key]
+        return get__session(self).get("/public/viewBoxes", params=params)
     except urllib_error.URLError as error:
         raise HTTPException(error.read())
 
 
-def get__protection_run__all(self):
+def iter__protection_runs(self):
+    '''
+    Walk the Protection Runs newest first.
+
+    `numRuns` returns the newest runs, so each request asks for twice as many
+    runs as the previous one and only the runs not yet seen are returned.
+    The `endTimeUsecs` filter applies to the end time of a run, so it is not
+    used as a cursor; a run which is still running would be skipped.  The
+    optional `since` key (start time in usecs) is sent as `startTimeUsecs` so
+    that older runs are never returned.
+
+    Active runs of a single job are always its newest, so with `active_only`
+    and a job id the walk stops at the first request without a new active
+    run.  The active runs of other jobs can be older than finished runs, so
+    without a job id every run is read.
+    '''
     try:
-        uri = "https://" + self['server'] + \
-            "/irisservices/api/v1/public/protectionRuns"
-
+        session = get__session(self)
+        num_runs = self.get('page_size') or RUN_PAGE_SIZE
+        params = dict()
         if 'id' in self:
-            uri = uri + "?jobId=" + str(self['id'])
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + self['token']}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=self['validate_certs'], timeout=120)
-        objects = json.loads(objects.read())
-
-        if 'is_deleted' in self:
-            if not self['is_deleted']:
-                objects = [objects_item for objects_item in objects if not objects_item.get(
-                    'jobName').startswith('_DELETED_')]
-
-        if 'active_only' in self:
-            if self['active_only']:
-                objects = [objects_item for objects_item in objects if objects_item[
-                    'backupRun'].get('status') == "kAccepted"]
-        return objects
+            params['jobId'] = self['id']
+        if self.get('since'):
+            params['startTimeUsecs'] = self['since']
+
+        # => Every response repeats the newer runs, so track what has already been seen.
+        seen = set()
+        while True:
+            objects = session.get("/public/protectionRuns", params=dict(params, numRuns=num_runs))
+            new_runs = 0
+            active = False
+            for objects_item in objects or []:
+                key = (objects_item.get('jobId'), objects_item['backupRun'].get('jobRunId'))
+                if key in seen:
+                    continue
+                seen.add(key)
+                new_runs += 1
+                is_active = objects_item['backupRun'].get('status') in ACTIVE_RUN_STATES
+                active = active or is_active
+
+                if 'is_deleted' in self and not self['is_deleted']:
+                    if objects_item.get('jobName', '').startswith('_DELETED_'):
+                        continue
+                if self.get('active_only') and not is_active:
+                    continue
+                yield objects_item
+
+            # => Fewer runs than requested, or no new runs, means the history has been read.
+            if not new_runs or len(objects) < num_runs:
+                return
+            if self.get('active_only') and 'id' in self and not active:
+                return
+            num_runs *= 2
     except urllib_error.URLError as error:
         raise HTTPException(error.read())
 
+
+def get__protection_run__all(self):
+    '''
+    Return the Protection Runs, optionally limited to the newest `run_limit`
+    runs matching the filters.
+    '''
+    run_limit = self.get('run_limit') or None
+    if run_limit and not self.get('active_only') and not self.get('page_size'):
+        # => Without a status filter every run on the page is returned, so
+        # => there is no need to request more runs than the limit.
+        self = dict(self, page_size=min(run_limit, RUN_PAGE_SIZE))
+    return list(islice(iter__protection_runs(self), run_limit))
+
 # => Filtered Queries
 
 
@@ -252,24 +397,28 @@ def get__prot_source_root_id__by_environment(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        source_obj = dict(
-            server=server,
-            token=token,
-            validate_certs=validate_certs,
-            environment=self['environment']
-        )
-
-        root_nodes = get__prot_source__roots(source_obj)
-
-        for node in root_nodes:
-            if node['protectionSource']['environment'] == ("k" + self['environment']) and\
-                    node['protectionSource']['environment'] != 'kVMware':
-                return node['protectionSource']['id']
-            elif node['protectionSource']['environment'] == 'kVMware':
-                return node['protectionSource']['id']
-
-        raise ProtectionException(
-            "There was a very serious situation where the chosen environment did not return a valid Root Node ID")
+        def fetch():
+            source_obj = dict(
+                server=server,
+                token=token,
+                validate_certs=validate_certs,
+                environment=self['environment']
+            )
+
+            root_nodes = get__prot_source__roots(source_obj)
+
+            for node in root_nodes:
+                if node['protectionSource']['environment'] == ("k" + self['environment']) and\
+                        node['protectionSource']['environment'] != 'kVMware':
+                    return node['protectionSource']['id']
+                elif node['protectionSource']['environment'] == 'kVMware':
+                    return node['protectionSource']['id']
+
+            raise ProtectionException(
+                "There was a very serious situation where the chosen environment did not return a valid Root Node ID")
+
+        return get__reference_cache(module).memoize(
+            server, "root_node:" + self['environment'], fetch)
     except Exception as error:
         module.fail_json(msg="Unexpected error caused while managing the Cohesity Protection Source.",
                          exception=traceback.format_exc())
@@ -280,19 +429,23 @@ def get__prot_policy_id__by_name(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        source_obj = dict(
-            server=server,
-            token=token,
-            validate_certs=validate_certs,
-            policyId=self['policyId']
-        )
-        objects = get__prot_policy__all(source_obj)
-        for obj in objects:
-            if obj['name'] == self['policyId']:
-                return obj['id']
-
-        raise ProtectionException(
-            "There was a very serious situation where the chosen Protection Policy Name (" + self['policyId'] + ") did not return a valid ID")
+        def fetch():
+            source_obj = dict(
+                server=server,
+                token=token,
+                validate_certs=validate_certs,
+                policyId=self['policyId']
+            )
+            objects = get__prot_policy__all(source_obj)
+            for obj in objects:
+                if obj['name'] == self['policyId']:
+                    return obj['id']
+
+            raise ProtectionException(
+                "There was a very serious situation where the chosen Protection Policy Name (" + self['policyId'] + ") did not return a valid ID")
+
+        return get__reference_cache(module).memoize(
+            server, "policy:" + str(self['policyId']), fetch)
     except Exception as error:
         module.fail_json(msg="Unexpected error caused while managing the Cohesity Protection Source.",
                          exception=traceback.format_exc())
@@ -303,35 +456,47 @@ def get__storage_domain_id__by_name(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        source_obj = dict(
-            server=server,
-            token=token,
-            validate_certs=validate_certs,
-            viewBoxId=self['viewBoxId']
-        )
-        for obj_type in ['names', 'ids']:
-            source_obj['type'] = obj_type
-            objects = get__storage_domain_id__all(source_obj)
-            if objects:
-                break
-
-        for obj in objects:
-            if obj['name'] == self['viewBoxId']:
-                return int(obj['id'])
-            elif obj['id'] == int(self['viewBoxId']):
-                return int(obj['id'])
-            else:
-                # => We really should land here but if so then
-                pass
-
-        raise ProtectionException(
-            "There was a very serious situation where the chosen Storage Domain Name (" + self['viewBoxId'] + ") did not return a valid ID")
+        def fetch():
+            source_obj = dict(
+                server=server,
+                token=token,
+                validate_certs=validate_certs,
+                viewBoxId=self['viewBoxId']
+            )
+            for obj_type in ['names', 'ids']:
+                source_obj['type'] = obj_type
+                objects = get__storage_domain_id__all(source_obj)
+                if objects:
+                    break
+
+            for obj in objects:
+                if obj['name'] == self['viewBoxId']:
+                    return int(obj['id'])
+                elif obj['id'] == int(self['viewBoxId']):
+                    return int(obj['id'])
+                else:
+                    # => We really should land here but if so then
+                    pass
+
+            raise ProtectionException(
+                "There was a very serious situation where the chosen Storage Domain Name (" + self['viewBoxId'] + ") did not return a valid ID")
+
+        # => The lookup can take two requests (by name and then by id) so it is
+        # => the most valuable to memoize.
+        return get__reference_cache(module).memoize(
+            server, "storage_domain:" + str(self['viewBoxId']), fetch)
     except Exception as error:
         module.fail_json(msg="Unexpected error caused while managing the Cohesity Protection Source.",
                          exception=traceback.format_exc())
 
 
-def get__prot_source_id__by_endpoint(module, self):
+def get__prot_source_ids__by_endpoints(module, self, endpoints):
+    '''
+    Resolve a list of endpoints to Protection Source ids using a single fetch
+    of the sources for the environment.
+
+    :return: list of ids (or False when not found) in the order of the endpoints
+    '''
     server = module.params.get('cluster')
     validate_certs = module.params.get('validate_certs')
     token = self['token']
@@ -340,28 +505,26 @@ def get__prot_source_id__by_endpoint(module, self):
             server=server,
             token=token,
             validate_certs=validate_certs,
-            environment=self['environment']
+            environment=self['environment'],
+            fields=SOURCE_NODE_FIELDS
         )
         source = get__prot_source__all(source_obj)
-        if source:
-            env_types = ['Physical', 'GenericNas']
-            if self['environment'] in env_types:
-                for node in source['nodes']:
-                    if self['endpoint'] in [
-                        node['registrationInfo']['accessInfo']['endpoint'],
-                        node['protectionSource']['name']]:
-                        return node['protectionSource']['id']
-            else:
-                for node in source:
-                    if node['registrationInfo']['accessInfo']['endpoint'] == self['endpoint']:
-                        return node['protectionSource']['id']
-
-        return False
+        if not source:
+            return [False for endpoint in endpoints]
+        # => Physical and GenericNas sources are returned below a single root node
+        # => and can also be matched by name.
+        match_name = self['environment'] in ['Physical', 'GenericNas']
+        index = SourceTreeIndex([source] if isinstance(source, dict) else source)
+        return [index.get__id__by_endpoint(endpoint, match_name) or False for endpoint in endpoints]
     except Exception as error:
         module.fail_json(msg="Unexpected error caused while managing the Cohesity Protection Source.",
                          exception=traceback.format_exc())
 
 
+def get__prot_source_id__by_endpoint(module, self):
+    return get__prot_source_ids__by_endpoints(module, self, [self['endpoint']])[0]
+
+
 def get__protection_jobs__by_environment(module, self):
 
     server = module.params.get('cluster')
@@ -399,6 +562,9 @@ def get__protection_run__all__by_id(module, self):
         if 'is_deleted' in self:
             source_obj['is_deleted'] = self['is_deleted']
 
+        if 'run_limit' in self:
+            source_obj['run_limit'] = self['run_limit']
+
         return get__protection_run__all(source_obj)
 
     except Exception as error:
@@ -412,20 +578,15 @@ def get__file_snapshot_information__by_filename(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        # => We need to make this a safe querystring filename
-        filename = urllib_parse.quote_plus(self['restore_obj']['filename'])
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/files/snapshotsInformation?jobId=" + str(self['restore_obj']['jobUid']['id']) + \
-            "&clusterId=" + str(self['restore_obj']['jobUid']['clusterId']) + \
-            "&clusterIncarnationId=" + str(self['restore_obj']['jobUid']['clusterIncarnationId']) + \
-            "&sourceId=" + str(self['restore_obj']['protectionSourceId']) + \
-            "&filename=" + filename
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=validate_certs, timeout=120)
-        objects = json.loads(objects.read())
+        params = [
+            ('jobId', self['restore_obj']['jobUid']['id']),
+            ('clusterId', self['restore_obj']['jobUid']['clusterId']),
+            ('clusterIncarnationId', self['restore_obj']['jobUid']['clusterIncarnationId']),
+            ('sourceId', self['restore_obj']['protectionSourceId']),
+            ('filename', self['restore_obj']['filename'])
+        ]
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        objects = session.get("/public/restore/files/snapshotsInformation", params=params)
 
         # => Returns an array of snapshots that contain that file.
         return objects
@@ -439,15 +600,13 @@ def get__vmware_snapshot_information__by_vmname(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/objects" + \
-            "?environments[]=kVMware&search=" + quote(self['restore_obj']['vmname']) + "&jobIds[]=" + str(self['restore_obj']['jobUid']['id'])
-
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=validate_certs, timeout=120)
-        objects = json.loads(objects.read())
+        params = [
+            ('environments[]', 'kVMware'),
+            ('search', self['restore_obj']['vmname']),
+            ('jobIds[]', self['restore_obj']['jobUid']['id'])
+        ]
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        objects = session.get("/public/restore/objects", params=params)
 
         # => Returns an array of snapshots that contain that file.
         return objects
@@ -461,17 +620,13 @@ def get__restore_job__by_type(module, self):
     validate_certs = module.params.get('validate_certs')
     token = self['token']
     try:
-        uri = "https://" + server + \
-            "/irisservices/api/v1/public/restore/tasks?taskTypes=" + self['restore_type']
+        params = [('taskTypes', self['restore_type'])]
 
         if "count" in self:
-            uri = uri + "&pageCount=" + str(self['count'])
+            params.append(('pageCount', self['count']))
 
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer " + token}
-        objects = open_url(url=uri, headers=headers,
-                           validate_certs=validate_certs, timeout=120)
-        objects = json.loads(objects.read())
+        session = get__cohesity_rest__session(server, token, validate_certs)
+        objects = session.get("/public/restore/tasks", params=params)
 
         # => Returns an array of snapshots that contain that file.
         return objects
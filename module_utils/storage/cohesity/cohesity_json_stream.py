@@ -0,0 +1,193 @@
+#
+# cohesity_json_stream
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityJsonStream** utils module provides an incremental, event based
+JSON parser so that very large API responses can be reduced to the fields a
+lookup needs without holding the full document in memory.
+'''
+
+import codecs
+import re
+from json.decoder import scanstring
+
+# => Number of bytes read from the stream at a time.
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+LITERALS = (('true', True), ('false', False), ('null', None))
+
+
+class JsonStreamError(ValueError):
+    pass
+
+
+def iter__json__tokens(stream, chunk_size=CHUNK_SIZE):
+    '''
+    Yield (token, value) tuples from a file-like object.  Structural tokens are
+    returned as their character, scalars as ('scalar', value) and strings as
+    ('string', value).
+    '''
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    eof = False
+    while True:
+        pos = WHITESPACE.match(buf, pos).end()
+        incomplete = pos >= len(buf)
+        if not incomplete:
+            char = buf[pos]
+            if char in '{}[]:,':
+                yield char, None
+                pos += 1
+                continue
+            if char == '"':
+                try:
+                    value, end = scanstring(buf, pos + 1)
+                except ValueError:
+                    if eof:
+                        raise JsonStreamError("Invalid string at offset " + str(pos))
+                    incomplete = True
+                else:
+                    yield 'string', value
+                    pos = end
+                    continue
+            else:
+                match = NUMBER.match(buf, pos)
+                if match:
+                    # => A number is only complete once it is followed by more
+                    # => input (e.g. '1' may be the start of '1.5e3').
+                    if not eof and match.end() + 3 > len(buf):
+                        incomplete = True
+                    elif match.group(1) or match.group(2):
+                        yield 'scalar', float(match.group())
+                    else:
+                        yield 'scalar', int(match.group())
+                else:
+                    for literal, value in LITERALS:
+                        if buf.startswith(literal, pos):
+                            yield 'scalar', value
+                            break
+                    else:
+                        if eof or len(buf) - pos > 5:
+                            raise JsonStreamError("Invalid JSON at offset " + str(pos))
+                        incomplete = True
+                if not incomplete:
+                    pos = match.end() if match else pos + len(literal)
+                    continue
+
+        # => Read the next chunk, keeping any partial token.
+        if eof:
+            return
+        data = stream.read(chunk_size)
+        if not data:
+            eof = True
+        buf = buf[pos:] + decoder.decode(data or b'', final=eof)
+        pos = 0
+
+
+def iter__json__events(stream, chunk_size=CHUNK_SIZE):
+    '''
+    Yield (event, value) tuples for a JSON document read from a file-like object.
+
+    Events are start_map, map_key, end_map, start_array, end_array and value.
+    '''
+    containers = []
+    expect_key = False
+    for token, value in iter__json__tokens(stream, chunk_size):
+        if token == '{':
+            containers.append('map')
+            expect_key = True
+            yield 'start_map', None
+        elif token == '[':
+            containers.append('array')
+            expect_key = False
+            yield 'start_array', None
+        elif token == '}':
+            containers.pop()
+            expect_key = False
+            yield 'end_map', None
+        elif token == ']':
+            containers.pop()
+            expect_key = False
+            yield 'end_array', None
+        elif token == ',':
+            expect_key = bool(containers) and containers[-1] == 'map'
+        elif token == ':':
+            expect_key = False
+        elif token == 'string' and expect_key:
+            expect_key = False
+            yield 'map_key', value
+        else:
+            yield 'value', value
+
+
+def get__field__spec(spec, key):
+    if spec is True:
+        return True
+    if key in spec:
+        return spec[key]
+    # => Keys such as '*ProtectionSource' match every environment specific key.
+    for pattern, field_spec in spec.items():
+        if pattern.startswith('*') and key.endswith(pattern[1:]):
+            return field_spec
+    return None
+
+
+def skip__json__value(events, event):
+    if event not in ('start_map', 'start_array'):
+        return
+    depth = 1
+    for event, value in events:
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def build__json__value(events, event, value, spec):
+    '''
+    Build the value starting with the event, keeping only the fields in spec.
+    '''
+    if event == 'start_map':
+        obj = dict()
+        for event, key in events:
+            if event == 'end_map':
+                return obj
+            field_spec = get__field__spec(spec, key)
+            event, value = next(events)
+            if field_spec is None:
+                skip__json__value(events, event)
+            else:
+                obj[key] = build__json__value(events, event, value, field_spec)
+    elif event == 'start_array':
+        items = []
+        for event, value in events:
+            if event == 'end_array':
+                return items
+            items.append(build__json__value(events, event, value, spec))
+    return value
+
+
+def load__json__fields(stream, spec=True, chunk_size=CHUNK_SIZE):
+    '''
+    Parse a JSON document from a file-like object, keeping only selected fields.
+
+    :param stream: file-like object returning bytes
+    :param spec: dictionary of the fields to keep.  Values are either True to keep
+                 the whole value or a nested spec.  The spec of an array applies to
+                 each of its items and keys starting with '*' match by suffix.
+    :return: the reduced document
+    '''
+    events = iter__json__events(stream, chunk_size)
+    for event, value in events:
+        return build__json__value(events, event, value, spec)
+    raise JsonStreamError("Empty JSON document")
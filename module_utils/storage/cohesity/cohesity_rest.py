@@ -0,0 +1,348 @@
+#
+# cohesity_rest
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityRest** utils module provides a pooled, keep-alive HTTPS session
+for making REST API calls to Cohesity Platforms.
+'''
+
+import json
+import socket
+import ssl
+import threading
+from io import BytesIO
+
+from ansible.module_utils.six.moves import http_client
+import ansible.module_utils.six.moves.urllib.error as urllib_error
+import ansible.module_utils.six.moves.urllib.request as urllib_request
+import ansible.module_utils.six.moves.urllib_parse as urllib_parse
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six import binary_type, string_types
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_auth import is__token_expired__error, \
+        refresh__cohesity_auth__token
+    from module_utils.storage.cohesity.cohesity_utilities import REQUEST_TIMEOUT
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_auth import is__token_expired__error, \
+        refresh__cohesity_auth__token
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import REQUEST_TIMEOUT
+
+
+API_BASE_PATH = "/irisservices/api/v1"
+USER_AGENT = "cohesity-ansible/v2.3.4"
+# => Maximum number of idle connections kept open per Cluster.
+POOL_SIZE = 10
+
+# => Errors raised when a pooled connection was closed by the Cluster while idle.
+STALE_CONNECTION_ERRORS = (http_client.HTTPException, socket.error, ssl.SSLError)
+
+
+class CohesityRestSession(object):
+    '''
+    Keep-alive HTTPS session to a single Cohesity Cluster
+
+    Connections are returned to a pool after each request so that all requests
+    made during a module run share a handful of TCP and TLS handshakes.  The
+    session is safe to use from multiple threads.
+
+    Errors are raised as `urllib_error.HTTPError` (with a readable body) and
+    `urllib_error.URLError` so that callers can handle them in the same way as
+    the errors raised by `open_url`.
+    '''
+
+    def __init__(self, server, token="", validate_certs=True,
+                 timeout=REQUEST_TIMEOUT, pool_size=POOL_SIZE):
+        self.server = server
+        self.token = token
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # => Counters which can be reported by modules to track the number
+        # => of requests and handshakes made during a run.
+        self.request_count = 0
+        self.connection_count = 0
+        self.expired_tokens = set()
+        self._pool = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._context = self._ssl_context()
+        self._proxy = self._proxy_address()
+
+    def get(self, path, params=None, headers=None):
+        return self.request('GET', path, params=params, headers=headers)
+
+    def post(self, path, data=None, params=None, headers=None):
+        return self.request('POST', path, params=params, data=data, headers=headers)
+
+    def put(self, path, data=None, params=None, headers=None):
+        return self.request('PUT', path, params=params, data=data, headers=headers)
+
+    def delete(self, path, data=None, params=None, headers=None):
+        return self.request('DELETE', path, params=params, data=data, headers=headers)
+
+    def request(self, method, path, params=None, data=None, headers=None):
+        '''
+        Perform a request and return the decoded JSON response.
+
+        :param method: HTTP method
+        :param path: API path, either relative to /irisservices/api/v1 or absolute
+        :param params: dictionary (or list of tuples) of query parameters.  List
+                       values are sent as repeated parameters.
+        :param data: request body.  Dictionaries and lists are encoded as JSON.
+        :param headers: additional request headers
+        :return: decoded JSON response or None when the response has no body
+        '''
+        url = self.url(path, params)
+        if data is not None and not isinstance(data, (binary_type, string_types)):
+            data = json.dumps(data)
+        body = None if data is None else to_bytes(data)
+
+        token = self.token
+        status, reason, response_headers, content = self._send(
+            method, url, body, self._headers(token, headers, body))
+
+        # => Tokens can expire before the end of their lifetime (e.g. when the
+        # => Cluster is restarted).  Re-authenticate once and retry the request.
+        if status == 401 and token and is__token_expired__error(content):
+            self._replace_token(token)
+            status, reason, response_headers, content = self._send(
+                method, url, body, self._headers(self.token, headers, body))
+
+        if status >= 400:
+            raise urllib_error.HTTPError("https://" + self.server + url, status, reason,
+                                         response_headers, BytesIO(content))
+        if not content:
+            return None
+        return json.loads(to_text(content))
+
+    def stream(self, path, params=None, headers=None):
+        '''
+        Perform a GET request and return the response body as a file-like object
+        so that large responses can be parsed while they are downloaded.
+
+        The response must be closed (or used as a context manager).  The
+        connection is only returned to the pool if the body was read completely.
+
+        :return: CohesityStreamedResponse
+        '''
+        url = self.url(path, params)
+        for attempt in range(2):
+            token = self.token
+            connection, response = self._open('GET', url, None, self._headers(token, headers, None))
+            if response.status < 400:
+                return CohesityStreamedResponse(self, connection, response)
+            content = response.read()
+            response_headers = self._finish(connection, response)
+            if attempt or response.status != 401 or not token or not is__token_expired__error(content):
+                break
+            self._replace_token(token)
+        raise urllib_error.HTTPError("https://" + self.server + url, response.status, response.reason,
+                                     response_headers, BytesIO(content))
+
+    def url(self, path, params=None):
+        '''
+        Build the request path including the query string.
+        '''
+        if not path.startswith(API_BASE_PATH):
+            path = API_BASE_PATH + path
+        if params:
+            if isinstance(params, dict):
+                params = [(key, value) for key, value in params.items() if value is not None]
+            # => The API expects lower case booleans.
+            params = [(key, _query_value(value)) for key, value in params]
+            separator = "&" if "?" in path else "?"
+            path = path + separator + urllib_parse.urlencode(params, doseq=True)
+        return path
+
+    def close(self):
+        '''
+        Close all idle connections.
+        '''
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for connection in pool:
+            connection.close()
+
+    def _headers(self, token, headers, body):
+        request_headers = {"Accept": "application/json",
+                           "user-agent": USER_AGENT}
+        if token:
+            request_headers["Authorization"] = "Bearer " + token
+        if body is not None:
+            request_headers["Content-Type"] = "application/json"
+        if headers:
+            request_headers.update(headers)
+        return request_headers
+
+    def _replace_token(self, expired_token):
+        # => Concurrent requests may all be rejected with the same expired
+        # => token; only the first one re-authenticates.
+        with self._refresh_lock:
+            if self.token != expired_token:
+                return
+            self.expired_tokens.add(expired_token)
+            self.token = refresh__cohesity_auth__token(self.server, expired_token)
+
+    def _send(self, method, url, body, headers):
+        connection, response = self._open(method, url, body, headers)
+        try:
+            content = response.read()
+        except STALE_CONNECTION_ERRORS as error:
+            connection.close()
+            raise urllib_error.URLError(error)
+        response_headers = self._finish(connection, response)
+        return response.status, response.reason, response_headers, content
+
+    def _open(self, method, url, body, headers):
+        connection, reused = self._acquire()
+        try:
+            try:
+                return connection, self._exchange(connection, method, url, body, headers)
+            except STALE_CONNECTION_ERRORS:
+                # => Idle connections may be closed by the Cluster at any time.  Only
+                # => retry on a fresh connection if this was a pooled connection.
+                connection.close()
+                if not reused:
+                    raise
+                connection = self._new_connection()
+                return connection, self._exchange(connection, method, url, body, headers)
+        except STALE_CONNECTION_ERRORS as error:
+            connection.close()
+            raise urllib_error.URLError(error)
+
+    def _exchange(self, connection, method, url, body, headers):
+        with self._lock:
+            self.request_count += 1
+        connection.request(method, url, body, headers)
+        return connection.getresponse()
+
+    def _finish(self, connection, response):
+        '''
+        Return the connection to the pool once the response has been read.
+        '''
+        response_headers = dict((key.lower(), value) for key, value in response.getheaders())
+        if (response_headers.get('connection') or '').lower() == 'close':
+            connection.close()
+        else:
+            self._release(connection)
+        return response_headers
+
+    def _acquire(self):
+        with self._lock:
+            if self._pool:
+                return self._pool.pop(), True
+        return self._new_connection(), False
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(connection)
+                return
+        connection.close()
+
+    def _new_connection(self):
+        with self._lock:
+            self.connection_count += 1
+        if self._proxy:
+            connection = http_client.HTTPSConnection(
+                self._proxy[0], self._proxy[1], timeout=self.timeout, context=self._context)
+            connection.set_tunnel(self.server)
+            return connection
+        return http_client.HTTPSConnection(
+            self.server, timeout=self.timeout, context=self._context)
+
+    def _ssl_context(self):
+        context = ssl.create_default_context()
+        if not self.validate_certs:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _proxy_address(self):
+        # => Honour the same https_proxy/no_proxy environment variables as `open_url`.
+        proxy = urllib_request.getproxies().get('https')
+        if not proxy or urllib_request.proxy_bypass(self.server.split(':')[0]):
+            return None
+        proxy = urllib_parse.urlparse(proxy if '://' in proxy else 'http://' + proxy)
+        return proxy.hostname, proxy.port or 3128
+
+
+class CohesityStreamedResponse(object):
+    '''
+    File-like wrapper around a streamed response body.
+    '''
+
+    def __init__(self, session, connection, response):
+        self.session = session
+        self.status = response.status
+        self._connection = connection
+        self._response = response
+        self._complete = False
+
+    def read(self, amt=None):
+        try:
+            data = self._response.read(amt) if amt else self._response.read()
+        except STALE_CONNECTION_ERRORS as error:
+            self.close()
+            raise urllib_error.URLError(error)
+        if not data or not amt:
+            self._complete = True
+        return data
+
+    def close(self):
+        if self._connection is None:
+            return
+        if self._complete:
+            self.session._finish(self._connection, self._response)
+        else:
+            # => The rest of the body is still in flight so the connection
+            # => cannot be reused.
+            self._connection.close()
+        self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _query_value(value):
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (list, tuple)):
+        return [_query_value(item) for item in value]
+    return value
+
+
+# => Sessions are shared by every caller within the module run.
+_sessions = dict()
+
+
+def get__cohesity_rest__session(server, token="", validate_certs=True):
+    '''
+    Return the shared session for the Cluster, creating it if required.
+
+    :param server: IP or FQDN for the Cohesity Cluster
+    :param token: Bearer Token used to authenticate the requests
+    :param validate_certs: switch determines if SSL Validation should be enabled
+    :return: CohesityRestSession
+    '''
+    key = (server, bool(validate_certs))
+    session = _sessions.get(key)
+    if session is None:
+        session = _sessions.setdefault(
+            key, CohesityRestSession(server, token, validate_certs))
+    # => Callers hold on to the token they were given; ignore tokens which the
+    # => session has already replaced after a 'Token expired' response.
+    if token and token not in session.expired_tokens:
+        session.token = token
+    return session
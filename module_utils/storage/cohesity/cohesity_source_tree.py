@@ -0,0 +1,151 @@
+#
+# cohesity_source_tree
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesitySourceTree** utils module provides an index over Protection Source
+trees so that objects can be found by name, id or endpoint without walking the
+tree for each lookup.
+'''
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_json_stream import load__json__fields
+
+
+# => Fields kept for each node when a Protection Source tree is streamed.
+SOURCE_NODE_FIELDS = dict(
+    protectionSource={'id': True, 'name': True, 'environment': True,
+                      '*ProtectionSource': dict(type=True)},
+    registrationInfo=dict(accessInfo=dict(endpoint=True))
+)
+SOURCE_NODE_FIELDS['nodes'] = SOURCE_NODE_FIELDS
+
+
+def get__source__type(source):
+    '''
+    Return the environment specific type (e.g. kVirtualMachine) of a Protection Source.
+    '''
+    for key, value in source.items():
+        if key.endswith('ProtectionSource') and isinstance(value, dict):
+            return value.get('type')
+    return None
+
+
+def load__source_tree(session, params, path="/public/protectionSources"):
+    '''
+    Stream a Protection Source tree keeping only the fields needed for lookups
+    so that memory use does not grow with the size of the raw response.
+
+    :param session: CohesityRestSession
+    :param params: query parameters
+    :return: list of reduced nodes
+    '''
+    with session.stream(path, params=params) as response:
+        return load__json__fields(response, SOURCE_NODE_FIELDS)
+
+
+class SourceTreeIndex(object):
+    '''
+    Index of a Protection Source tree
+
+    The tree is walked once and every node is stored in dictionaries keyed by
+    id, (name, type), endpoint and parent id.
+    '''
+
+    def __init__(self, nodes=None):
+        # => id => protectionSource
+        self.sources = dict()
+        # => name => type => [ids]
+        self.names = dict()
+        # => endpoint => id
+        self.endpoints = dict()
+        # => id => parent id
+        self.parents = dict()
+        if nodes:
+            self.add(nodes)
+
+    def add(self, nodes, parent_id=None):
+        '''
+        Add a list of Protection Source nodes (and their children) to the index.
+
+        :param nodes: list of nodes as returned by /public/protectionSources
+        :param parent_id: id of the node the list belongs to
+        '''
+        pending = [(parent_id, nodes)]
+        while pending:
+            parent_id, nodes = pending.pop()
+            for node in nodes:
+                source = node.get('protectionSource')
+                node_id = parent_id
+                if source:
+                    node_id = source['id']
+                    self.add__source(source, parent_id, node.get('registrationInfo'))
+                if node.get('nodes'):
+                    pending.append((node_id, node['nodes']))
+        return self
+
+    def add__source(self, source, parent_id=None, registration_info=None):
+        source_id = source['id']
+        source_type = get__source__type(source)
+        if source_id not in self.sources:
+            self.names.setdefault(source.get('name'), dict()).setdefault(
+                source_type, []).append(source_id)
+        self.sources[source_id] = source
+        if parent_id is not None:
+            self.parents.setdefault(source_id, parent_id)
+        endpoint = ((registration_info or dict()).get('accessInfo') or dict()).get('endpoint')
+        if endpoint:
+            self.endpoints[endpoint] = source_id
+
+    def get__id(self, name, source_type=None):
+        '''
+        Return the id of the first object with the name (and type) or None.
+        '''
+        ids = self.get__ids([name], source_type)
+        return ids[0] if ids else None
+
+    def get__ids(self, names, source_type=None):
+        '''
+        Return the ids of every object matching one of the names.
+
+        :param names: list of object names
+        :param source_type: optional type such as kVirtualMachine or kResourcePool
+        :return: list of unique ids
+        '''
+        ids = []
+        seen = set()
+        for name in names:
+            for obj_type, type_ids in self.names.get(name, dict()).items():
+                if source_type is not None and obj_type != source_type:
+                    continue
+                for obj_id in type_ids:
+                    if obj_id not in seen:
+                        seen.add(obj_id)
+                        ids.append(obj_id)
+        return ids
+
+    def get__id__by_endpoint(self, endpoint, match_name=False):
+        '''
+        Return the id of the registered source with the endpoint or None.
+
+        :param match_name: also match the source name when no endpoint matches
+        '''
+        if endpoint in self.endpoints:
+            return self.endpoints[endpoint]
+        if match_name:
+            return self.get__id(endpoint)
+        return None
+
+    def get__parent(self, source_id):
+        '''
+        Return the Protection Source of the parent of the object or None.
+        '''
+        return self.sources.get(self.parents.get(source_id))
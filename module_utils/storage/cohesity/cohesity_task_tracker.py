@@ -0,0 +1,155 @@
+#
+# cohesity_task_tracker
+#
+# Copyright (c) 2018 Cohesity Inc
+# Apache License Version 2.0
+#
+
+
+'''
+The **CohesityTaskTracker** utils module follows the progress of many restore
+and clone tasks using a single request per poll.
+'''
+
+import time
+
+try:
+    # => When unit testing, we need to look in the correct location however, when run via ansible,
+    # => the expectation is that the modules will live under ansible.
+    from module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay
+except Exception as e:
+    from ansible.module_utils.storage.cohesity.cohesity_utilities import get__backoff__delay
+
+
+# => Restore Task states which will no longer change.
+TASK_TERMINAL_STATES = ['kFinished', 'kCancelled']
+# => Number of task ids sent in a single request.
+TASK_BATCH_SIZE = 100
+
+
+def get__task__handle(server, task_ids):
+    '''
+    Return a handle for Restore or Clone Tasks which can be passed to
+    cohesity_task_wait to check on the tasks later, from any play or host.
+    '''
+    return dict(cluster=server, task_ids=[int(task_id) for task_id in task_ids])
+
+
+def get__task_ids__by_handles(server, handles):
+    '''
+    Return the task ids of every handle created for the Cluster.
+
+    :raises ValueError: when a handle belongs to another Cluster
+    '''
+    task_ids = []
+    for handle in handles:
+        if handle.get('cluster') and handle['cluster'] != server:
+            raise ValueError("The task handle belongs to the Cluster " + str(handle['cluster']))
+        task_ids.extend(handle.get('task_ids') or [])
+    return task_ids
+
+
+def get__restore_task__errors(task):
+    '''
+    Return the error messages reported by a Restore Task.
+    '''
+    errors = []
+    if (task.get('error') or dict()).get('message'):
+        errors.append(task['error']['message'])
+    for object_state in task.get('restoreObjectState') or []:
+        if (object_state.get('error') or dict()).get('message'):
+            errors.append(object_state['error']['message'])
+    return errors
+
+
+class RestoreTaskTracker(object):
+    '''
+    Track the status of a set of Restore (or Clone) Tasks
+
+    Every poll sends the ids of the tasks which are still pending in batches of
+    `/public/restore/tasks?taskIds=` requests instead of one request per task.
+    '''
+
+    def __init__(self, session, task_ids):
+        self.session = session
+        self.task_ids = []
+        for task_id in task_ids:
+            if int(task_id) not in self.task_ids:
+                self.task_ids.append(int(task_id))
+        # => id => latest Restore Task
+        self.tasks = dict()
+        # => ids which were not returned by the Cluster
+        self.missing = set()
+        self.polls = 0
+        self.requests = 0
+
+    def is__done(self, task_id):
+        if task_id in self.missing:
+            return True
+        return self.tasks.get(task_id, dict()).get('status') in TASK_TERMINAL_STATES
+
+    def get__pending(self):
+        return [task_id for task_id in self.task_ids if not self.is__done(task_id)]
+
+    def poll(self):
+        '''
+        Refresh every pending task.
+
+        :return: list of the task ids which finished during this poll
+        '''
+        pending = self.get__pending()
+        for start in range(0, len(pending), TASK_BATCH_SIZE):
+            batch = pending[start:start + TASK_BATCH_SIZE]
+            tasks = self.session.get("/public/restore/tasks", params=dict(taskIds=batch))
+            self.requests += 1
+            returned = set()
+            for task in tasks or []:
+                self.tasks[task['id']] = task
+                returned.add(task['id'])
+            # => Do not wait for tasks which the Cluster does not know about.
+            self.missing.update(set(batch) - returned)
+        self.polls += 1
+        return [task_id for task_id in pending if self.is__done(task_id)]
+
+    def wait(self, timeout, interval=None, max_interval=None):
+        '''
+        Poll until every task has finished or the deadline passes.
+
+        The delay between polls is reset whenever a task finishes and grows
+        while none of the tasks make progress.
+
+        :param timeout: number of seconds to wait
+        :return: list of task status dictionaries
+        '''
+        deadline = time.time() + timeout
+        idle = 0
+        while True:
+            idle = 0 if self.poll() else idle + 1
+            remaining = deadline - time.time()
+            if not self.get__pending() or remaining <= 0:
+                break
+            delay = get__backoff__delay(idle, interval, max_interval)
+            time.sleep(min(delay, remaining))
+        return self.get__status()
+
+    def get__status(self):
+        '''
+        Return the id, name, type, status and errors of each task.
+        '''
+        output = []
+        for task_id in self.task_ids:
+            task = self.tasks.get(task_id, dict())
+            status = task.get('status')
+            if task_id in self.missing:
+                status = 'kNotFound'
+            errors = get__restore_task__errors(task)
+            output.append(dict(
+                id=task_id,
+                name=task.get('name'),
+                type=(task.get('type') or '').lstrip('k') or None,
+                status=(status or '').lstrip('k') or None,
+                done=self.is__done(task_id),
+                failed=bool(errors) or task_id in self.missing or status == 'kCancelled',
+                errors=errors
+            ))
+        return output
@@ -11,6 +11,12 @@ The **CohesityUtilities** utils module provides the authentication token manage
 for Cohesity Platforms.
 '''
 
+import random
+import threading
+import time
+
+from ansible.module_utils.six.moves import queue
+
 
 def cohesity_common_argument_spec():
     return dict(
@@ -19,6 +25,11 @@ def cohesity_common_argument_spec():
         password=dict(type='str', aliases=['cohesity_password',
                                            'admin_pass'], no_log=True),
         validate_certs=dict(default=True, type='bool', aliases=['cohesity_validate_certs']),
+        token_cache=dict(default=False, type='bool'),
+        token_cache_path=dict(type='path'),
+        reference_cache=dict(default=False, type='bool'),
+        reference_cache_path=dict(type='path'),
+        reference_cache_ttl=dict(default=300, type='int'),
         state=dict(choices=['present', 'absent'], default='present')
     )
 
@@ -32,5 +43,91 @@ def raise__cohesity_exception__handler(error, module, message=""):
                      error_class=type(error).__name__)
 
 
+def run__concurrent__requests(requests, max_parallel_requests=1):
+    '''
+    Run independent requests on a bounded pool of worker threads.
+
+    :param requests: list of (name, function, args) tuples
+    :param max_parallel_requests: maximum number of requests in flight
+    :return: dictionary keyed by name containing the result, error and
+             elapsed time in seconds for each request
+    '''
+    pending = queue.Queue()
+    for request in requests:
+        pending.put(request)
+    outcomes = dict()
+
+    def worker():
+        while True:
+            try:
+                name, function, args = pending.get_nowait()
+            except queue.Empty:
+                return
+            outcome = dict(result=None, error=None)
+            started = time.time()
+            try:
+                outcome['result'] = function(*args)
+            except Exception as error:
+                outcome['error'] = str(error) or type(error).__name__
+            outcome['elapsed'] = round(time.time() - started, 3)
+            outcomes[name] = outcome
+
+    workers = [threading.Thread(target=worker)
+               for count in range(min(max(1, max_parallel_requests), len(requests)))]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return outcomes
+
+
+def get__backoff__delay(attempt, interval=None, max_interval=None, backoff=2, jitter=0.2):
+    '''
+    Return the delay in seconds before the next poll.
+
+    :param attempt: number of polls since the delay was last reset
+    '''
+    delay = min((interval or WAIT_INTERVAL) * backoff ** attempt, max_interval or WAIT_MAX_INTERVAL)
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+def wait__for__state(check, timeout, interval=None, max_interval=None, backoff=2, jitter=0.2):
+    '''
+    Poll until `check` reports a terminal state or the deadline passes.
+
+    The delay between polls starts at `interval` seconds and is multiplied by
+    `backoff` after each poll up to `max_interval`.  Each delay is randomly
+    adjusted by up to `jitter` so that waiters started together do not poll
+    the cluster in lock step.
+
+    :param check: function returning a (done, value) tuple
+    :param timeout: number of seconds to wait before giving up
+    :return: dictionary containing done, the last value, the number of
+             attempts and the elapsed time in seconds
+    '''
+    interval = interval or WAIT_INTERVAL
+    max_interval = max_interval or WAIT_MAX_INTERVAL
+    started = time.time()
+    deadline = started + timeout
+    attempts = 0
+    while True:
+        done, value = check()
+        attempts += 1
+        remaining = deadline - time.time()
+        if done or remaining <= 0:
+            break
+        delay = get__backoff__delay(attempts - 1, interval, max_interval, backoff, jitter)
+        time.sleep(max(0, min(delay, remaining)))
+    return dict(done=done, value=value, attempts=attempts,
+                elapsed=round(time.time() - started, 3))
+
+
 # constants
 REQUEST_TIMEOUT = 120
+# => Default number of concurrent requests made to a Cluster.
+MAX_PARALLEL_REQUESTS = 10
+
+# => Initial and maximum delay in seconds between the polls of a waiter.
+WAIT_INTERVAL = 2
+WAIT_MAX_INTERVAL = 30
@@ -0,0 +1,105 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+import errno
+import os
+import shutil
+import signal
+import tempfile
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_agent_probe import AgentProbe
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_agent_probe import AgentProbe
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class TestAgentProbe(unittest.TestCase):
+    ''' Cohesity Agent Probe Tests '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.proc_path = os.path.join(self.path, 'proc')
+        for pid, command in [('self', b'python\0-m\0pytest\0'),
+                             ('101', b'/opt/cohesity/agent/software/crux/bin/linux_agent\0--port\x0050051\0'),
+                             ('102', b'/usr/bin/python\0grep\0crux/bin/linux_agent\0'),
+                             ('103', b''),
+                             ('104', b'/opt/cohesity/agent/software/crux/bin/linux_agent\0')]:
+            os.makedirs(os.path.join(self.proc_path, pid))
+            with open(os.path.join(self.proc_path, pid, 'cmdline'), 'wb') as cmdline:
+                cmdline.write(command)
+        os.makedirs(os.path.join(self.proc_path, 'sys'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test__version__is_read_once(self):
+        ''' Test that the agent is asked for its version once until the probe is reset. '''
+        module = FakeModule()
+        probe = AgentProbe(self.proc_path)
+
+        with patch.object(module, 'run_command', create=True) as mock_run:
+            mock_run.return_value = (0, "Cohesity Agent\nVersion: 6.5.1d_release\n", "")
+            assert probe.get__version(module)[0] == '6.5.1d_release'
+            assert probe.get__version(module)[0] == '6.5.1d_release'
+            mock_run.return_value = (0, "Cohesity Agent\n", "")
+            probe.reset()
+            assert probe.get__version(module)[0] == ''
+        assert mock_run.call_count == 2
+
+    def test__kill__orphaned__processes(self):
+        ''' Test that the agent processes are found in /proc and killed in one pass. '''
+        module = FakeModule()
+        probe = AgentProbe(self.proc_path)
+
+        def kill(pid, sig):
+            if pid == 104:
+                raise OSError(errno.ESRCH, os.strerror(errno.ESRCH))
+
+        with patch(global_module_util_path + '.cohesity_agent_probe.os.kill', side_effect=kill) as mock_kill:
+            assert probe.get__orphaned__processes(module) == [101, 104]
+            assert probe.kill__orphaned__processes(module) == dict()
+            assert probe.kill__orphaned__processes(module) == dict()
+
+        assert mock_kill.call_args_list == [call(101, signal.SIGKILL), call(104, signal.SIGKILL)]
+
+    def test__manifest(self):
+        ''' Test that the manifest is written atomically, cached and removed. '''
+        manifest_path = os.path.join(self.path, 'cohesity-ansible', 'agent.json')
+        probe = AgentProbe(self.proc_path, manifest_path)
+
+        assert probe.get__manifest() is None
+        probe.set__manifest(dict(version='6.5.1d', cluster_version='6.5.1d'))
+        assert os.stat(manifest_path).st_mode & 0o777 == 0o600
+        assert os.listdir(os.path.dirname(manifest_path)) == ['agent.json']
+        probe.reset()
+        assert probe.get__manifest() == dict(version='6.5.1d', cluster_version='6.5.1d')
+        probe.remove__manifest()
+        probe.remove__manifest()
+        assert probe.get__manifest() is None
+        assert not os.path.exists(manifest_path)
@@ -0,0 +1,195 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_agent_repository import publish__package, get__rpm__header, \
+        get__repository__files, get__repository__commands, RepositoryError
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_agent_repository import publish__package, \
+        get__rpm__header, get__repository__files, get__repository__commands, RepositoryError
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+CONTROL = b'''Package: cohesity-agent
+Version: 6.5.1d-1
+Architecture: amd64
+Description: Cohesity Agent
+ Physical agent of the Cohesity DataPlatform.
+'''
+
+
+def get__ar__member(name, data):
+    header = name.ljust(16) + '0'.ljust(12) + '0'.ljust(6) + '0'.ljust(6) + '100644'.ljust(8) + \
+        str(len(data)).ljust(10) + '`\n'
+    return header.encode('ascii') + data + (b'\n' if len(data) % 2 else b'')
+
+
+def write__deb(filename, control=CONTROL):
+    control_tar = io.BytesIO()
+    with tarfile.open(fileobj=control_tar, mode='w:gz') as tar:
+        info = tarfile.TarInfo('./control')
+        info.size = len(control)
+        tar.addfile(info, io.BytesIO(control))
+    with open(filename, 'wb') as f:
+        f.write(b'!<arch>\n' + get__ar__member('debian-binary', b'2.0\n') +
+                get__ar__member('control.tar.gz', control_tar.getvalue()) +
+                get__ar__member('data.tar.xz', b'data'))
+
+
+def get__rpm__header__bytes(tags):
+    index, store = b'', b''
+    for tag, value in tags:
+        index += struct.pack('>IIII', tag, 6, len(store), 1)
+        store += value + b'\0'
+    return b'\x8e\xad\xe8\x01\0\0\0\0' + struct.pack('>II', len(tags), len(store)) + index + store
+
+
+class TestAgentRepository(unittest.TestCase):
+    ''' Agent Package Repository Tests '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test__publish__deb__package(self):
+        ''' Test that a Debian package is published once with its flat repository index. '''
+        package = os.path.join(self.path, 'cohesity-agent_6.5.1d-1_amd64.deb')
+        write__deb(package)
+        repository_dir = os.path.join(self.path, 'repos', 'kLinux-kDEB')
+
+        published = publish__package(FakeModule(), repository_dir, package, 'kDEB')
+        again = publish__package(FakeModule(), repository_dir, package, 'kDEB')
+
+        assert (published['changed'], again['changed']) == (True, False)
+        assert (published['name'], published['version']) == ('cohesity-agent', '6.5.1d-1')
+        with open(os.path.join(repository_dir, 'Packages'), 'rb') as f:
+            packages = f.read().decode('utf-8')
+        with open(package, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        assert packages.startswith(CONTROL.decode('utf-8'))
+        assert "Filename: ./cohesity-agent_6.5.1d-1_amd64.deb\n" in packages
+        assert "SHA256: " + digest + "\n" in packages
+        with gzip.open(os.path.join(repository_dir, 'Packages.gz'), 'rb') as f:
+            assert f.read().decode('utf-8') == packages
+        with open(os.path.join(repository_dir, 'Release'), 'r') as f:
+            assert " Packages.gz\n" in f.read()
+
+    def test__publish__rpm__package(self):
+        ''' Test that the rpm header is read and createrepo generates the metadata. '''
+        package = os.path.join(self.path, 'el-cohesity-agent-6.5.1d-1.x86_64.rpm')
+        signature = get__rpm__header__bytes([(1000, b'sha256')])
+        with open(package, 'wb') as f:
+            f.write(b'\xed\xab\xee\xdb' + b'\0' * 92 + signature + b'\0' * ((8 - len(signature) % 8) % 8) +
+                    get__rpm__header__bytes([(1000, b'cohesity-agent'), (1001, b'6.5.1d'),
+                                             (1002, b'1'), (1022, b'x86_64')]))
+        module = FakeModule()
+        repository_dir = os.path.join(self.path, 'repos', 'kLinux-kRPM')
+
+        with patch.object(module, 'get_bin_path', create=True) as mock_bin, \
+                patch.object(module, 'run_command', create=True) as mock_run:
+            mock_bin.side_effect = lambda command: '/usr/bin/createrepo' if command == 'createrepo' else None
+            mock_run.return_value = (0, '', '')
+            published = publish__package(module, repository_dir, package, 'kRPM')
+
+        assert get__rpm__header(package)['arch'] == 'x86_64'
+        assert (published['name'], published['version']) == ('cohesity-agent', '6.5.1d-1')
+        assert mock_run.call_args_list == [call(['/usr/bin/createrepo', repository_dir])]
+        with pytest.raises(RepositoryError):
+            get__rpm__header(__file__)
+
+    def test__get__repository__files(self):
+        ''' Test that the version is pinned in the configuration of the package manager. '''
+        files = get__repository__files('kDEB', 'http://mirror.lab/repos/kLinux-kDEB', '6.5.1d-1', trusted=True)
+        assert files['/etc/apt/sources.list.d/cohesity-agent.list'] == \
+            "deb [trusted=yes] http://mirror.lab/repos/kLinux-kDEB ./\n"
+        assert "Pin: version 6.5.1d-1\n" in files['/etc/apt/preferences.d/cohesity-agent']
+
+        files = get__repository__files('kRPM', 'http://mirror.lab/repos/kLinux-kRPM', '6.5.1d-1', trusted=True)
+        assert "includepkgs=cohesity-agent-6.5.1d-1\n" in files['/etc/yum.repos.d/cohesity-agent.repo']
+        assert get__repository__commands('kRPM', '6.5.1d-1') == [['yum', '-y', 'install', 'cohesity-agent-6.5.1d-1']]
+        assert get__repository__commands('kSuseRPM')[-1][-1] == 'cohesity-agent'
+
+    def test__get__repository__files__signed(self):
+        ''' Test that a signed repository is verified with the public key and an unsigned one must be trusted. '''
+        key = "-----BEGIN PGP PUBLIC KEY BLOCK-----\nkey\n-----END PGP PUBLIC KEY BLOCK-----\n"
+
+        files = get__repository__files('kDEB', 'http://mirror.lab/repos/kLinux-kDEB', gpg_key=key)
+        assert files['/etc/apt/sources.list.d/cohesity-agent.list'] == \
+            "deb [signed-by=/etc/apt/keyrings/cohesity-agent.asc] http://mirror.lab/repos/kLinux-kDEB ./\n"
+        assert files['/etc/apt/keyrings/cohesity-agent.asc'] == key
+
+        files = get__repository__files('kSuseRPM', 'http://mirror.lab/repos/kLinux-kSuseRPM', gpg_key=key)
+        assert "repo_gpgcheck=1\ngpgkey=file:///etc/pki/rpm-gpg/RPM-GPG-KEY-cohesity-agent\n" in \
+            files['/etc/zypp/repos.d/cohesity-agent.repo']
+        assert files['/etc/pki/rpm-gpg/RPM-GPG-KEY-cohesity-agent'] == key
+        assert get__repository__commands('kSuseRPM', signed=True)[0] == \
+            ['rpm', '--import', '/etc/pki/rpm-gpg/RPM-GPG-KEY-cohesity-agent']
+        with pytest.raises(RepositoryError):
+            get__repository__files('kRPM', 'http://mirror.lab/repos/kLinux-kRPM')
+
+    def test__publish__signed__deb__package(self):
+        ''' Test that the Release file is signed and signed again when the key changes. '''
+        package = os.path.join(self.path, 'cohesity-agent_6.5.1d-1_amd64.deb')
+        write__deb(package)
+        repository_dir = os.path.join(self.path, 'repos', 'kLinux-kDEB')
+        module = FakeModule()
+        keys = dict(mirror='KEY1\n')
+
+        def run_command(cmd):
+            if '--export' in cmd:
+                return 0, keys[cmd[-1]], ''
+            with open(cmd[cmd.index('--output') + 1], 'w') as f:
+                f.write('signed by ' + cmd[cmd.index('--local-user') + 1])
+            return 0, '', ''
+
+        with patch.object(module, 'get_bin_path', create=True, return_value='/usr/bin/gpg'), \
+                patch.object(module, 'run_command', create=True, side_effect=run_command) as mock_run:
+            published = publish__package(module, repository_dir, package, 'kDEB', 'mirror')
+            again = publish__package(module, repository_dir, package, 'kDEB', 'mirror')
+            keys['mirror'] = 'KEY2\n'
+            rotated = publish__package(module, repository_dir, package, 'kDEB', 'mirror')
+
+        assert [result['changed'] for result in (published, again, rotated)] == [True, False, True]
+        assert (published['gpg_key'], rotated['gpg_key']) == ('KEY1\n', 'KEY2\n')
+        assert sorted(name for name in os.listdir(repository_dir) if not name.endswith('.deb')) == \
+            ['InRelease', 'Packages', 'Packages.gz', 'Release', 'Release.gpg', 'cohesity-agent.asc']
+        with open(os.path.join(repository_dir, 'cohesity-agent.asc'), 'r') as f:
+            assert f.read() == 'KEY2\n'
+        # => One export for each publish and two signatures for each change.
+        assert mock_run.call_count == 3 + 2 * 2
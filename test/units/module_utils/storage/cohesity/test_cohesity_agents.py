@@ -0,0 +1,136 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+from io import BytesIO
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_agents import AgentUpgradeTracker, get__physical__agents
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+def get__source__node(source_id, name, **agent):
+    agent = dict(dict(id=source_id + 1, version='6.4.1', status='kHealthy', upgradability='kUpgradable'), **agent)
+    return dict(
+        protectionSource=dict(id=source_id, name=name, environment='kPhysical',
+                              physicalProtectionSource=dict(type='kHost', agents=[agent])),
+        registrationInfo=dict(accessInfo=dict(endpoint='10.2.0.' + str(source_id)), refreshTimeUsecs=1))
+
+
+class FakeSession(object):
+    ''' Serves the next Physical Protection Source listing on every call. '''
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.streams = 0
+        self.posts = []
+
+    def stream(self, path, params=None):
+        self.streams += 1
+        nodes = self.listings.pop(0) if len(self.listings) > 1 else self.listings[0]
+        return BytesIO(json.dumps([dict(protectionSource=dict(id=1, name='kPhysical'),
+                                        nodes=nodes)]).encode('utf-8'))
+
+    def post(self, path, data=None):
+        self.posts.append(data)
+
+
+class TestAgentUpgradeTracker(unittest.TestCase):
+    ''' Physical Agent Upgrade Tracker Tests '''
+
+    def setUp(self):
+        # => Sleeping advances a fake clock so that waits end without delay.
+        self.clock = [1000.0]
+        self.sleep_patcher = patch(
+            global_module_util_path + '.cohesity_agents.time.sleep',
+            side_effect=lambda seconds: self.clock.__setitem__(0, self.clock[0] + seconds))
+        self.time_patcher = patch(
+            global_module_util_path + '.cohesity_agents.time.time', side_effect=lambda: self.clock[0])
+        self.mock_sleep = self.sleep_patcher.start()
+        self.time_patcher.start()
+
+    def tearDown(self):
+        self.sleep_patcher.stop()
+        self.time_patcher.stop()
+
+    def test__get__physical__agents(self):
+        ''' Test that each host is found by name and endpoint from one listing. '''
+        session = FakeSession([[get__source__node(10, 'linux01.lab'), get__source__node(20, 'linux02.lab')]])
+
+        agents = get__physical__agents(session)
+
+        assert session.streams == 1
+        assert agents['linux01.lab'] is agents['10.2.0.10']
+        assert agents['linux02.lab']['source_id'] == 20
+        assert agents['linux02.lab']['agent']['id'] == 21
+        assert 'environment' not in agents['linux02.lab']
+
+    def test__wait__polls_all_hosts_together(self):
+        ''' Test that one request upgrades every host and failed or unhealthy agents are reported. '''
+        before = [get__source__node(10, 'linux01.lab'), get__source__node(20, 'linux02.lab'),
+                  get__source__node(30, 'linux03.lab')]
+        upgrading = [get__source__node(10, 'linux01.lab', upgradeStatus='kStarted'),
+                     get__source__node(20, 'linux02.lab', upgradeStatus='kStarted'),
+                     get__source__node(30, 'linux03.lab', upgradeStatus='kStarted')]
+        after = [get__source__node(10, 'linux01.lab', version='6.5.1', upgradability='kCurrent',
+                                   upgradeStatus='kFinished'),
+                 get__source__node(20, 'linux02.lab', upgradeStatus='kFinished',
+                                   upgradeStatusMessage='Upgrade failed'),
+                 get__source__node(30, 'linux03.lab', version='6.5.1', upgradability='kCurrent',
+                                   upgradeStatus='kFinished', status='kUnreachable')]
+        session = FakeSession([before, upgrading, after])
+        hosts = ['linux01.lab', 'linux02.lab', '10.2.0.30']
+        tracker = AgentUpgradeTracker(session, get__physical__agents(session))
+
+        tracker.start(hosts)
+        statuses = tracker.wait(hosts, 60)
+
+        assert session.posts == [dict(agentIds=[11, 21, 31])]
+        assert [status['failed'] for status in statuses] == [False, True, True]
+        assert statuses[0]['previous_version'] == '6.4.1'
+        assert statuses[0]['version'] == '6.5.1'
+        assert statuses[1]['message'] == 'Upgrade failed'
+        assert statuses[2]['healthy'] is False
+        assert tracker.polls == session.streams - 1
+        assert tracker.requests == tracker.polls + 1
+        # => linux03 stays unreachable, so the wait runs to the deadline with capped delays.
+        assert self.clock[0] >= 1060.0
+        assert 2 < tracker.polls < 10
+        assert max(delay for (delay,), kwargs in self.mock_sleep.call_args_list) <= 30 * 1.2
+
+    def test__wait__caps_the_backoff(self):
+        ''' Test that a long wait with a float interval keeps polling at max_interval. '''
+        hosts = ['linux01.lab']
+        session = FakeSession([[get__source__node(10, 'linux01.lab', upgradeStatus='kStarted')]])
+        tracker = AgentUpgradeTracker(session, get__physical__agents(session))
+
+        statuses = tracker.wait(hosts, 86400, interval=0.5, max_interval=60.0)
+
+        assert statuses[0]['failed'] is True
+        assert 86400 / (60.0 * 1.2) <= tracker.polls <= 86400 / (60.0 * 0.8) + 10
@@ -6,6 +6,10 @@ __metaclass__ = type
 from sys import path as sys_path
 from os import path as os_path
 from os import environ
+from os import stat
+import shutil
+import tempfile
+import time
 
 # => Import Cohesity Modules and Helpers
 
@@ -15,7 +19,7 @@ try:
         __file__), '../../../../../module_utils'))
     sys_path.append(os_path.join(os_path.dirname(__file__),
                                  'helpers'))
-    from storage.cohesity.cohesity_auth import Authentication, TokenException, ParameterViolation, get__cohesity_auth__token
+    from storage.cohesity.cohesity_auth import Authentication, TokenCache, TokenException, ParameterViolation, get__cohesity_auth__token
     # => Set the default Module and ModuleUtility Paths
     global_module_path = 'library'
     global_module_util_path = 'storage.cohesity'
@@ -24,7 +28,7 @@ try:
 except Exception as e:
     # => Reset the correct path Location
     sys_path = current_path
-    from ansible.modules_utils.storage.cohesity.cohesity_auth import Authentication, TokenException, ParameterViolation, get__cohesity_auth__token
+    from ansible.modules_utils.storage.cohesity.cohesity_auth import Authentication, TokenCache, TokenException, ParameterViolation, get__cohesity_auth__token
     sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
     from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
         urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
@@ -75,36 +79,23 @@ class TestAuthentication(unittest.TestCase):
         self.assertEqual(1, self.open_url.call_count)
         self.assertEqual(201, self.open_url.return_value.getcode.return_value)
         expected = call(url=uri, data=json.dumps({
-                        "username": "administrator", "password": "password"}), headers={'Accept': 'application/json'}, validate_certs=False)
+                        "username": "administrator", "password": "password"}), headers={'Accept': 'application/json'}, validate_certs=False, timeout=120)
         self.assertEqual(expected, self.open_url.call_args)
 
     def test__current__auth_token(self):
-        ''' Test to see if the token is expired and if so then trigger a refresh. '''
+        ''' Test that a current token is validated locally without calling the cluster. '''
 
         server = "cohesity-api"
-        uri = "https://" + server + "/irisservices/api/v1/public/nodes"
-
-        # =>
-        stream = self.open_url.return_value
-        stream.read.return_value = '[{"id": "1234","clusterPartitionName": "primary"}]'
-        stream.getcode.return_value = 200
-        self.open_url.return_value = stream
-        mockData = json.loads(stream.read.return_value)
 
         # Exercise
-        auth = Authentication()
-        auth.url = uri
-
         cohesity_auth = Authentication()
         cohesity_auth.token = "mytoken"
+        cohesity_auth.issued_at = time.time()
         data = cohesity_auth.get_token(server)
 
         # Verify
-
-        self.assertEqual(1, self.open_url.call_count)
-        expected = call(url=uri, headers={
-                        "Accept": "application/json", "Authorization": "Bearer mytoken"}, validate_certs=False)
-        self.assertEqual(expected, self.open_url.call_args)
+        self.assertEqual('mytoken', data)
+        self.assertEqual(0, self.open_url.call_count)
 
     def test__get__cohesity_auth__token(self):
         module = FakeModule(
@@ -222,8 +213,9 @@ class TestTokenRefresh(unittest.TestCase):
         self.assertEqual(1, self.open_url.call_count)
         self.assertEqual(201, self.open_url.return_value.getcode.return_value)
         expected = call(url=uri, data=json.dumps({
-                        "username": "administrator", "password": "password"}), headers={"Accept": "application/json"}, validate_certs=False)
+                        "username": "administrator", "password": "password"}), headers={"Accept": "application/json"}, validate_certs=False, timeout=120)
         self.assertEqual(expected, self.open_url.call_args)
+        check_patcher.stop()
 
     def test__valid__get_token(self):
         ''' Test to see if the token is valid and if so then do not trigger a refresh. '''
@@ -251,107 +243,122 @@ class TestTokenRefresh(unittest.TestCase):
         # => Assert Test Cases are valid
         self.assertEqual('mytoken', data)
         self.assertEqual(0, self.open_url.call_count)
+        check_patcher.stop()
 
-    def test__fail__check_token(self):
-        ''' Test to see if the token is expired and if so then trigger a refresh. '''
+    def test__valid__check_token(self):
+        ''' Test that a token issued within the last 24 hours is valid. '''
 
-        # => In order to properly test this behavior, we will first need to Mock out
-        # => the call to the method `check_token` and force it to return False. This
-        # => should trigger the Code to return back to the `get_token` method.
-        check_patcher = patch(
-            global_module_util_path + '.cohesity_auth.open_url')
-        mock_check = check_patcher.start()
-        check_var = mock_check.return_value
+        cohesity_auth = Authentication()
+        cohesity_auth.username = "administrator"
+        cohesity_auth.password = "password"
+        cohesity_auth.token = "mytoken"
+        cohesity_auth.issued_at = time.time() - 60
 
-        # =>
-        check_var.read.return_value = '[{"id": "1234","clusterPartitionName": "primary"}]'
-        check_var.getcode.return_value = 200
-        mock_check.return_value = check_var
+        # => Assert Test Cases are valid
+        assert cohesity_auth.check_token("cohesity-api") is True
+        self.assertEqual(0, self.open_url.call_count)
 
-        server = "cohesity-api"
-        uri = "https://" + server + "/irisservices/api/v1/public/nodes"
+    def test__expired__check_token(self):
+        ''' Test that a token issued 24 hours ago is reported as expired. '''
 
-        # => Create a new object of the Class::Authentication and
-        # => assign the credentials including a pre-existing Token.
         cohesity_auth = Authentication()
         cohesity_auth.username = "administrator"
         cohesity_auth.password = "password"
         cohesity_auth.token = "mytoken"
-        data = cohesity_auth.check_token(server)
+        cohesity_auth.issued_at = time.time() - 24 * 60 * 60
 
         # => Assert Test Cases are valid
-        self.assertEqual('mytoken', data.token)
-        self.assertEqual(1, mock_check.call_count)
-        self.assertEqual(200, mock_check.return_value.getcode.return_value)
-        headers = {"Accept": "application/json",
-                   "Authorization": "Bearer mytoken"}
-        expected = call(url=uri, headers=headers, validate_certs=False)
-        self.assertEqual(expected, mock_check.call_args)
-
-    def test__invalid__check_token(self):
-        ''' Test to see if the token is expired and handles the exception. '''
+        assert cohesity_auth.check_token("cohesity-api") is False
+        self.assertEqual(0, self.open_url.call_count)
 
-        server = "cohesity-api"
-        uri = "https://" + server + "/irisservices/api/v1/public/nodes"
+    def test__refresh_token__expired(self):
+        ''' Test that a token rejected by the cluster is replaced only once. '''
 
-        # => In order to properly test this behavior, we will first need to Mock out
-        # => the call to the method `check_token` and force it to return False. This
-        # => should trigger the Code to return back to the `get_token` method.
-        check_patcher = patch(
-            global_module_util_path + '.cohesity_auth.open_url')
-        mock_check = check_patcher.start()
-        mock_check.side_effect = urllib_error.HTTPError(
-            uri,
-            401,
-            'Unauthorized',
-            {'Content-Type': 'application/json'},
-            StringIO('{"message": "Some kind of failure."}')
-        )
+        stream = self.open_url.return_value
+        stream.read.return_value = '{"accessToken": "mynewtoken","tokenType": "Bearer"}'
 
-        # => Create a new object of the Class::Authentication and
-        # => assign the credentials including an expired Token.
         cohesity_auth = Authentication()
         cohesity_auth.username = "administrator"
         cohesity_auth.password = "password"
         cohesity_auth.token = "mytoken"
+        cohesity_auth.issued_at = time.time()
 
-        # => Assert Test Cases are valid
-        with pytest.raises(TokenException) as error:
-            cohesity_auth.check_token(server)
-        assert error.type == TokenException
-        assert cohesity___reg_verify__helper(
-            '.+(Unauthorized)').__check__(str(error.value))
+        # => The second request with the stale token should reuse the new token.
+        self.assertEqual('mynewtoken', cohesity_auth.refresh_token("cohesity-api", "mytoken"))
+        self.assertEqual('mynewtoken', cohesity_auth.refresh_token("cohesity-api", "mytoken"))
+        self.assertEqual(1, self.open_url.call_count)
 
-    def test__exception__check_token(self):
-        ''' Test to see if a token refresh will handle an exception. '''
 
-        server = "cohesity-api"
-        uri = "https://" + server + "/irisservices/api/v1/public/nodes"
+class TestTokenCache(unittest.TestCase):
 
-        # => In order to properly test this behavior, we will first need to Mock out
-        # => the call to the method `check_token` and force it to return False. This
-        # => should trigger the Code to return back to the `get_token` method.
-        check_patcher = patch(
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.patcher = patch(
             global_module_util_path + '.cohesity_auth.open_url')
+        self.open_url = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.cache_path)
+
+    def test__cache__store_and_load(self):
+        ''' Test that a cached token is returned with the time it was issued. '''
+        cache = TokenCache("cohesity-api", "administrator", "LOCAL", self.cache_path)
+        issued_at = time.time()
+        cache.store("mytoken", issued_at)
+
+        assert cache.load() == ("mytoken", issued_at)
+        # => The cache file must only be readable by the owner.
+        assert stat(cache.filename).st_mode & 0o077 == 0
+
+    def test__cache__expired_token(self):
+        ''' Test that tokens older than 24 hours are not returned from the cache. '''
+        cache = TokenCache("cohesity-api", "administrator", "LOCAL", self.cache_path)
+        cache.store("mytoken", time.time() - 24 * 60 * 60)
+
+        assert cache.load() == ("", 0)
+
+    def test__get__auth_token__from_cache(self):
+        ''' Test that a cached token is reused instead of requesting a new one. '''
+        check_patcher = patch(
+            global_module_util_path + '.cohesity_auth.Authentication.check_token')
         mock_check = check_patcher.start()
-        mock_check.side_effect = urllib_error.HTTPError(
-            uri,
-            500,
-            'Internal Server Error',
-            {'Content-Type': 'application/json'},
-            StringIO('Internal Server Error')
-        )
+        mock_check.return_value = True
+
+        cache = TokenCache("cohesity-api", "administrator", "", self.cache_path)
+        cache.store("mycachedtoken", time.time())
 
-        # => Create a new object of the Class::Authentication and
-        # => assign the credentials including an expired Token.
         cohesity_auth = Authentication()
         cohesity_auth.username = "administrator"
         cohesity_auth.password = "password"
+        cohesity_auth.cache = cache
+        data = cohesity_auth.get_token("cohesity-api")
+        check_patcher.stop()
+
+        self.assertEqual('mycachedtoken', data)
+        self.assertEqual(0, self.open_url.call_count)
+
+    def test__refresh__expired_cached_token(self):
+        ''' Test that an expired cached token is replaced in the cache. '''
+        check_patcher = patch(
+            global_module_util_path + '.cohesity_auth.Authentication.check_token')
+        mock_check = check_patcher.start()
+        mock_check.return_value = False
+
+        stream = self.open_url.return_value
+        stream.read.return_value = '{"accessToken": "mynewtoken","tokenType": "Bearer"}'
+
+        cache = TokenCache("cohesity-api", "administrator", "", self.cache_path)
+        cache.store("mytoken", time.time())
+
+        cohesity_auth = Authentication()
+        cohesity_auth.username = "administrator"
+        cohesity_auth.password = "password"
+        cohesity_auth.cache = cache
         cohesity_auth.token = "mytoken"
+        data = cohesity_auth.get_token("cohesity-api")
+        check_patcher.stop()
 
-        # => Assert Test Cases are valid
-        with pytest.raises(TokenException) as error:
-            cohesity_auth.check_token(server)
-        assert error.type == TokenException
-        assert cohesity___reg_verify__helper(
-            '.+(Internal Server Error)').__check__(str(error.value))
+        self.assertEqual('mynewtoken', data)
+        self.assertEqual(1, self.open_url.call_count)
+        self.assertEqual('mynewtoken', cache.load()[0])
@@ -0,0 +1,87 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+from ansible.module_utils.basic import AnsibleModule
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_controller import load__library__module, run__module__main, \
+        CohesityControllerAction
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_controller import load__library__module, \
+        run__module__main, CohesityControllerAction
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class EchoModule(object):
+    ''' Minimal module which returns its arguments. '''
+
+    @staticmethod
+    def main():
+        module = AnsibleModule(argument_spec=dict(name=dict(type='str', required=True)))
+        if module.params.get('name') == 'fail':
+            module.fail_json(msg="Failed")
+        module.exit_json(changed=True, name=module.params.get('name'))
+
+
+class FakeConnection(object):
+
+    def __init__(self, transport):
+        self.transport = transport
+
+
+class TestControllerExecution(unittest.TestCase):
+    ''' Controller Action Plugin Tests '''
+
+    def test__run__module__main(self):
+        ''' Test that the result passed to exit_json and fail_json is returned. '''
+        result = run__module__main(EchoModule, dict(name="myjob"))
+        failed = run__module__main(EchoModule, dict(name="fail"))
+
+        assert result['changed'] is True
+        assert result['name'] == "myjob"
+        assert failed['failed'] is True
+        assert failed['msg'] == "Failed"
+
+    def test__load__library__module(self):
+        ''' Test that a fresh copy of a library module is loaded for each call. '''
+        first = load__library__module('cohesity_task_wait')
+        second = load__library__module('cohesity_task_wait')
+
+        assert callable(first.main)
+        assert first is not second
+        assert load__library__module('cohesity_missing') is None
+
+    def test__use__controller(self):
+        ''' Test that only local connections run the module in the worker. '''
+        action = CohesityControllerAction.__new__(CohesityControllerAction)
+        action._connection = FakeConnection('ansible.builtin.local')
+
+        assert action._use__controller(dict()) is True
+        assert action._use__controller(dict(cohesity_controller_execution='no')) is False
+        action._connection = FakeConnection('ssh')
+        assert action._use__controller(dict()) is False
@@ -0,0 +1,193 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_download import download__file, DownloadError, PackageCache, \
+        get__agent__package, get__agent__download__uri, get__package__cache__dir
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_download import download__file, DownloadError, PackageCache, \
+        get__agent__package, get__agent__download__uri, get__package__cache__dir
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+PAYLOAD = b'cohesity-agent-installer-payload'
+
+
+class FakeResponse(object):
+    ''' Serves a payload in reads of at most `amt` bytes, failing after `fail_after` bytes. '''
+
+    def __init__(self, payload, code=200, headers=None, fail_after=None):
+        self.payload = payload
+        self.code = code
+        self.headers = headers or dict()
+        self.fail_after = fail_after
+        self.position = 0
+        self.reads = []
+
+    def getcode(self):
+        return self.code
+
+    def read(self, amt):
+        if self.fail_after is not None and self.position >= self.fail_after:
+            raise socket.timeout('timed out')
+        chunk = self.payload[self.position:self.position + amt]
+        self.position += len(chunk)
+        self.reads.append(len(chunk))
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeServer(object):
+    ''' Answers requests for PAYLOAD, honouring Range headers when `ranges` is set. '''
+
+    def __init__(self, ranges=True, fail_after=None):
+        self.ranges = ranges
+        self.fail_after = fail_after
+        self.requests = []
+        self.responses = []
+
+    def open_url(self, url, headers=None, validate_certs=False, timeout=None):
+        self.requests.append(dict(headers))
+        fail_after, self.fail_after = self.fail_after, None
+        if self.ranges and 'Range' in headers:
+            offset = int(headers['Range'].split('=')[1].rstrip('-'))
+            response = FakeResponse(PAYLOAD[offset:], 206, {
+                'content-length': str(len(PAYLOAD) - offset),
+                'content-range': 'bytes %d-%d/%d' % (offset, len(PAYLOAD) - 1, len(PAYLOAD)),
+                'content-disposition': 'attachment; filename="../el-cohesity-agent.rpm"'}, fail_after)
+        else:
+            response = FakeResponse(PAYLOAD, 200, {
+                'content-length': str(len(PAYLOAD)),
+                'content-disposition': 'attachment; filename="../el-cohesity-agent.rpm"'}, fail_after)
+        self.responses.append(response)
+        return response
+
+
+class TestDownloadFile(unittest.TestCase):
+    ''' Chunked, resumable Download Tests '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.sleep_patcher = patch(
+            global_module_util_path + '.cohesity_download.time.sleep')
+        self.sleep_patcher.start()
+
+    def tearDown(self):
+        self.sleep_patcher.stop()
+        shutil.rmtree(self.path)
+
+    def download(self, server, **kwargs):
+        with patch(global_module_util_path + '.cohesity_download.open_url', server.open_url):
+            return download__file('https://cohesity.lab/download', self.path, chunk_size=8, **kwargs)
+
+    def test__download__resumes_interrupted_transfer(self):
+        ''' Test that the second attempt only requests the missing bytes and the result is verified. '''
+        server = FakeServer(fail_after=16)
+        checksum = 'sha256:' + hashlib.sha256(PAYLOAD).hexdigest()
+
+        download = self.download(server, checksum=checksum)
+
+        assert download['filename'] == os.path.join(self.path, 'el-cohesity-agent.rpm')
+        assert download['checksum'] == checksum
+        assert download['resumed_bytes'] == 16
+        assert download['attempts'] == 2
+        assert server.requests[1]['Range'] == 'bytes=16-'
+        assert max(server.responses[0].reads) == 8
+        with open(download['filename'], 'rb') as f:
+            assert f.read() == PAYLOAD
+        assert os.listdir(self.path) == ['el-cohesity-agent.rpm']
+
+    def test__download__restarts_when_range_is_ignored(self):
+        ''' Test that a full response to a Range request replaces the partial file. '''
+        server = FakeServer(ranges=False, fail_after=16)
+
+        download = self.download(server)
+
+        assert download['resumed_bytes'] == 0
+        assert download['size'] == len(PAYLOAD)
+        with open(download['filename'], 'rb') as f:
+            assert f.read() == PAYLOAD
+
+    def test__download__checksum_mismatch(self):
+        ''' Test that a download which does not match the checksum is never moved into place. '''
+        server = FakeServer()
+
+        with pytest.raises(DownloadError):
+            self.download(server, checksum='0' * 64, retries=1)
+
+        assert len(server.requests) == 2
+        assert 'Range' not in server.requests[1]
+        assert os.listdir(self.path) == []
+
+
+class TestPackageCache(unittest.TestCase):
+    ''' Versioned agent installer cache Tests '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test__agent__package__keys(self):
+        ''' Test that the cache directory depends on the Cluster version and package. '''
+        package = get__agent__package('Ubuntu', True)
+
+        assert package == dict(hostType='kLinux', pkgType='kDEB')
+        assert get__agent__package('AIX', False) == dict(hostType='kAix', agentType='kJava')
+        assert get__agent__download__uri('cohesity.lab', package) == \
+            "https://cohesity.lab/irisservices/api/v1/public/physicalAgents/download?hostType=kLinux&pkgType=kDEB"
+        assert get__package__cache__dir(self.path, 'cohesity.lab', '6.5.1d', package) == \
+            os.path.join(self.path, 'cohesity.lab', '6.5.1d', 'kLinux-kDEB')
+        assert get__package__cache__dir(self.path, 'cohesity.lab', '6.6.0', package) != \
+            get__package__cache__dir(self.path, 'cohesity.lab', '6.5.1d', package)
+
+    def test__fetch__downloads_once(self):
+        ''' Test that the installer is only downloaded when it is not cached. '''
+        server = FakeServer()
+        cache = PackageCache(os.path.join(self.path, 'cohesity.lab', '6.5.1d', 'kLinux-kRPM'))
+
+        with patch(global_module_util_path + '.cohesity_download.open_url', server.open_url):
+            first, downloaded = cache.fetch('https://cohesity.lab/download')
+            second, downloaded_again = cache.fetch('https://cohesity.lab/download')
+
+        assert (downloaded, downloaded_again) == (True, False)
+        assert len(server.requests) == 1
+        assert first == second
+        assert second['size'] == len(PAYLOAD)
+        assert second['checksum'] == 'sha256:' + hashlib.sha256(PAYLOAD).hexdigest()
+        assert cache.clear() is True
+        assert cache.get() is None
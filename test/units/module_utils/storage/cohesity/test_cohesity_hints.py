@@ -0,0 +1,178 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+import shutil
+import tempfile
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_hints import get__protection_run__all, ReferenceCache, \
+        get__prot_policy_id__by_name, get__storage_domain_id__by_name, _reference_caches
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_hints import get__protection_run__all, ReferenceCache, \
+        get__prot_policy_id__by_name, get__storage_domain_id__by_name, _reference_caches
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+def protection_run(job_id, run_id, started, status="kSuccess", name="myjob"):
+    return dict(jobId=job_id, jobName=name, backupRun=dict(
+        jobRunId=run_id, status=status, stats=dict(startTimeUsecs=started)))
+
+
+class TestProtectionRuns(unittest.TestCase):
+    ''' Protection Run Paging Tests '''
+
+    def setUp(self):
+        self.patcher = patch(
+            global_module_util_path + '.cohesity_hints.get__cohesity_rest__session')
+        self.request = self.patcher.start().return_value.get
+        self.source_obj = dict(server="cohesity-api", token="mytoken",
+                               validate_certs=False, page_size=2)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def serve(self, runs):
+        ''' Answer each request with the newest numRuns runs of the job, newest first. '''
+        def get(uri, params=None):
+            matching = [run for run in runs if params.get('jobId') in (None, run['jobId'])]
+            return matching[:params['numRuns']]
+        self.request.side_effect = get
+
+    def test__get__protection_run__all__pages(self):
+        ''' Test that every run is returned once while numRuns grows. '''
+        self.serve([protection_run(1, 10, 500), protection_run(2, 20, 400),
+                    protection_run(1, 9, 300, name="_DELETED_myjob"), protection_run(1, 8, 200),
+                    protection_run(2, 19, 100)])
+        self.source_obj['is_deleted'] = False
+
+        runs = get__protection_run__all(self.source_obj)
+
+        assert [run['backupRun']['jobRunId'] for run in runs] == [10, 20, 8, 19]
+        assert [args[1]['params'] for args in self.request.call_args_list] == [
+            dict(numRuns=2), dict(numRuns=4), dict(numRuns=8)]
+
+    def test__get__protection_run__all__running_run(self):
+        ''' Test that a run started before a page boundary and still running is returned. '''
+        self.serve([protection_run(1, 10, 500), protection_run(1, 9, 400),
+                    protection_run(2, 20, 300, status="kRunning"), protection_run(1, 8, 300)])
+        self.source_obj['since'] = 100
+
+        runs = get__protection_run__all(self.source_obj)
+
+        assert [run['backupRun']['jobRunId'] for run in runs] == [10, 9, 20, 8]
+        assert self.request.call_args_list[0][1]['params'] == dict(numRuns=2, startTimeUsecs=100)
+
+    def test__get__protection_run__all__limit(self):
+        ''' Test that paging stops once run_limit matching runs are found. '''
+        self.serve([protection_run(1, 10, 500), protection_run(1, 9, 400, status="kAccepted"),
+                    protection_run(1, 8, 300, status="kAccepted"), protection_run(1, 7, 200)])
+        self.source_obj.update(dict(id=1, active_only=True, run_limit=1, since=100))
+
+        runs = get__protection_run__all(self.source_obj)
+
+        assert [run['backupRun']['jobRunId'] for run in runs] == [9]
+        self.assertEqual(1, self.request.call_count)
+        self.assertEqual(dict(numRuns=2, jobId=1, startTimeUsecs=100),
+                         self.request.call_args[1]['params'])
+
+    def test__get__protection_run__all__active_only(self):
+        ''' Test that the active runs of a job are found without walking its older history. '''
+        self.serve([protection_run(1, 10, 500, status="kRunning"), protection_run(1, 9, 400, status="kAccepted"),
+                    protection_run(1, 8, 300), protection_run(1, 7, 200),
+                    protection_run(1, 6, 100), protection_run(1, 5, 50),
+                    protection_run(1, 4, 40), protection_run(1, 3, 30)])
+        self.source_obj.update(dict(id=1, active_only=True))
+
+        runs = get__protection_run__all(self.source_obj)
+
+        assert [run['backupRun']['jobRunId'] for run in runs] == [10, 9]
+        self.assertEqual(2, self.request.call_count)
+
+    def test__get__protection_run__all__active_only__all_jobs(self):
+        ''' Test that without a job id an older active run behind finished runs is still found. '''
+        self.serve([protection_run(2, 20, 500), protection_run(3, 30, 400),
+                    protection_run(2, 19, 300), protection_run(1, 10, 200, status="kRunning"),
+                    protection_run(3, 29, 100)])
+        self.source_obj['active_only'] = True
+
+        runs = get__protection_run__all(self.source_obj)
+
+        assert [run['backupRun']['jobRunId'] for run in runs] == [10]
+        self.assertEqual(3, self.request.call_count)
+
+
+class TestReferenceCache(unittest.TestCase):
+    ''' Reference Data Memoization Tests '''
+
+    def setUp(self):
+        self.patcher = patch(
+            global_module_util_path + '.cohesity_hints.get__cohesity_rest__session')
+        self.request = self.patcher.start().return_value.get
+        self.path = tempfile.mkdtemp()
+        _reference_caches.clear()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.path)
+        _reference_caches.clear()
+
+    def test__get__prot_policy_id__by_name__memoized(self):
+        ''' Test that a policy is only looked up once per Cluster. '''
+        self.request.return_value = [dict(id="1:2:3", name="Bronze")]
+        module = FakeModule(cluster="cohesity-api", validate_certs=False)
+
+        for count in range(3):
+            policy_id = get__prot_policy_id__by_name(module, dict(token="mytoken", policyId="Bronze"))
+
+        assert policy_id == "1:2:3"
+        self.assertEqual(1, self.request.call_count)
+
+    def test__get__storage_domain_id__by_name__file_backend(self):
+        ''' Test that cached ids are shared through the file backend. '''
+        self.request.side_effect = [[], [dict(id=5, name="DefaultStorageDomain")]]
+        module = FakeModule(cluster="cohesity-api", validate_certs=False,
+                            reference_cache=True, reference_cache_path=self.path)
+
+        domain_id = get__storage_domain_id__by_name(
+            module, dict(token="mytoken", viewBoxId="DefaultStorageDomain"))
+        # => A new process starts with an empty memory cache.
+        _reference_caches.clear()
+        cached_id = get__storage_domain_id__by_name(
+            module, dict(token="mytoken", viewBoxId="DefaultStorageDomain"))
+
+        assert domain_id == cached_id == 5
+        self.assertEqual(2, self.request.call_count)
+
+    def test__reference_cache__ttl(self):
+        ''' Test that expired entries are looked up again. '''
+        cache = ReferenceCache(ttl=0, path=self.path)
+        cache.set("cohesity-api", "policy:Bronze", "1:2:3")
+
+        assert cache.get("cohesity-api", "policy:Bronze") is None
+        assert ReferenceCache(ttl=60, path=self.path).get("COHESITY-API", "policy:Bronze") == "1:2:3"
+        assert cache.memoize("cohesity-api", "policy:Gold", lambda: None) is None
+        assert cache.misses == 2
@@ -0,0 +1,88 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+import io
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_json_stream import load__json__fields, JsonStreamError
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_json_stream import load__json__fields, JsonStreamError
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+DOCUMENT = [{
+    "protectionSource": {
+        "id": 1, "name": "vcenter é", "environment": "kVMware",
+        "vmWareProtectionSource": {"type": "kVCenter", "tagAttributes": [{"id": 7}]},
+        "sizeBytes": 1.5e3, "escaped": "a\"b\\c"
+    },
+    "registrationInfo": {"accessInfo": {"endpoint": "vcenter.lab", "id": 9}, "minimumFreeSpace": None},
+    "protectedSourcesSummary": [{"leavesCount": -12, "totalLogicalSize": 0}],
+    "nodes": [
+        {"protectionSource": {"id": 2, "name": "vm1", "vmWareProtectionSource": {"type": "kVirtualMachine"}},
+         "isProtected": True, "nodes": []},
+        {"protectionSource": {"id": 3, "name": "vm2", "vmWareProtectionSource": {"type": "kVirtualMachine"}},
+         "isProtected": False}
+    ]
+}]
+
+
+def encode(document):
+    return io.BytesIO(json.dumps(document).encode('utf-8'))
+
+
+class TestJsonStream(unittest.TestCase):
+    ''' Streamed JSON Parser Tests '''
+
+    def test__load__json__fields__round_trip(self):
+        ''' Test that the full document is returned across every chunk boundary. '''
+        for chunk_size in [1, 2, 3, 7, 64, 65536]:
+            assert load__json__fields(encode(DOCUMENT), chunk_size=chunk_size) == DOCUMENT
+
+    def test__load__json__fields__pruned(self):
+        ''' Test that only the selected fields are kept, recursing through nodes. '''
+        spec = dict(protectionSource={'id': True, '*ProtectionSource': dict(type=True)})
+        spec['nodes'] = spec
+
+        data = load__json__fields(encode(DOCUMENT), spec, chunk_size=5)
+
+        assert data == [{
+            "protectionSource": {"id": 1, "vmWareProtectionSource": {"type": "kVCenter"}},
+            "nodes": [
+                {"protectionSource": {"id": 2, "vmWareProtectionSource": {"type": "kVirtualMachine"}},
+                 "nodes": []},
+                {"protectionSource": {"id": 3, "vmWareProtectionSource": {"type": "kVirtualMachine"}}}
+            ]
+        }]
+
+    def test__load__json__fields__invalid(self):
+        ''' Test that malformed and empty documents raise JsonStreamError. '''
+        with pytest.raises(JsonStreamError):
+            load__json__fields(io.BytesIO(b'[{"id": tru}]'))
+        with pytest.raises(JsonStreamError):
+            load__json__fields(io.BytesIO(b''))
@@ -0,0 +1,164 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_rest import CohesityRestSession, get__cohesity_rest__session
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_rest import CohesityRestSession, get__cohesity_rest__session
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class FakeResponse(object):
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.reason = 'OK' if status < 400 else 'Error'
+        self.body = body
+        self.headers = headers or []
+
+    def read(self, amt=None):
+        if amt is None:
+            return self.body
+        data, self.body = self.body[:amt], self.body[amt:]
+        return data
+
+    def getheaders(self):
+        return self.headers
+
+
+class TestCohesityRestSession(unittest.TestCase):
+    ''' Cohesity REST Session Tests '''
+
+    def setUp(self):
+        self.patcher = patch(
+            global_module_util_path + '.cohesity_rest.http_client.HTTPSConnection')
+        self.connection_class = self.patcher.start()
+        self.connection = self.connection_class.return_value
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test__get__reuses_connection(self):
+        ''' Test that multiple requests share a single connection. '''
+        self.connection.getresponse.return_value = FakeResponse(200, b'[{"id": 1}]')
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        session.get("/public/nodes")
+        data = session.get("/public/protectionJobs", params=dict(environments="kPhysical"))
+
+        assert data == [{"id": 1}]
+        self.assertEqual(1, self.connection_class.call_count)
+        self.assertEqual(2, session.request_count)
+        method, url, body, headers = self.connection.request.call_args[0]
+        self.assertEqual('GET', method)
+        self.assertEqual('/irisservices/api/v1/public/protectionJobs?environments=kPhysical', url)
+        self.assertEqual('Bearer mytoken', headers['Authorization'])
+
+    def test__post__encodes_json(self):
+        ''' Test that dictionaries are sent as JSON and empty responses return None. '''
+        self.connection.getresponse.return_value = FakeResponse(204, b'')
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        data = session.post("/irisservices/api/v1/public/protectionJobs/run/24", data=dict(runType="kRegular"))
+
+        assert data is None
+        method, url, body, headers = self.connection.request.call_args[0]
+        self.assertEqual('/irisservices/api/v1/public/protectionJobs/run/24', url)
+        self.assertEqual(b'{"runType": "kRegular"}', body)
+        self.assertEqual('application/json', headers['Content-Type'])
+
+    def test__error__raises_http_error(self):
+        ''' Test that failed requests raise a readable HTTPError. '''
+        self.connection.getresponse.return_value = FakeResponse(404, b'{"message": "Not Found"}')
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        with pytest.raises(urllib_error.HTTPError) as error:
+            session.get("/public/protectionJobs/99")
+
+        assert error.value.code == 404
+        assert json.loads(error.value.read())['message'] == "Not Found"
+
+    def test__expired_token__refresh_once(self):
+        ''' Test that a request rejected with Token expired is retried with a new token. '''
+        self.connection.getresponse.side_effect = [
+            FakeResponse(401, b'{"message": "Token expired"}'), FakeResponse(200, b'[]')]
+
+        refresh_patcher = patch(
+            global_module_util_path + '.cohesity_rest.refresh__cohesity_auth__token')
+        mock_refresh = refresh_patcher.start()
+        mock_refresh.return_value = 'mynewtoken'
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        data = session.get("/public/nodes")
+        refresh_patcher.stop()
+
+        assert data == []
+        assert session.token == 'mynewtoken'
+        assert 'mytoken' in session.expired_tokens
+        mock_refresh.assert_called_once_with("cohesity-api", "mytoken")
+
+    def test__stream__releases_connection(self):
+        ''' Test that a fully read stream returns its connection to the pool. '''
+        self.connection.getresponse.return_value = FakeResponse(200, b'[{"id": 1}, {"id": 2}]')
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        with session.stream("/public/protectionSources", params=dict(id=1)) as response:
+            chunks = [response.read(8) for count in range(4)]
+        session.get("/public/nodes")
+
+        assert b''.join(chunks) == b'[{"id": 1}, {"id": 2}]'
+        self.assertEqual(1, self.connection_class.call_count)
+        self.assertEqual(0, self.connection.close.call_count)
+        method, url, body, headers = self.connection.request.call_args_list[0][0]
+        self.assertEqual('/irisservices/api/v1/public/protectionSources?id=1', url)
+
+    def test__stream__closes_partial_response(self):
+        ''' Test that a stream closed before the end is not reused. '''
+        self.connection.getresponse.return_value = FakeResponse(200, b'[{"id": 1}, {"id": 2}]')
+
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+        with session.stream("/public/protectionSources") as response:
+            response.read(4)
+
+        self.assertEqual(1, self.connection.close.call_count)
+
+    def test__get__cohesity_rest__session__shared(self):
+        ''' Test that the session is shared per Cluster. '''
+        session = get__cohesity_rest__session("cohesity-shared", "mytoken", True)
+
+        assert get__cohesity_rest__session("cohesity-shared", "mytoken", True) is session
+        assert get__cohesity_rest__session("cohesity-shared", "mytoken", False) is not session
+
+    def test__url__query_parameters(self):
+        ''' Test that list values are repeated and booleans are lower case. '''
+        session = CohesityRestSession("cohesity-api", "mytoken", False)
+
+        url = session.url("/public/protectionJobs", params=dict(
+            names=["job1", "job2"], isDeleted=False, ids=None))
+
+        self.assertEqual(
+            '/irisservices/api/v1/public/protectionJobs?names=job1&names=job2&isDeleted=false', url)
@@ -0,0 +1,80 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+def vmware_node(source_id, name, source_type, nodes=None):
+    node = dict(protectionSource=dict(
+        id=source_id, name=name, environment="kVMware",
+        vmWareProtectionSource=dict(type=source_type)))
+    if nodes:
+        node['nodes'] = nodes
+    return node
+
+
+class TestSourceTreeIndex(unittest.TestCase):
+    ''' Protection Source Tree Index Tests '''
+
+    def setUp(self):
+        self.tree = [
+            vmware_node(1, "vcenter", "kVCenter", [
+                vmware_node(2, "datacenter", "kDatacenter", [
+                    vmware_node(3, "pool", "kResourcePool", [
+                        vmware_node(4, "vm1", "kVirtualMachine"),
+                        vmware_node(5, "vm2", "kVirtualMachine")
+                    ]),
+                    vmware_node(6, "datastore", "kDatastore"),
+                    vmware_node(7, "vm1", "kFolder")
+                ])
+            ])
+        ]
+        self.tree[0]['registrationInfo'] = dict(accessInfo=dict(endpoint="vcenter.lab"))
+
+    def test__get__ids(self):
+        ''' Test that many names are resolved from a single index. '''
+        index = SourceTreeIndex(self.tree)
+
+        assert sorted(index.get__ids(["vm1", "vm2", "missing"])) == [4, 5, 7]
+        assert index.get__ids(["vm1", "vm2"], "kVirtualMachine") == [4, 5]
+        assert index.get__id("pool", "kResourcePool") == 3
+        assert index.get__id("pool", "kDatastore") is None
+
+    def test__get__id__by_endpoint(self):
+        ''' Test endpoint and parent lookups. '''
+        index = SourceTreeIndex(self.tree)
+
+        assert index.get__id__by_endpoint("vcenter.lab") == 1
+        assert index.get__id__by_endpoint("vm2") is None
+        assert index.get__id__by_endpoint("vm2", match_name=True) == 5
+        assert index.get__parent(5)['name'] == "pool"
+        assert index.get__parent(1) is None
@@ -0,0 +1,116 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_task_tracker import RestoreTaskTracker, get__task__handle, get__task_ids__by_handles
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_task_tracker import RestoreTaskTracker, get__task__handle, get__task_ids__by_handles
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class FakeSession(object):
+    ''' Returns the next status of each requested task on every call. '''
+
+    def __init__(self, states):
+        self.states = states
+        self.calls = []
+
+    def get(self, uri, params=None):
+        self.calls.append(list(params['taskIds']))
+        tasks = []
+        for task_id in params['taskIds']:
+            if self.states.get(task_id):
+                tasks.append(dict(id=task_id, name="restore" + str(task_id), type="kRecoverVMs",
+                                  status=self.states[task_id].pop(0)))
+        return tasks
+
+
+class TestRestoreTaskTracker(unittest.TestCase):
+    ''' Restore Task Tracker Tests '''
+
+    def setUp(self):
+        self.sleep_patcher = patch(
+            global_module_util_path + '.cohesity_task_tracker.time.sleep')
+        self.mock_sleep = self.sleep_patcher.start()
+
+    def tearDown(self):
+        self.sleep_patcher.stop()
+
+    def test__poll__batches_task_ids(self):
+        ''' Test that all pending tasks are requested together in batches. '''
+        states = dict((task_id, ['kFinished']) for task_id in range(1, 151))
+        session = FakeSession(states)
+
+        tracker = RestoreTaskTracker(session, list(range(1, 151)) + [1])
+        finished = tracker.poll()
+
+        assert len(finished) == 150
+        assert [len(batch) for batch in session.calls] == [100, 50]
+        assert tracker.get__pending() == []
+
+    def test__wait__only_polls_pending_tasks(self):
+        ''' Test that finished tasks are dropped from later polls and status is per task. '''
+        session = FakeSession({
+            1: ['kInProgress', 'kFinished'],
+            2: ['kInProgress', 'kInProgress', 'kInProgress', 'kFinished']
+        })
+
+        tracker = RestoreTaskTracker(session, [1, 2, 3])
+        tasks = tracker.wait(600, interval=1, max_interval=30)
+
+        assert session.calls == [[1, 2, 3], [1, 2], [2], [2]]
+        assert [task['status'] for task in tasks] == ['Finished', 'Finished', 'NotFound']
+        assert [task['failed'] for task in tasks] == [False, False, True]
+        assert tracker.polls == 4
+        # => The delay resets when a task finishes and grows while none do.
+        delays = [args[0][0] for args in self.mock_sleep.call_args_list]
+        for delay, expected in zip(delays, [1, 1, 2]):
+            assert expected * 0.8 <= delay <= expected * 1.2
+
+    def test__wait__cancelled_task_is_terminal(self):
+        ''' Test that a cancelled task stops being polled and is reported as failed. '''
+        session = FakeSession({
+            1: ['kInProgress', 'kCancelled'],
+            2: ['kInProgress', 'kFinished']
+        })
+
+        tracker = RestoreTaskTracker(session, [1, 2])
+        tasks = tracker.wait(600, interval=1, max_interval=30)
+
+        assert session.calls == [[1, 2], [1, 2]]
+        assert [task['status'] for task in tasks] == ['Cancelled', 'Finished']
+        assert [task['done'] for task in tasks] == [True, True]
+        assert [task['failed'] for task in tasks] == [True, False]
+
+    def test__get__task_ids__by_handles(self):
+        ''' Test that handles are merged and rejected for another Cluster. '''
+        handles = [get__task__handle("cohesity.lab", [1, "2"]), get__task__handle("cohesity.lab", [3])]
+
+        assert get__task_ids__by_handles("cohesity.lab", handles) == [1, 2, 3]
+        with pytest.raises(ValueError):
+            get__task_ids__by_handles("other.lab", handles)
@@ -0,0 +1,88 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    sys_path.append(os_path.join(os_path.dirname(
+        __file__), '../../../../../module_utils'))
+    sys_path.append(os_path.join(os_path.dirname(__file__),
+                                 'helpers'))
+    from storage.cohesity.cohesity_utilities import wait__for__state
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'storage.cohesity'
+    from cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules_utils.storage.cohesity.cohesity_utilities import wait__for__state
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.module_utils.storage.cohesity.helpers.cohesity_helper import unittest, patch, call, json, \
+        urllib_error, StringIO, pytest, cohesity___reg_verify__helper, FakeModule
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class TestWaitForState(unittest.TestCase):
+    ''' Waiter Tests '''
+
+    def setUp(self):
+        self.sleep_patcher = patch(
+            global_module_util_path + '.cohesity_utilities.time.sleep')
+        self.mock_sleep = self.sleep_patcher.start()
+
+    def tearDown(self):
+        self.sleep_patcher.stop()
+
+    def test__wait__for__state__done(self):
+        ''' Test that the waiter stops as soon as a terminal state is seen. '''
+        states = iter(['kAccepted', 'kRunning', 'kFailure', 'kSuccess'])
+
+        def check():
+            status = next(states)
+            return status in ['kSuccess', 'kFailure'], status
+
+        waited = wait__for__state(check, 60, interval=1, max_interval=3, jitter=0)
+
+        assert waited['done'] is True
+        assert waited['value'] == 'kFailure'
+        assert waited['attempts'] == 3
+        self.assertEqual([call(1), call(2)], self.mock_sleep.call_args_list)
+
+    def test__wait__for__state__backoff(self):
+        ''' Test that the delay doubles up to the maximum interval with jitter. '''
+        checks = iter(range(6))
+
+        def check():
+            return next(checks) == 5, None
+
+        wait__for__state(check, 600, interval=1, max_interval=5, jitter=0.2)
+
+        delays = [args[0][0] for args in self.mock_sleep.call_args_list]
+        for delay, expected in zip(delays, [1, 2, 4, 5, 5]):
+            assert expected * 0.8 <= delay <= expected * 1.2
+
+    def test__wait__for__state__timeout(self):
+        ''' Test that the waiter gives up once the deadline has passed. '''
+        time_patcher = patch(
+            global_module_util_path + '.cohesity_utilities.time.time')
+        mock_time = time_patcher.start()
+        mock_time.side_effect = [0, 10, 20, 30, 40]
+
+        waited = wait__for__state(lambda: (False, 'kRunning'), 25, interval=1, jitter=0)
+        time_patcher.stop()
+
+        assert waited['done'] is False
+        assert waited['value'] == 'kRunning'
+        assert waited['attempts'] == 3
+        self.assertEqual([call(1), call(2)], self.mock_sleep.call_args_list)
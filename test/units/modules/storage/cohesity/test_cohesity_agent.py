@@ -144,3 +144,131 @@ class TestAgentInstallation(unittest.TestCase):
 
         assert changed is True
         assert message == "Successfully Removed the Cohesity agent"
+
+    def test__get__installer__from__installer_path(self):
+        import hashlib
+        import os
+        import tempfile
+        installer = tempfile.NamedTemporaryFile(delete=False)
+        installer.write(b'installer')
+        installer.close()
+        module = FakeModule(
+            installer_path=installer.name,
+            checksum="sha256:" + hashlib.sha256(b'installer').hexdigest()
+        )
+
+        assert cohesity_agent.get_installer(module, "/tmp") == installer.name
+
+        module.params['checksum'] = "sha256:" + "0" * 64
+        with pytest.raises(Exception) as error:
+            cohesity_agent.get_installer(module, "/tmp")
+        assert module.exit_kwargs['msg'] == "The Cohesity Agent installer does not match the checksum"
+        os.remove(installer.name)
+
+    def test__check__agent__orphaned_process(self):
+        ''' Test that an orphaned agent process which cannot be killed fails the check. '''
+        module = FakeModule()
+        with patch(global_module_path + '.cohesity_agent.get__agent__probe') as mock_probe, \
+                patch(global_module_path + '.cohesity_agent.os.path.exists') as mock_exists:
+            mock_exists.return_value = False
+            mock_probe.return_value.get__agent__path.return_value = None
+            mock_probe.return_value.kill__orphaned__processes.return_value = {101: "Operation not permitted"}
+            with pytest.raises(Exception):
+                cohesity_agent.check_agent(module, dict(changed=False))
+
+        assert module.exit_kwargs['process_id'] == 101
+        assert module.exit_kwargs['check_agent']['stderr'] == "Operation not permitted"
+
+    def test__is__manifest__current(self):
+        ''' Test that the manifest is compared with the checksum or the Cluster version. '''
+        manifest = dict(version='6.5.1d_release', cluster_version='6.5.1d_release', native_package=True,
+                        checksum='sha256:' + 'a' * 64)
+        module = FakeModule(native_package=True, checksum='')
+        with patch(global_module_path + '.cohesity_agent.get__agent__probe') as mock_probe:
+            mock_probe.return_value.get__agent__path.return_value = '/etc/init.d/cohesity-agent'
+            assert cohesity_agent.is_manifest_current(module, manifest, '6.5.1d_release') is True
+            assert cohesity_agent.is_manifest_current(module, manifest, '6.6.0_release') is False
+            assert cohesity_agent.is_manifest_current(module, manifest, '') is False
+            assert cohesity_agent.is_manifest_current(module, None, '6.5.1d_release') is False
+            module.params['checksum'] = 'A' * 64
+            assert cohesity_agent.is_manifest_current(module, manifest, None) is True
+            module.params['native_package'] = False
+            assert cohesity_agent.is_manifest_current(module, manifest, None) is False
+            # => The agent was removed outside of the module.
+            module.params['native_package'] = True
+            mock_probe.return_value.get__agent__path.return_value = None
+            assert cohesity_agent.is_manifest_current(module, manifest, None) is False
+
+
+class FakeAgentSession(object):
+    ''' Serves the next Physical Protection Source listing on every call. '''
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.streams = 0
+        self.posts = []
+
+    def stream(self, path, params=None):
+        from io import BytesIO
+        self.streams += 1
+        nodes = [dict(protectionSource=dict(
+            id=source_id, name=name, physicalProtectionSource=dict(agents=[dict(dict(
+                id=source_id + 1, version='6.4.1', status='kHealthy'), **agent)])))
+            for source_id, name, agent in self.listings.pop(0)]
+        return BytesIO(json.dumps([dict(nodes=nodes)]).encode('utf-8'))
+
+    def post(self, path, data=None):
+        self.posts.append(data)
+
+
+class TestAgentUpgrade(unittest.TestCase):
+
+    def setUp(self):
+        self.patchers = dict()
+
+        token_patcher = patch(
+            global_module_path + '.cohesity_agent.get__cohesity_auth__token')
+        token_patcher.start().return_value = 'mytoken'
+        self.patchers.update(token_patcher=token_patcher)
+
+        sleep_patcher = patch(
+            global_module_util_path + '.cohesity_agents.time.sleep')
+        sleep_patcher.start()
+        self.patchers.update(sleep_patcher=sleep_patcher)
+
+    def tearDown(self):
+        for patcher in self.patchers.values():
+            patcher.stop()
+
+    def test__update__agent__hosts(self):
+        ''' Test that many hosts are found, upgraded and polled together. '''
+        session = FakeAgentSession([
+            [(10, 'linux01', dict(upgradability='kUpgradable')),
+             (20, 'linux02', dict(upgradability='kUpgradable')),
+             (30, 'linux03', dict(upgradability='kCurrent'))],
+            [(10, 'linux01', dict(upgradability='kCurrent', upgradeStatus='kFinished', version='6.5.1')),
+             (20, 'linux02', dict(upgradability='kUpgradable', upgradeStatus='kFinished',
+                                  upgradeStatusMessage='No space left')),
+             (30, 'linux03', dict(upgradability='kCurrent'))]])
+        module = FakeModule(
+            cluster="cohesity.lab",
+            validate_certs=True,
+            host='',
+            hosts=['linux01', 'linux02', 'linux03', 'linux01'],
+            wait_minutes=30
+        )
+
+        with patch(global_module_path + '.cohesity_agent.get__cohesity_rest__session') as mock_session:
+            mock_session.return_value = session
+            with pytest.raises(Exception):
+                cohesity_agent.update_agent(module)
+
+        assert session.streams == 2
+        assert session.posts == [dict(agentIds=[11, 21])]
+        assert module.exit_kwargs['msg'] == "Failed to upgrade the agents of 1 of 3 hosts"
+        outcomes = module.exit_kwargs['hosts']
+        assert [outcome['host'] for outcome in outcomes] == ['linux01', 'linux02', 'linux03']
+        assert [outcome['changed'] for outcome in outcomes] == [True, True, False]
+        assert outcomes[0]['version'] == '6.5.1'
+        assert outcomes[1]['msg'] == "Failed to upgrade agent. No space left"
+        assert outcomes[2]['msg'] == "The host has the latest agent version"
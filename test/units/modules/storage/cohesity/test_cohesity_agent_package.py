@@ -0,0 +1,78 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# => Import native Python Modules
+import os
+import shutil
+import tempfile
+
+import pytest
+import unittest
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+
+# => Import Ansible Test Modules
+# => Due to the following change (https://github.com/ansible/ansible/pull/46996),
+# => We will need to provide the following Try..Except validation to provide for
+# => Backwards compatibility:
+# =>
+# => 2018-10-22
+try:
+    from ansible.compat.tests import unittest
+    from ansible.compat.tests.mock import call, create_autospec, patch
+except Exception as e:
+    # => With this change, we need to include the 'test' directory
+    # => in our path
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.compat import unittest
+    from units.compat.mock import call, create_autospec, patch
+
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    # => If we are testing within the role, then we should modify the
+    # => path to include this Role (assuming we are at the root.)
+    sys_path.append(os_path.realpath('.'))
+    from library import cohesity_agent_package
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'module_utils.storage.cohesity'
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules.storage.cohesity import cohesity_agent_package
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class TestAgentPackage(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test__remove__previous__versions(self):
+        ''' Test that only the same package of other Cluster versions is removed. '''
+        cluster_dir = os.path.join(self.path, 'cohesity.lab')
+        for version, package in [('6.5.1d', 'kLinux-kRPM'), ('6.6.0', 'kLinux-kRPM'),
+                                 ('6.6.0', 'kLinux-kDEB'), ('6.7.0', 'kLinux-kRPM')]:
+            os.makedirs(os.path.join(cluster_dir, version, package))
+            open(os.path.join(cluster_dir, version, package + '.lock'), 'w').close()
+
+        removed = cohesity_agent_package.remove__previous__versions(
+            os.path.join(cluster_dir, '6.7.0', 'kLinux-kRPM'))
+
+        assert sorted(removed) == [os.path.join(cluster_dir, '6.5.1d', 'kLinux-kRPM'),
+                                   os.path.join(cluster_dir, '6.6.0', 'kLinux-kRPM')]
+        assert sorted(os.listdir(cluster_dir)) == ['6.6.0', '6.7.0']
+        assert sorted(os.listdir(os.path.join(cluster_dir, '6.6.0'))) == ['kLinux-kDEB', 'kLinux-kDEB.lock']
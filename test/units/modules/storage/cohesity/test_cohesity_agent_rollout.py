@@ -0,0 +1,71 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# => Import native Python Modules
+import pytest
+import unittest
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+
+# => Import Ansible Test Modules
+# => Due to the following change (https://github.com/ansible/ansible/pull/46996),
+# => We will need to provide the following Try..Except validation to provide for
+# => Backwards compatibility:
+# =>
+# => 2018-10-22
+try:
+    from ansible.compat.tests import unittest
+    from ansible.compat.tests.mock import call, create_autospec, patch
+except Exception as e:
+    # => With this change, we need to include the 'test' directory
+    # => in our path
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.compat import unittest
+    from units.compat.mock import call, create_autospec, patch
+
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    # => If we are testing within the role, then we should modify the
+    # => path to include this Role (assuming we are at the root.)
+    sys_path.append(os_path.realpath('.'))
+    from library import cohesity_agent_rollout
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'module_utils.storage.cohesity'
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules.storage.cohesity import cohesity_agent_rollout
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+class TestAgentRollout(unittest.TestCase):
+
+    def test__get__rollout__waves(self):
+        ''' Test that the waves are cumulative and never empty. '''
+        hosts = ['host' + str(index) for index in range(40)]
+
+        waves = cohesity_agent_rollout.get__rollout__waves(hosts, [5, 25, 100])
+
+        assert [len(wave) for wave in waves] == [2, 8, 30]
+        assert sum(waves, []) == hosts
+        assert cohesity_agent_rollout.get__rollout__waves(hosts[:3], [5, 25, 100]) == \
+            [['host0'], ['host1'], ['host2']]
+        assert cohesity_agent_rollout.get__rollout__waves(hosts[:3], [1, 2]) == [['host0'], ['host1']]
+        assert cohesity_agent_rollout.get__rollout__waves([], [5, 100]) == []
+
+    def test__get__failure__rate(self):
+        statuses = [dict(failed=False), dict(failed=True), dict(failed=False), dict(failed=False)]
+
+        assert cohesity_agent_rollout.get__failure__rate(statuses) == 25.0
+        assert cohesity_agent_rollout.get__failure__rate([]) == 0.0
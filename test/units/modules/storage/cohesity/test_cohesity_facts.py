@@ -6,6 +6,8 @@ __metaclass__ = type
 import pytest
 import unittest
 import json
+import threading
+import time
 
 # # NOTE: Required to find the location of the modules when testing
 from sys import path as sys_path
@@ -166,3 +168,109 @@ class TestNodeFacts(unittest.TestCase):
 
         assert changed is False
         assert nodes == []
+
+
+class TestConcurrentFacts(unittest.TestCase):
+
+    def test__run__concurrent__requests(self):
+        ''' Test that each request reports its own result, error and timing. '''
+
+        def fetch(value):
+            if value is None:
+                raise Exception("Not Found")
+            return value
+
+        outcomes = cohesity_facts.run__concurrent__requests([
+            ('cluster', fetch, ["cluster01"]),
+            ('nodes', fetch, [None])
+        ], 2)
+
+        assert outcomes['cluster']['result'] == "cluster01"
+        assert outcomes['cluster']['error'] is None
+        assert outcomes['nodes']['result'] is None
+        assert outcomes['nodes']['error'] == "Not Found"
+        assert outcomes['nodes']['elapsed'] >= 0
+
+    def test__run__concurrent__requests__bounded(self):
+        ''' Test that no more than max_parallel_requests run at the same time. '''
+        lock = threading.Lock()
+        state = dict(active=0, peak=0)
+
+        def fetch(value):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+            return value
+
+        outcomes = cohesity_facts.run__concurrent__requests(
+            [(str(value), fetch, [value]) for value in range(9)], 3)
+
+        assert len(outcomes) == 9
+        assert state['peak'] == 3
+        assert [outcomes[str(value)]['result'] for value in range(9)] == list(range(9))
+
+
+class TestFactsProjection(unittest.TestCase):
+
+    def test__summarize__objects(self):
+        ''' Test that jobs are reduced to the id, name, environment and last run status. '''
+        jobs = [{"id": 24, "name": "myhost", "environment": "kPhysical", "policyId": "1:2:3",
+                 "lastRun": {"backupRun": {"status": "kSuccess"}}}]
+
+        summary = cohesity_facts.summarize__objects(jobs, 'jobs')
+
+        assert summary == [{"id": 24, "name": "myhost", "environment": "Physical",
+                            "last_run_status": "Success"}]
+
+    def test__summarize__sources(self):
+        ''' Test that Physical sources are read from below the root node. '''
+        sources = {"protectionSource": {"id": 1, "name": "kPhysical"}, "nodes": [
+            {"protectionSource": {"id": 2, "name": "myhost", "environment": "kPhysical"}}]}
+
+        summary = cohesity_facts.summarize__sources(sources)
+
+        assert summary == [{"id": 2, "name": "myhost", "environment": "Physical",
+                            "last_run_status": None}]
+
+    def test__project__fields(self):
+        ''' Test that include and exclude lists are applied to each object. '''
+        objects = [{"id": 1, "name": "job1", "policyId": "1:2:3"}]
+
+        assert cohesity_facts.project__fields(objects, ["id", "name"]) == [{"id": 1, "name": "job1"}]
+        assert cohesity_facts.project__fields(objects, None, ["policyId"]) == [{"id": 1, "name": "job1"}]
+        assert cohesity_facts.project__fields(objects) == objects
+
+
+class TestFactsSnapshot(unittest.TestCase):
+
+    def test__diff__objects(self):
+        ''' Test that objects are reported as added, changed and removed. '''
+        previous = {"1": "100", "2": "200", "3": "300"}
+        items = [("1", {"id": 1, "modificationTimeUsecs": 100}),
+                 ("2", {"id": 2, "modificationTimeUsecs": 250}),
+                 ("4", {"id": 4, "modificationTimeUsecs": 400})]
+
+        delta, fingerprints = cohesity_facts.diff__objects(previous, items)
+
+        assert delta['added'] == [{"id": 4, "modificationTimeUsecs": 400}]
+        assert delta['changed'] == [{"id": 2, "modificationTimeUsecs": 250}]
+        assert delta['removed'] == ["3"]
+        assert fingerprints == {"1": "100", "2": "250", "4": "400"}
+
+    def test__diff__protection_runs(self):
+        ''' Test that the cursor stays on the oldest active run. '''
+        def run(run_id, started, status):
+            return {"jobId": 24, "backupRun": {"jobRunId": run_id, "status": status,
+                                               "stats": {"startTimeUsecs": started}}}
+        previous = dict(cursor=100, seen={"24:1": [100, "kRunning", 0]})
+
+        delta, runs = cohesity_facts.diff__protection_runs(previous, [
+            run(3, 300, "kRunning"), run(2, 200, "kSuccess"), run(1, 100, "kSuccess")])
+
+        assert [item['backupRun']['jobRunId'] for item in delta['added']] == [3, 2]
+        assert [item['backupRun']['jobRunId'] for item in delta['changed']] == [1]
+        assert runs['cursor'] == 300
+        assert list(runs['seen'].keys()) == ["24:3"]
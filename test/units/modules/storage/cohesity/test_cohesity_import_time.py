@@ -0,0 +1,65 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# => Import native Python Modules
+import glob
+import os
+import subprocess
+import sys
+
+import pytest
+
+# => Root of the Role, which holds the library directory.
+ROLE_PATH = os.path.realpath(os.path.join(os.path.dirname(__file__), '../../../../..'))
+LIBRARY_MODULES = sorted(
+    os.path.basename(filename)[:-3] for filename in glob.glob(os.path.join(ROLE_PATH, 'library', 'cohesity_*.py')))
+
+# => Parts of the cohesity_management_sdk which cost hundreds of milliseconds to
+# => import and must only be loaded by the code paths which use them.
+SDK_DEFERRED_PACKAGES = (
+    'cohesity_management_sdk.cohesity_client',
+    'cohesity_management_sdk.controllers',
+    'cohesity_management_sdk.models',
+)
+# => Microseconds the SDK may add to the import of a module.
+SDK_IMPORT_BUDGET = 50000
+
+
+def get__import__times(module_name):
+    '''
+    Import a module in a new Python process with `-X importtime` and return the
+    time, in microseconds, spent importing each module it loaded, excluding the
+    modules that one imported in turn.
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROLE_PATH, env.get('PYTHONPATH')]))
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', 'import library.' + module_name],
+                               cwd=ROLE_PATH, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = process.communicate()[1].decode('utf-8', 'replace')
+    assert process.returncode == 0, stderr
+
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        if not self_time.strip().isdigit():
+            continue
+        times[name.strip()] = int(self_time)
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime requires Python 3.7")
+@pytest.mark.parametrize('module_name', LIBRARY_MODULES)
+def test__import__defers_cohesity_sdk(module_name):
+    pytest.importorskip('cohesity_management_sdk')
+    times = get__import__times(module_name)
+
+    assert 'library.' + module_name in times
+    deferred = [name for name in times if name.startswith(SDK_DEFERRED_PACKAGES)]
+    assert deferred == [], "library." + module_name + " imports " + ", ".join(sorted(deferred))
+
+    sdk_time = sum(time for name, time in times.items() if name.startswith('cohesity_management_sdk'))
+    assert sdk_time < SDK_IMPORT_BUDGET, \
+        "library." + module_name + " spends " + str(sdk_time) + "us importing cohesity_management_sdk"
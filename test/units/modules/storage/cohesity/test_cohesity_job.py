@@ -208,14 +208,11 @@ class TestProtectionSource__Methods(unittest.TestCase):
 
         # =>
         self.patcher = patch(
-            global_module_path + '.cohesity_job.open_url')
+            global_module_util_path + '.cohesity_rest.CohesityRestSession.request')
         mock_check = self.patcher.start()
-        check_var = mock_check.return_value
 
-        # =>
-        check_var.read.return_value = ''
-        check_var.getcode.return_value = 204
-        mock_check.return_value = check_var
+        # => The cancel request returns a 204 without any data.
+        mock_check.return_value = None
 
         data = dict(
             token='mytoken',
@@ -254,14 +251,11 @@ class TestProtectionSource__Methods(unittest.TestCase):
 
         # =>
         self.patcher = patch(
-            global_module_path + '.cohesity_job.open_url')
+            global_module_util_path + '.cohesity_rest.CohesityRestSession.request')
         mock_check = self.patcher.start()
-        check_var = mock_check.return_value
 
-        # =>
-        check_var.read.return_value = ''
-        check_var.getcode.return_value = 204
-        mock_check.return_value = check_var
+        # => The cancel request returns a 204 without any data.
+        mock_check.return_value = None
 
         data = dict(
             token='mytoken',
@@ -366,10 +360,10 @@ class TestProtectionSource__Main(ModuleTestCase):
         mock_check.return_value = False
 
         prot_source_patcher = patch(
-            global_module_path + '.cohesity_job.get__prot_source_id__by_endpoint')
+            global_module_path + '.cohesity_job.get__prot_source_ids__by_endpoints')
         mock_check = prot_source_patcher.start()
         patch_list.update(prot_source_patcher=prot_source_patcher)
-        mock_check.return_value = 1
+        mock_check.side_effect = lambda module, self, endpoints: [1 for endpoint in endpoints]
 
         prot_root_patcher = patch(
             global_module_path + '.cohesity_job.get__prot_source_root_id__by_environment')
@@ -555,3 +549,78 @@ class TestProtectionSource__Main(ModuleTestCase):
         self.assertEqual(result['changed'], True, result)
         self.assertEqual(
             result['msg'], 'The Protection Job for this host has been stopped', result)
+
+
+class TestVMwareSourceTree(unittest.TestCase):
+
+    def test__get_vmware_ids__single_download(self):
+        ''' Test that include, exclude and tag lookups share one source tree download. '''
+        tree = [{"protectionSource": {"id": 1, "name": "vcenter", "vmWareProtectionSource": {"type": "kVCenter"}},
+                 "nodes": [
+                     {"protectionSource": {"id": 2, "name": "vm1", "vmWareProtectionSource": {"type": "kVirtualMachine"}}},
+                     {"protectionSource": {"id": 3, "name": "vm2", "vmWareProtectionSource": {"type": "kVirtualMachine"}}},
+                     {"protectionSource": {"id": 4, "name": "gold", "vmWareProtectionSource": {"type": "kTag"}}}]}]
+        session_patcher = patch(
+            global_module_path + '.cohesity_job.get__cohesity_rest__session')
+        session_patcher.start()
+        tree_patcher = patch(
+            global_module_path + '.cohesity_job.load__source_tree')
+        mock_tree = tree_patcher.start()
+        mock_tree.return_value = tree
+        cohesity_job._source_trees.clear()
+
+        module = FakeModule(cluster="cohesity.lab", validate_certs=True)
+        job_meta_data = dict(parentSourceId=1)
+        job_details = dict(token="mytoken")
+
+        assert cohesity_job.get_vmware_ids(module, job_meta_data, job_details, ["vm1"]) == [2]
+        assert cohesity_job.get_vmware_ids(module, job_meta_data, job_details, ["vm2"]) == [3]
+        assert cohesity_job._get_tag_ids(module, ["gold"], 1, "mytoken") == [4]
+        self.assertEqual(1, mock_tree.call_count)
+        self.assertEqual(1, len(cohesity_job._source_trees))
+        tree_patcher.stop()
+        session_patcher.stop()
+        cohesity_job._source_trees.clear()
+
+
+class TestJobStateTransition(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep_patcher = patch(
+            global_module_util_path + '.cohesity_utilities.time.sleep')
+        self.sleep_patcher.start()
+        self.run_patcher = patch(
+            global_module_path + '.cohesity_job.get__protection_run__all__by_id')
+        self.mock_runs = self.run_patcher.start()
+
+    def tearDown(self):
+        self.run_patcher.stop()
+        self.sleep_patcher.stop()
+
+    def test__wait__for_job_state__transition__start(self):
+        ''' Test that only the latest run is polled until a new run appears. '''
+        def run(run_id, status):
+            return [dict(jobId=24, backupRun=dict(jobRunId=run_id, status=status))]
+        self.mock_runs.side_effect = [run(750, 'kSuccess'), run(750, 'kSuccess'), run(751, 'kFailure')]
+        module = FakeModule(cluster="cohesity.lab", validate_certs=True, wait_minutes=1)
+
+        cohesity_job.wait__for_job_state__transition(
+            module, dict(token='mytoken', id=24), [750], state='start')
+
+        self.assertEqual(3, self.mock_runs.call_count)
+        payload = self.mock_runs.call_args[0][1]
+        assert payload['run_limit'] == 1
+        assert payload['active_only'] is False
+
+    def test__wait__for_job_state__transition__stop_timeout(self):
+        ''' Test that the module fails when the run is still active at the deadline. '''
+        self.mock_runs.return_value = [dict(jobId=24, backupRun=dict(jobRunId=751, status='kRunning'))]
+        module = FakeModule(cluster="cohesity.lab", validate_certs=True, wait_minutes=0)
+
+        with pytest.raises(Exception) as error:
+            cohesity_job.wait__for_job_state__transition(
+                module, dict(token='mytoken', id=24), [751], state='stop')
+
+        assert str(error.value) == 'FAIL'
+        assert module.exit_kwargs['status'] == 'kRunning'
+        assert module.exit_kwargs['attempts'] == 1
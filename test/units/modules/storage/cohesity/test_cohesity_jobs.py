@@ -0,0 +1,147 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# => Import native Python Modules
+import pytest
+import unittest
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+
+# => Import Ansible Test Modules
+# => Due to the following change (https://github.com/ansible/ansible/pull/46996),
+# => We will need to provide the following Try..Except validation to provide for
+# => Backwards compatibility:
+# =>
+# => 2018-10-22
+try:
+    from ansible.compat.tests import unittest
+    from ansible.compat.tests.mock import call, create_autospec, patch
+except Exception as e:
+    # => With this change, we need to include the 'test' directory
+    # => in our path
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.compat import unittest
+    from units.compat.mock import call, create_autospec, patch
+
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    # => If we are testing within the role, then we should modify the
+    # => path to include this Role (assuming we are at the root.)
+    sys_path.append(os_path.realpath('.'))
+    from library import cohesity_jobs
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'module_utils.storage.cohesity'
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules.storage.cohesity import cohesity_jobs
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+def get__references(jobs=None):
+    physical = SourceTreeIndex([{
+        "protectionSource": {"id": 1, "name": "kPhysical", "environment": "kPhysical"},
+        "nodes": [
+            {"protectionSource": {"id": 11, "name": "host1", "environment": "kPhysical"},
+             "registrationInfo": {"accessInfo": {"endpoint": "host1.lab"}}},
+            {"protectionSource": {"id": 12, "name": "host2", "environment": "kPhysical"},
+             "registrationInfo": {"accessInfo": {"endpoint": "host2.lab"}}}
+        ]}])
+    return dict(
+        jobs=dict((job['name'], job) for job in jobs or []),
+        policies={"Bronze": "1:2:3", "1:2:3": "1:2:3"},
+        storage_domains={"DefaultStorageDomain": 5, "5": 5},
+        roots={"Physical": 1},
+        sources={"Physical": physical}
+    )
+
+
+class TestJobsPlan(unittest.TestCase):
+
+    def test__get__job__specs(self):
+        ''' Test that defaults and aliases are applied and invalid jobs are reported. '''
+        specs, errors = cohesity_jobs.get__job__specs([
+            {"job_name": "job1", "sources": ["host1.lab"]},
+            {"name": "job1", "environment": "Oracle"}
+        ])
+
+        assert specs[0]['name'] == "job1"
+        assert specs[0]['protection_policy'] == "Bronze"
+        assert specs[0]['protection_sources'] == [{"endpoint": "host1.lab"}]
+        assert errors == ["The job job1 is listed more than once",
+                          "Invalid environment (Oracle) for job job1"]
+
+    def test__get__job__plan(self):
+        ''' Test that only the missing, changed and removed jobs have requests. '''
+        jobs = [
+            {"id": 21, "name": "job2", "environment": "kPhysicalFiles", "sourceIds": [11],
+             "sourceSpecialParameters": [{"sourceId": 11}]},
+            {"id": 22, "name": "job3", "environment": "kPhysical", "sourceIds": [11]},
+            {"id": 23, "name": "job4", "environment": "kPhysical", "sourceIds": [12]}
+        ]
+        specs, errors = cohesity_jobs.get__job__specs([
+            {"name": "job1", "environment": "Physical", "sources": ["host1.lab"], "start_time": "02:30"},
+            {"name": "job2", "sources": [{"endpoint": "host2", "paths": [{"includeFilePath": "C:\\Users"}]}]},
+            {"name": "job3", "environment": "Physical", "sources": ["host1.lab"]},
+            {"name": "job4", "state": "absent", "delete_backups": True},
+            {"name": "job5", "state": "absent"}
+        ])
+
+        actions, errors = cohesity_jobs.get__job__plan(specs, get__references(jobs))
+
+        assert errors == []
+        assert [action['action'] for action in actions] == ['create', 'update', 'none', 'delete', 'none']
+        assert actions[0]['payload']['sourceIds'] == [11]
+        assert actions[0]['payload']['parentSourceId'] == 1
+        assert actions[0]['payload']['startTime'] == {"hour": 2, "minute": 30}
+        assert actions[1]['path'] == "/public/protectionJobs/21"
+        assert actions[1]['payload']['sourceIds'] == [11, 12]
+        assert actions[1]['payload']['sourceSpecialParameters'][1] == {
+            "sourceId": 12, "physicalSpecialParameters": {"filePaths": [
+                {"backupFilePath": "/C/Users", "excludedFilePaths": [], "skipNestedVolumes": True}]}}
+        assert actions[3]['payload'] == {"deleteSnapshots": True}
+
+    def test__get__job__plan__unknown_references(self):
+        ''' Test that unknown sources, policies and storage domains are reported together. '''
+        specs, errors = cohesity_jobs.get__job__specs([
+            {"name": "job1", "sources": ["missing.lab"]},
+            {"name": "job2", "sources": ["host1.lab"], "policy": "Gold", "storage_domain": "Other"}
+        ])
+
+        actions, errors = cohesity_jobs.get__job__plan(specs, get__references())
+
+        assert errors == [
+            "The source missing.lab for job job1 is not registered",
+            "The policy Gold for job job2 does not exist",
+            "The storage domain Other for job job2 does not exist"
+        ]
+        assert [action['method'] for action in actions] == [None, None]
+
+    def test__get__job__plan__duplicate_sources(self):
+        ''' Test that a source listed twice, by endpoint or by name, is protected once. '''
+        specs, errors = cohesity_jobs.get__job__specs([
+            {"name": "job1", "environment": "Physical", "sources": ["host1.lab", "host1.lab", "host1"]},
+            {"name": "job2", "sources": [{"endpoint": "host2", "paths": [{"includeFilePath": "/home"}]},
+                                         {"endpoint": "host2", "paths": [{"includeFilePath": "/etc"}]}]}
+        ])
+
+        actions, errors = cohesity_jobs.get__job__plan(specs, get__references())
+
+        assert errors == []
+        assert [action['action'] for action in actions] == ['create', 'create']
+        assert actions[0]['payload']['sourceIds'] == [11]
+        assert [path['backupFilePath'] for path in actions[1]['payload']['sourceSpecialParameters'][0][
+            'physicalSpecialParameters']['filePaths']] == ['/home', '/etc']
@@ -163,15 +163,12 @@ class TestProtectionSource__Methods(unittest.TestCase):
         mock_check.return_value = json.loads(source_list)
 
         self.patch_url = patch(
-            global_module_util_path + '.cohesity_hints.open_url')
-        self.open_url = self.patch_url.start()
+            global_module_util_path + '.cohesity_rest.CohesityRestSession.request')
+        self.request = self.patch_url.start()
 
         # =>
-        stream = self.open_url.return_value
-        stream.read.return_value = '[{"snapshot":{"jobRunId": "123","startedTimeUsecs": "1541603218"}}]'
-        stream.getcode.return_value = 200
-        self.open_url.return_value = stream
-        mockData = json.loads(stream.read.return_value)
+        self.request.return_value = json.loads(
+            '[{"snapshot":{"jobRunId": "123","startedTimeUsecs": "1541603218"}}]')
 
         data = dict(
             token='mytoken',
@@ -182,7 +179,7 @@ class TestProtectionSource__Methods(unittest.TestCase):
 
         return_id = cohesity_restore.get__snapshot_information__for_file(module, data)
 
-        self.assertEqual(1, self.open_url.call_count)
+        self.assertEqual(1, self.request.call_count)
         assert return_id['jobRunId'] == "123"
         assert return_id['startedTimeUsecs'] == "1541603218"
         assert return_id['jobUid']['id'] == 24
@@ -359,14 +356,10 @@ class TestProtectionSource__Methods(unittest.TestCase):
         # =>
 
         self.patcher = patch(
-            global_module_path + '.cohesity_restore.open_url')
-        self.open_url = self.patcher.start()
+            global_module_util_path + '.cohesity_rest.CohesityRestSession.request')
+        self.request = self.patcher.start()
         # =>
-        stream = self.open_url.return_value
-        stream.read.return_value = restore_job
-        stream.getcode.return_value = 201
-        self.open_url.return_value = stream
-        mockData = json.loads(stream.read.return_value)
+        self.request.return_value = json.loads(restore_job)
 
         data = dict(
             token='mytoken',
@@ -489,15 +482,11 @@ class TestProtectionSource__Main(ModuleTestCase):
         patch_list.pop('start_check_patcher')
 
         self.patch_url = patch(
-            global_module_util_path + '.cohesity_hints.open_url')
-        self.open_url = self.patch_url.start()
+            global_module_util_path + '.cohesity_rest.CohesityRestSession.request')
+        self.request = self.patch_url.start()
 
         # =>
-        stream = self.open_url.return_value
-        stream.read.return_value = restore_job
-        stream.getcode.return_value = 200
-        self.open_url.return_value = stream
-        mockData = json.loads(stream.read.return_value)
+        self.request.return_value = json.loads(restore_job)
 
         with self.assertRaises(AnsibleExitJson) as exc:
             cohesity_restore.main()
@@ -0,0 +1,139 @@
+# Make coding more python3-ish
+from __future__ import (absolute_import, division)
+__metaclass__ = type
+
+# => Import native Python Modules
+import pytest
+import unittest
+
+# # NOTE: Required to find the location of the modules when testing
+from sys import path as sys_path
+from os import path as os_path
+from os import environ
+
+
+# => Import Ansible Test Modules
+# => Due to the following change (https://github.com/ansible/ansible/pull/46996),
+# => We will need to provide the following Try..Except validation to provide for
+# => Backwards compatibility:
+# =>
+# => 2018-10-22
+try:
+    from ansible.compat.tests import unittest
+    from ansible.compat.tests.mock import call, create_autospec, patch
+except Exception as e:
+    # => With this change, we need to include the 'test' directory
+    # => in our path
+    sys_path.append(os_path.join(environ['PYTHONPATH'], '../test'))
+    from units.compat import unittest
+    from units.compat.mock import call, create_autospec, patch
+
+
+# => Import Cohesity Modules and Helpers
+
+current_path = sys_path
+try:
+    # => If we are testing within the role, then we should modify the
+    # => path to include this Role (assuming we are at the root.)
+    sys_path.append(os_path.realpath('.'))
+    from library import cohesity_sources
+    from module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'library'
+    global_module_util_path = 'module_utils.storage.cohesity'
+except Exception as e:
+    # => Reset the correct path Location
+    sys_path = current_path
+    from ansible.modules.storage.cohesity import cohesity_sources
+    from ansible.module_utils.storage.cohesity.cohesity_source_tree import SourceTreeIndex
+    # => Set the default Module and ModuleUtility Paths
+    global_module_path = 'ansible.modules.storage.cohesity'
+    global_module_util_path = 'ansible.module_utils.storage.cohesity'
+
+
+def get__params(**kwargs):
+    params = dict(state='present', environment='Physical', host_type='Linux', physical_type='Host',
+                  force_register=False, vmware_type='VCenter', source_username='', source_password='',
+                  nas_protocol='NFS', nas_username='', nas_password='', nas_type='Host',
+                  skip_validation=False)
+    params.update(kwargs)
+    return params
+
+
+def get__indexes():
+    physical = SourceTreeIndex([{
+        "protectionSource": {"id": 1, "name": "kPhysical", "environment": "kPhysical"},
+        "nodes": [
+            {"protectionSource": {"id": 11, "name": "host1.lab", "environment": "kPhysical"}},
+            {"protectionSource": {"id": 12, "name": "host2.lab", "environment": "kPhysical"}}
+        ]}])
+    nas = SourceTreeIndex([])
+    return dict(Physical=physical, GenericNas=nas)
+
+
+class TestSourcesPlan(unittest.TestCase):
+
+    def test__get__source__specs(self):
+        ''' Test that the module options apply to each source unless overridden. '''
+        specs, errors = cohesity_sources.get__source__specs(get__params(
+            host_type='Windows',
+            sources=["host1.lab", {"hostname": "host2.lab", "host_type": "Linux"},
+                     {"endpoint": "host1.lab"}, {"endpoint": "//nas/share", "environment": "GenericNas",
+                                                 "nas_protocol": "SMB"}]))
+
+        assert [spec['host_type'] for spec in specs] == ['Windows', 'Linux', 'Windows', 'Windows']
+        assert specs[1]['endpoint'] == "host2.lab"
+        assert errors == ["The source host1.lab is listed more than once",
+                          "The nas_username and nas_password are mandatory for source //nas/share"]
+
+    def test__get__source__specs__rejects_secrets(self):
+        ''' Test that passwords are only taken from the options hidden from the logs. '''
+        sources = [{"endpoint": "vcenter.lab", "environment": "VMware", "source_password": "secret1"},
+                   {"endpoint": "//nas/share", "environment": "GenericNas", "nas_password": "secret2"},
+                   "host1.lab"]
+
+        specs, errors = cohesity_sources.get__source__specs(get__params(sources=sources))
+
+        assert errors == ["The source_password of source vcenter.lab must be set with the source_password "
+                          "option, which is not logged",
+                          "The nas_password of source //nas/share must be set with the nas_password "
+                          "option, which is not logged"]
+        assert [spec['source_password'] for spec in specs] == ['', '', '']
+        assert cohesity_sources.get__source__secrets(sources) == set(['secret1', 'secret2'])
+
+    def test__get__source__plan(self):
+        ''' Test that only missing sources are registered and registered sources removed. '''
+        specs, errors = cohesity_sources.get__source__specs(get__params(sources=[
+            "host1.lab", "host3.lab", {"endpoint": "host2.lab", "state": "absent"},
+            {"endpoint": "host4.lab", "state": "absent"},
+            {"endpoint": "nas:/export", "environment": "GenericNas"}]))
+
+        actions = cohesity_sources.get__source__plan(specs, get__indexes())
+
+        assert errors == []
+        assert [action['action'] for action in actions] == [
+            'none', 'register', 'unregister', 'none', 'register']
+        assert actions[0]['id'] == 11
+        assert actions[1]['payload'] == {"endpoint": "host3.lab", "environment": "kPhysical",
+                                         "forceRegister": False, "hostType": "kLinux",
+                                         "physicalType": "kHost"}
+        assert actions[2]['path'] == "/public/protectionSources/12"
+        assert actions[4]['payload']['nasMountCredentials'] == {
+            "nasProtocol": "kNfs3", "nasType": "kHost", "skipValidation": False}
+
+    def test__apply__source__plan(self):
+        ''' Test that each request reports its own outcome. '''
+        class FakeSession(object):
+            def post(self, path, data):
+                if data['endpoint'] == "bad.lab":
+                    raise Exception("Unable to connect")
+                return {"id": 30}
+
+        specs, errors = cohesity_sources.get__source__specs(get__params(sources=["good.lab", "bad.lab"]))
+        actions = cohesity_sources.get__source__plan(specs, get__indexes())
+
+        requests = cohesity_sources.apply__source__plan(FakeSession(), actions, 2)
+
+        assert requests == 2
+        assert [(action['id'], action['error']) for action in actions] == [
+            (30, None), (None, "Unable to connect")]
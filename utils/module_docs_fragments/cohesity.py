@@ -39,6 +39,36 @@ options:
       - Switch determines if SSL Validation should be enabled.
     type: bool
     default: False
+  token_cache:
+    description:
+      - Switch determines if the Bearer Token should be cached on the node running the module and
+      - shared with other tasks and forks connecting to the same Cluster with the same credentials.
+      - Cached tokens are reused until they expire (24 hours) or the Cluster reports them as expired.
+    type: bool
+    default: False
+  token_cache_path:
+    description:
+      - Directory used to store the cached Bearer Tokens when I(token_cache=True).  The directory is
+      - created with permissions restricted to the current user.
+    type: path
+    default: ~/.ansible/cohesity/tokens
+  reference_cache:
+    description:
+      - Switch determines if the ids of Protection Policies, Storage Domains and root Protection Sources
+      - looked up by name should be cached on the node running the module and shared with other tasks
+      - and loop items connecting to the same Cluster.  Lookups are always cached for the module run.
+    type: bool
+    default: False
+  reference_cache_path:
+    description:
+      - Directory used to store the cached ids when I(reference_cache=True).
+    type: path
+    default: ~/.ansible/cohesity/references
+  reference_cache_ttl:
+    description:
+      - Number of seconds a cached id is reused before it is looked up again.
+    type: int
+    default: 300
 
 requirements:
   - A physical or virtual Cohesity system. The modules were developed with Cohesity version 6.1.0